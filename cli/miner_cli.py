@@ -3,21 +3,23 @@ import time
 from hayx.mining.miner import Miner
 from hayx.crypto.wallet import Wallet
 
-def start_mining(wallet_name):
+def start_mining(wallet_name, workers=1):
     if wallet_name not in Wallet.list_wallets():
         print(f"❌ Wallet '{wallet_name}' not found.")
         return
 
     wallet = Wallet(wallet_name)
-    miner = Miner(wallet.get_address())
+    miner = Miner(wallet.get_address(), workers=workers)
 
-    print(f"⛏️ Starting mining with wallet '{wallet_name}'...")
+    print(f"⛏️ Starting mining with wallet '{wallet_name}' ({miner.workers or 'all'} workers)...")
     miner.start_mining()
 
     try:
         while True:
             stats = miner.get_mining_stats()
             print(f"🟢 Hashrate: {stats['hash_rate']:.2f} H/s | Blocks: {stats['blocks_mined']}")
+            if stats['worker_hash_counts']:
+                print(f"   Worker hashes: {stats['worker_hash_counts']}")
             time.sleep(5)
     except KeyboardInterrupt:
         print("\n🛑 Stopping miner...")
@@ -26,9 +28,11 @@ def start_mining(wallet_name):
 def main():
     parser = argparse.ArgumentParser(description="HayX Miner CLI")
     parser.add_argument("wallet", help="Wallet name to mine with")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of mining processes (0 = one per CPU core)")
     args = parser.parse_args()
 
-    start_mining(args.wallet)
+    start_mining(args.wallet, args.workers)
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,39 @@
 import os
 import json
+import time
 
 class Config:
     # Network Configuration
     DEFAULT_PORT = 8333
     P2P_PORT = 8334
     WEB_PORT = 5050
+    MAX_MESSAGE_SIZE = 32 * 1024 * 1024  # Largest P2P message accepted, in bytes
+    MESSAGE_CHUNK_SIZE = 64 * 1024  # Max payload bytes per P2P frame
+    PEER_CONNECT_TIMEOUT = 5  # Seconds to wait for an outbound connection
+    PEER_RECONNECT_BASE = 1.0  # First reconnect delay; doubles per failed attempt
+    PEER_RECONNECT_MAX = 300.0  # Cap on the reconnect delay
+    PEER_SEND_QUEUE = 1000  # Outbound messages buffered per peer before dropping
+    P2P_BACKLOG = 1024  # Pending inbound connections
+    P2P_HANDLER_THREADS = 4  # Threads running P2P message handlers
+    MAX_HEADERS_PER_MESSAGE = 2000  # Headers per 'headers' reply
+    MAX_BLOCKS_PER_MESSAGE = 100  # Blocks per 'blocks' reply
+    SEEN_BLOCKS_CACHE = 10000  # Block hashes remembered for gossip deduplication
+    SEEN_TX_CACHE = 100000  # Transaction ids remembered for gossip deduplication
+    GETDATA_TIMEOUT = 30  # Seconds before an announced item is requested from another peer
+    DOWNLOAD_WINDOW = 4  # Block ranges in flight per peer during sync
+    BLOCK_DOWNLOAD_TIMEOUT = 10  # Seconds before a block range is requested from another peer
+    DISCOVERY_INTERVAL = 30  # Seconds between LAN discovery sweeps
+    DISCOVERY_CONCURRENCY = 256  # Simultaneous connection probes during a sweep
+    DISCOVERY_TIMEOUT = 1.0  # Seconds to wait for a probed host to accept
+    DEAD_HOST_TTL = 600  # Seconds a host that refused or timed out is skipped
+    PEER_EXPIRY = 7 * 24 * 3600  # Drop known peers not reached for this long
+    MAX_ORPHAN_BLOCKS = 100  # Blocks kept while waiting for their parent
+    ORPHAN_BLOCK_EXPIRY = 600  # Seconds an orphan block waits for its parent
     
     # Mining Configuration
     DIFFICULTY_TARGET = 4  # Number of leading zeros required
     BLOCK_TIME_TARGET = 60  # Target block time in seconds (HayX spec)
+    TEMPLATE_REFRESH_INTERVAL = 1.0  # Min seconds before a mempool change refreshes the block template
     MINING_REWARD = 10.0  # HayX block reward
     HALVING_INTERVAL = 525600  # Blocks per halving (~1 year)
     COIN_NAME = 'HayX Coin'
@@ -18,11 +42,32 @@ class Config:
     # Blockchain Configuration
     GENESIS_REWARD = 1000000.0
     MAX_TRANSACTIONS_PER_BLOCK = 100
+    MAX_MEMPOOL_BYTES = 32 * 1024 * 1024  # Serialized size of pending transactions kept; cheapest evicted first
+    SIGNATURE_CACHE_SIZE = 100000  # Verified (tx id, signature, public key) triples remembered
+    VERIFYING_KEY_CACHE_SIZE = 4096  # Parsed public keys kept for signature checks
+    VERIFYING_KEY_PRECOMPUTE_AFTER = 32  # Verifications with a key before its multiplication table is built
+    VALIDATION_WORKERS = 0  # Processes checking received chains; 0 = one per CPU
+    PARALLEL_VALIDATION_MIN_TXS = 500  # Transactions in a chain before its checks go to the worker processes
+    PARALLEL_VERIFY_MIN_TXS = 64  # Transactions in a submitted batch before its signatures go to the worker processes
+    MAX_TRANSACTION_BATCH = 5000  # Transactions accepted per batch submission
+    BLOCK_VERSION = 3  # 1 = legacy JSON-hashed blocks, 2 = binary header + Merkle root, 3 = header also records difficulty
+    
+    # Storage Configuration
+    BLOCK_SEGMENT_SIZE = 16 * 1024 * 1024  # Bytes per block log segment
+    BLOCK_LOG_FSYNC = True  # fsync every appended block record
+    STATE_SNAPSHOT_INTERVAL = 100  # Blocks between account state / tx index snapshots
+    HISTORY_PAGE_SIZE = 20  # Default transactions per history page
+    MAX_HISTORY_PAGE_SIZE = 100
     
     # File Paths
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, 'data')
-    BLOCKCHAIN_FILE = os.path.join(DATA_DIR, 'blockchain.json')
+    BLOCKCHAIN_FILE = os.path.join(DATA_DIR, 'blockchain.json')  # legacy single-file format
+    BLOCKS_DIR = os.path.join(DATA_DIR, 'blocks')
+    CHAINSTATE_FILE = os.path.join(DATA_DIR, 'chainstate.json')
+    MEMPOOL_FILE = os.path.join(DATA_DIR, 'mempool.log')  # append-only journal of pending transactions
+    STATE_FILE = os.path.join(DATA_DIR, 'state.json')
+    TX_INDEX_FILE = os.path.join(DATA_DIR, 'txindex.json')
     PEERS_FILE = os.path.join(DATA_DIR, 'peers.json')
     WALLETS_DIR = os.path.join(DATA_DIR, 'wallets')
     
@@ -41,12 +86,23 @@ class Config:
 
 # Load or create peer list
 def load_peers():
+    """Known peers as {"host:port": last_seen}, without expired entries.
+
+    Older peers.json files hold a plain list; those peers count as seen now.
+    """
+    now = time.time()
     try:
         with open(Config.PEERS_FILE, 'r') as f:
-            return json.load(f)
+            peers = json.load(f)
     except FileNotFoundError:
-        return Config.BOOTSTRAP_NODES
+        peers = Config.BOOTSTRAP_NODES
+    if isinstance(peers, list):
+        return {peer: now for peer in peers}
+    return {peer: last_seen for peer, last_seen in peers.items() if now - last_seen < Config.PEER_EXPIRY}
 
 def save_peers(peers):
+    """Save {"host:port": last_seen}; a plain list is saved as seen now."""
+    if not isinstance(peers, dict):
+        peers = dict.fromkeys(peers, time.time())
     with open(Config.PEERS_FILE, 'w') as f:
-        json.dump(peers, f)
+        json.dump(peers, f, indent=2)
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.service import get_blockchain
 from hayx.blockchain.transaction import Transaction
 from hayx.crypto.wallet import Wallet
 from hayx.mining.miner import Miner
@@ -8,7 +8,7 @@ from config import Config
 import time
 
 api = Blueprint('api', __name__)
-blockchain = Blockchain()
+blockchain = get_blockchain()
 
 # Proper wallet initialization
 wallets = Wallet.list_wallets()
@@ -55,10 +55,36 @@ def send_transaction():
     tx.sign_transaction(wallet.keypair.get_private_key_hex())
 
     if blockchain.add_transaction(tx):
+        node.broadcast_transaction(tx)
         return jsonify({'status': 'success', 'tx_id': tx.tx_id})
     return jsonify({'status': 'error', 'message': 'Transaction failed'})
 
 
+@api.route('/transactions/send', methods=['POST'])
+def send_transactions():
+    """Submit a batch of signed transactions; one result per transaction, in order."""
+    try:
+        accepted, results = blockchain.submit_transactions(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if accepted:
+        node.broadcast_transactions(accepted)
+    return jsonify({'status': 'success', 'accepted': len(accepted), 'results': results})
+
+
+@api.route('/address/<address>/transactions', methods=['GET'])
+def get_address_transactions(address):
+    try:
+        page = blockchain.get_transaction_history_page(
+            address,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', Config.HISTORY_PAGE_SIZE)
+        )
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Invalid cursor or limit'}), 400
+    return jsonify({'status': 'success', 'address': address, **page})
+
+
 @api.route('/mining/start', methods=['POST'])
 def start_mining():
     miner.start_mining()
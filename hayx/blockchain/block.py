@@ -1,19 +1,76 @@
 import json
 import hashlib
+import struct
 import time
 from .transaction import Transaction
+from .merkle import merkle_root, hash_to_bytes
+from hayx.mining.proof_of_work import calculate_header_hash, mine_header, PROGRESS_INTERVAL
+from config import Config
+
+# Block versions:
+#   1 - legacy, hash is SHA-256 over the JSON of the whole block
+#   2 - hash is SHA-256 over a fixed-size binary header committing to the
+#       Merkle root of the transaction ids
+#   3 - the header also commits to the difficulty the block was mined at
+LEGACY_BLOCK_VERSION = 1
+HEADER_BLOCK_VERSION = 2
+DIFFICULTY_BLOCK_VERSION = 3
+
+# version, index, timestamp, previous hash, merkle root (nonce is appended)
+HEADER_PREFIX = struct.Struct('>IId32s32s')
+# the same, then difficulty
+DIFFICULTY_HEADER_PREFIX = struct.Struct('>IId32s32sB')
+
+# Header hashes between progress callbacks while mining
+HASH_BATCH_SIZE = 20000
 
 class Block:
-    def __init__(self, index, transactions, previous_hash, nonce=0):
+    def __init__(self, index, transactions, previous_hash, nonce=0, version=Config.BLOCK_VERSION):
+        self.version = version
         self.index = index
         self.timestamp = time.time()
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.nonce = nonce
+        self.difficulty = 0  # leading zero hex digits the hash must have; recorded from version 3
+        self.merkle_root = self.calculate_merkle_root()
         self.hash = self.calculate_hash()
-    
+        self.hash_attempts = 0
+        self.mining_time = 0.0
+
+    def calculate_merkle_root(self):
+        """Calculate Merkle root of transaction ids"""
+        return merkle_root([tx.tx_id for tx in self.transactions])
+
+    def header_prefix(self):
+        """Binary header without the nonce"""
+        fields = (
+            self.version,
+            self.index,
+            self.timestamp,
+            hash_to_bytes(self.previous_hash),
+            hash_to_bytes(self.merkle_root)
+        )
+        if self.version >= DIFFICULTY_BLOCK_VERSION:
+            return DIFFICULTY_HEADER_PREFIX.pack(*fields, self.difficulty)
+        return HEADER_PREFIX.pack(*fields)
+
+    def prepare_header(self, difficulty):
+        """Fix the Merkle root and the target before mining; returns the header prefix"""
+        self.merkle_root = self.calculate_merkle_root()
+        if self.version >= DIFFICULTY_BLOCK_VERSION:
+            self.difficulty = difficulty
+        return self.header_prefix()
+
+    def meets_difficulty(self):
+        """Whether the hash has the leading zeros of the recorded difficulty"""
+        return self.hash.startswith('0' * self.difficulty)
+
     def calculate_hash(self):
         """Calculate block hash"""
+        if self.version >= HEADER_BLOCK_VERSION:
+            return calculate_header_hash(self.header_prefix(), self.nonce)
+
         block_string = json.dumps({
             'index': self.index,
             'timestamp': self.timestamp,
@@ -21,52 +78,133 @@ class Block:
             'previous_hash': self.previous_hash,
             'nonce': self.nonce
         }, sort_keys=True)
-        
+
         return hashlib.sha256(block_string.encode()).hexdigest()
-    
-    def mine_block(self, difficulty):
-        """Mine block using Proof of Work"""
+
+    def mine_block(self, difficulty, progress=None, should_stop=None):
+        """Mine block using Proof of Work
+
+        Records the hashes actually computed in ``hash_attempts`` and the
+        wall time in ``mining_time``; ``progress`` is called with each
+        batch of attempts as it completes. ``should_stop`` is polled between
+        batches; returns False if it asked to stop, True once solved.
+        """
         target = "0" * difficulty
-        
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        
-        print(f"Block mined: {self.hash}")
-    
+        start_time = time.time()
+        attempts = 0
+        solved = True
+
+        if self.version >= HEADER_BLOCK_VERSION:
+            header_prefix = self.prepare_header(difficulty)
+            while True:
+                found = mine_header(header_prefix, difficulty, self.nonce, self.nonce + HASH_BATCH_SIZE)
+                batch = found[0] - self.nonce + 1 if found else HASH_BATCH_SIZE
+                attempts += batch
+                if progress:
+                    progress(batch)
+                if found:
+                    self.nonce, self.hash = found
+                    break
+                self.nonce += HASH_BATCH_SIZE
+                if should_stop and should_stop():
+                    solved = False
+                    break
+        else:
+            batch = 0
+            while self.hash[:difficulty] != target:
+                self.nonce += 1
+                self.hash = self.calculate_hash()
+                batch += 1
+                if batch == PROGRESS_INTERVAL:
+                    if progress:
+                        progress(batch)
+                    attempts += batch
+                    batch = 0
+                    if should_stop and should_stop():
+                        solved = False
+                        break
+            attempts += batch
+            if progress and batch:
+                progress(batch)
+
+        self.hash_attempts = attempts
+        self.mining_time = time.time() - start_time
+        if solved:
+            print(f"Block mined: {self.hash}")
+        return solved
+
     def to_dict(self):
         """Convert block to dictionary"""
-        return {
+        data = {
+            'version': self.version,
             'index': self.index,
             'timestamp': self.timestamp,
             'transactions': [tx.to_dict() for tx in self.transactions],
             'previous_hash': self.previous_hash,
+            'merkle_root': self.merkle_root,
             'nonce': self.nonce,
             'hash': self.hash
         }
-    
+        if self.version >= DIFFICULTY_BLOCK_VERSION:
+            data['difficulty'] = self.difficulty
+        return data
+
+    def header_to_dict(self):
+        """Block without its transactions, as sent during header sync"""
+        data = self.to_dict()
+        del data['transactions']
+        return data
+
+    @classmethod
+    def from_header_dict(cls, data):
+        """Transaction-less block from a header; only header fields are meaningful"""
+        return cls.from_dict(dict(data, transactions=[]))
+
+    def is_header_valid(self, previous_header=None):
+        """Check linkage and, for header-hashed blocks, the hash itself"""
+        if previous_header and (self.previous_hash != previous_header.hash or
+                                self.index != previous_header.index + 1):
+            return False
+        if self.version >= HEADER_BLOCK_VERSION:
+            return self.hash == self.calculate_hash() and self.meets_difficulty()
+        return True
+
     @classmethod
     def from_dict(cls, data):
         """Create block from dictionary"""
         transactions = [Transaction.from_dict(tx_data) for tx_data in data['transactions']]
-        block = cls(data['index'], transactions, data['previous_hash'], data['nonce'])
+        version = data.get('version', LEGACY_BLOCK_VERSION)
+        block = cls(data['index'], transactions, data['previous_hash'], data['nonce'], version)
         block.timestamp = data['timestamp']
+        block.difficulty = data.get('difficulty', 0)
+        block.merkle_root = data.get('merkle_root', block.merkle_root)
         block.hash = data['hash']
         return block
-    
+
     def is_valid(self, previous_block=None):
         """Validate block"""
-        # Check hash
-        if self.hash != self.calculate_hash():
-            return False
-        
         # Check previous hash
         if previous_block and self.previous_hash != previous_block.hash:
             return False
-        
+
+        return self.has_valid_contents()
+
+    def has_valid_contents(self):
+        """Checks that need nothing but the block itself: ids, hash and signatures"""
+        if self.version >= HEADER_BLOCK_VERSION:
+            # Header commits to tx ids, so each id must match its contents
+            if any(tx.tx_id != tx.calculate_hash() for tx in self.transactions):
+                return False
+            if self.merkle_root != self.calculate_merkle_root():
+                return False
+
+        # Check hash
+        if self.hash != self.calculate_hash() or not self.meets_difficulty():
+            return False
+
         # Validate transactions
         for tx in self.transactions:
-            if tx.sender != "coinbase" and not tx.signature:
+            if not tx.has_valid_amounts() or not tx.has_valid_signature():
                 return False
-        
+
         return True
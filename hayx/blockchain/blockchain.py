@@ -1,26 +1,91 @@
 import os
 import json
+import shutil
+import threading
 from .block import Block
-from .transaction import Transaction
+from .transaction import Transaction, parse_transactions
+from .storage import BlockStore
+from .state import AccountState
+from .txindex import TransactionIndex
+from .snapshot import ChainSnapshot
+from .blockindex import BlockIndex
+from .mempool import Mempool, MempoolJournal
+from .validation import ChainValidator
 from config import Config
 
 class Blockchain:
+    """Chain, mempool and their indexes.
+
+    Concurrency: every mutation runs under ``write_lock`` and ends by
+    publishing a new immutable ``ChainSnapshot``. Readers (stats, explorer,
+    validation, block templates) use ``self.snapshot`` and never take the
+    lock, so long reads cannot stall mining or block acceptance. Writers
+    only append to ``chain`` / ``mempool.transactions`` in place; any other
+    change builds a new list so published snapshots stay valid.
+
+    Fork choice: ``block_index`` holds every block we have accepted, on any
+    branch, with its cumulative work. The chain follows the branch with the
+    most work; switching branches disconnects and connects only the blocks
+    after the fork point.
+    """
+
     def __init__(self):
         self.chain = []
-        self.pending_transactions = []
+        self.mempool = Mempool()
+        self.mempool_journal = MempoolJournal(Config.MEMPOOL_FILE)
         self.mining_reward = Config.MINING_REWARD
         self.difficulty = Config.DIFFICULTY_TARGET
         self.blockchain_file = Config.BLOCKCHAIN_FILE
+        self.chainstate_file = Config.CHAINSTATE_FILE
+        self.store = BlockStore(Config.BLOCKS_DIR)
+        self.state = AccountState(Config.STATE_FILE)
+        self.tx_index = TransactionIndex(Config.TX_INDEX_FILE)
+        self.block_index = BlockIndex()
+        self.validator = ChainValidator()
+        self.listeners = []
+        self.write_lock = threading.RLock()
+        self.snapshot = None
 
         self.load_or_create_genesis()
+        self.block_index.load(self.chain)
+        self._publish_snapshot()
+
+    def _publish_snapshot(self):
+        """Make the current tip visible to readers."""
+        self.snapshot = ChainSnapshot(
+            self.chain, self.mempool.transactions, self.difficulty, self.state.total_supply
+        )
+
+    @property
+    def pending_transactions(self):
+        """Pending transactions in arrival order."""
+        return self.mempool.transactions
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` on 'tip' (chain changed) and 'mempool' events."""
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _notify(self, event):
+        for callback in list(self.listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️ Chain listener error: {e}")
 
     def load_or_create_genesis(self):
-        """Load blockchain from file or create genesis block."""
-        if os.path.exists(self.blockchain_file):
+        """Load blockchain from the block log, migrate a legacy file, or create genesis block."""
+        if len(self.store) > 0:
             self.load_blockchain()
+        elif os.path.exists(self.blockchain_file):
+            self.migrate_legacy_file()
         else:
             self.create_genesis_block()
             self.save_blockchain()
+            self._restore_mempool()
 
     def create_genesis_block(self):
         """Create the genesis block."""
@@ -30,153 +95,566 @@ class Blockchain:
         self.chain = [genesis_block]
 
     def load_blockchain(self):
-        """Load blockchain from file, handling old/new formats and corrupt data."""
+        """Load blockchain from the block log and chain state file."""
+        self.chain = list(self.store.iter_blocks())
+        pending = []  # only chain state files from before the mempool journal hold these
+        self.difficulty = Config.DIFFICULTY_TARGET
+
         try:
-            with open(self.blockchain_file, 'r') as f:
-                content = f.read().strip()
-                if not content:
-                    raise ValueError("Empty file")
+            with open(self.chainstate_file, 'r') as f:
+                state = json.load(f)
+            pending = [Transaction.from_dict(tx) for tx in state.get('pending_transactions', [])]
+            self.difficulty = state.get('difficulty', Config.DIFFICULTY_TARGET)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to load chain state: {e}")
 
-                data = json.loads(content)
+        self.state.load(self.chain)
+        self.tx_index.load(self.chain)
+        self._restore_mempool(pending)
 
-            # Old format: plain list of blocks
-            if isinstance(data, list):
-                print("⚠️ Detected old blockchain format. Converting…")
-                self.chain = [Block.from_dict(b) for b in data]
-                self.pending_transactions = []
-                self.difficulty = Config.DIFFICULTY_TARGET
+        print(f"✅ Loaded blockchain ({len(self.chain)} blocks)")
 
-            # New format: dict with chain, pending_transactions, difficulty
-            else:
-                self.chain = [Block.from_dict(b) for b in data['chain']]
-                self.pending_transactions = [
-                    Transaction.from_dict(tx) for tx in data.get('pending_transactions', [])
-                ]
-                self.difficulty = data.get('difficulty', Config.DIFFICULTY_TARGET)
+    def _restore_mempool(self, saved=()):
+        """Reload the mempool journal and re-admit its transactions against the tip.
+
+        ``saved`` holds pending transactions from older file formats, used
+        when there is no journal yet. Transactions the chain already holds,
+        left behind by a crash between writing a block and journaling their
+        removal, are dropped. The journal is compacted to what was re-admitted.
+        """
+        transactions = self.mempool_journal.load() if self.mempool_journal.exists() else list(saved)
+        self.mempool = Mempool()
+        for tx in transactions:
+            if not self.is_confirmed(tx.tx_id):
+                self.mempool.add(tx, self.get_balance(tx.sender))
+        self.mempool_journal.compact(self.mempool.transactions)
+        self.mempool.journal = self.mempool_journal
 
-            print(f"✅ Loaded blockchain ({len(self.chain)} blocks)")
+    def load_legacy_file(self):
+        """Parse the legacy blockchain.json, handling old/new formats.
 
+        Returns the pending transactions it held.
+        """
+        with open(self.blockchain_file, 'r') as f:
+            content = f.read().strip()
+            if not content:
+                raise ValueError("Empty file")
+
+            data = json.loads(content)
+
+        # Old format: plain list of blocks
+        if isinstance(data, list):
+            print("⚠️ Detected old blockchain format. Converting…")
+            self.chain = [Block.from_dict(b) for b in data]
+            self.difficulty = Config.DIFFICULTY_TARGET
+            return []
+
+        # Dict format: chain, pending_transactions, difficulty
+        else:
+            self.chain = [Block.from_dict(b) for b in data['chain']]
+            self.difficulty = data.get('difficulty', Config.DIFFICULTY_TARGET)
+            return [Transaction.from_dict(tx) for tx in data.get('pending_transactions', [])]
+
+    def migrate_legacy_file(self):
+        """One-time migration of blockchain.json into the append-only block log.
+
+        The log is built in a temporary directory and renamed into place once
+        complete, so a crash part way leaves no block log and the next start
+        migrates again from blockchain.json.
+        """
+        try:
+            pending = self.load_legacy_file()
         except Exception as e:
             print(f"⚠️ Failed to load blockchain: {e}")
             print("🔄 Reinitializing with genesis block…")
             self.chain = []
-            self.pending_transactions = []
+            pending = []
             self.create_genesis_block()
-            self.save_blockchain()
+
+        blocks_dir = self.store.directory
+        tmp_dir = blocks_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # left by an interrupted migration
+        self.store = BlockStore(tmp_dir)
+        self.save_blockchain()
+        shutil.rmtree(blocks_dir)
+        os.replace(tmp_dir, blocks_dir)
+        self.store = BlockStore(blocks_dir)
+
+        self._restore_mempool(pending)
+        os.replace(self.blockchain_file, self.blockchain_file + '.migrated')
+        print(f"📦 Migrated {len(self.chain)} blocks to {blocks_dir}")
 
     def save_blockchain(self):
-        """Save blockchain to file in new format."""
+        """Persist blocks missing from the block log plus the chain state.
+
+        Only blocks above the last height the log agrees with are written, so
+        saving after a new block appends one record instead of rewriting the
+        whole chain. A replaced chain is truncated back to the fork point and
+        the account state and tx index are rolled back over the discarded blocks.
+        """
+        with self.write_lock:
+            self._save_blockchain()
+            self._publish_snapshot()
+
+    def _save_blockchain(self):
+        height = len(self.store)
+        if height > len(self.chain) or (height and self.chain[height - 1].hash != self.state.tip_hash):
+            height = min(height, len(self.chain))
+            while height > 0 and self.store.read(height - 1).hash != self.chain[height - 1].hash:
+                height -= 1
+
+        if height < len(self.store):
+            for stale_height in range(len(self.store) - 1, height - 1, -1):
+                self._disconnect_block(self.store.read(stale_height))
+            self.store.truncate(height)
+            self.save_indexes()
+
+        for block in self.chain[height:]:
+            self._connect_block(block)
+        self.save_chainstate()
+
+    def save_indexes(self):
+        """Snapshot the account state and transaction index."""
+        self.state.save()
+        self.tx_index.save()
+
+    def _connect_block(self, block, snapshot=True):
+        """Write a block to the log and apply it to the state and tx index.
+
+        Every STATE_SNAPSHOT_INTERVAL blocks the indexes are saved, unless
+        ``snapshot`` is False (during a reorg, which saves them at the end).
+        """
+        self.store.append(block)
+        self.state.apply_block(block)
+        self.tx_index.apply_block(block)
+        self.block_index.add(block)
+        if snapshot and self.state.height % Config.STATE_SNAPSHOT_INTERVAL == 0:
+            self.save_indexes()
+
+    def _disconnect_block(self, block):
+        """Roll the state and tx index back over the tip block."""
+        self.state.undo_block(block)
+        self.tx_index.undo_block(block)
+
+    def _extends_tip(self, block):
+        latest_block = self.chain[-1]
+        return block.index == latest_block.index + 1 and block.previous_hash == latest_block.hash
+
+    def add_block(self, block):
+        """Append a validated or locally mined block that extends the current tip.
+
+        The block is written to the log and indexes first and only then
+        becomes the tip, so if writing it fails the chain, log and indexes
+        are left as they were. Returns False if the tip moved since the
+        caller validated or mined the block, or if the block repeats a
+        confirmed transaction.
+        """
+        with self.write_lock:
+            if not self._extends_tip(block) or self._replays_transactions([block]):
+                return False
+            indexed = block.hash in self.block_index
+            try:
+                self._connect_block(block)
+            except BaseException:
+                self._undo_failed_connect(block, indexed)
+                raise
+            self.chain.append(block)
+            self._update_mempool([block])
+            self._publish_snapshot()
+            self.difficulty = self.get_lwma_difficulty()  # reads the new snapshot
+            self.save_chainstate()
+            self._publish_snapshot()
+        self._notify('tip')
+        return True
+
+    def _undo_failed_connect(self, block, indexed):
+        """Roll back whatever part of _connect_block(block) got done at the tip."""
+        if self.state.tip_hash == block.hash:
+            self.state.undo_block(block)
+        if self.tx_index.tip_hash == block.hash:
+            self.tx_index.undo_block(block)
+        if not indexed:
+            self.block_index.discard(block.hash)
+        self.store.truncate(len(self.chain))
+
+    def replace_chain(self, chain):
+        """Switch to ``chain``, rolling back blocks after the fork point."""
+        with self.write_lock:
+            fork = min(len(chain), len(self.chain))
+            while fork > 0 and chain[fork - 1].hash != self.chain[fork - 1].hash:
+                fork -= 1
+            if not self._reorganize(fork, chain[fork:]):
+                return False
+        self._notify('tip')
+        return True
+
+    def connect_branch(self, blocks):
+        """Accept validated, consecutive blocks building on a block we know.
+
+        The blocks are indexed as a side branch; if that branch now has more
+        work than our chain, the chain switches to it. A branch may also
+        start with another genesis block, in which case switching replaces
+        the whole chain. Returns True if the last block became the tip.
+        """
+        with self.write_lock:
+            tip = None
+            for block in blocks:
+                tip = self.block_index.add(block)
+                if tip is None:
+                    return False
+            best = self.block_index.get(self.chain[-1].hash)
+            if tip.chain_work <= best.chain_work:
+                return False
+            fork = self.block_index.fork_point(best, tip)
+            height = fork.height + 1 if fork else 0
+            if not self._reorganize(height, self.block_index.branch(fork, tip)):
+                return False
+        self._notify('tip')
+        return True
+
+    def _reorganize(self, height, blocks):
+        """Replace our blocks from ``height`` on with ``blocks``.
+
+        Only the blocks above the fork are undone, newest first, and their
+        transactions go back to the mempool unless the new blocks include
+        them. Returns False, changing nothing, if ``blocks`` repeat a
+        transaction confirmed below the fork.
+        """
+        disconnected = self.chain[height:]
+        if self._replays_transactions(blocks, disconnected):
+            return False
+        for block in reversed(disconnected):
+            self._disconnect_block(block)
+        if disconnected:
+            self.store.truncate(height)
+            self.chain = self.chain[:height]
+
+        crossed_snapshot = False
+        for block in blocks:
+            self._connect_block(block, snapshot=False)
+            self.chain.append(block)
+            crossed_snapshot |= self.state.height % Config.STATE_SNAPSHOT_INTERVAL == 0
+
+        self._update_mempool(blocks, disconnected)
+        if disconnected or crossed_snapshot:
+            self.save_indexes()
+        self.save_chainstate()
+        self._publish_snapshot()
+        return True
+
+    def _replays_transactions(self, blocks, disconnected=()):
+        """Whether ``blocks`` repeat a transaction, one of theirs or one confirmed below them.
+
+        Transactions of the ``disconnected`` blocks no longer count as confirmed.
+        """
+        released = {tx.tx_id for block in disconnected for tx in block.transactions}
+        seen = set()
+        for block in blocks:
+            for tx in block.transactions:
+                if tx.tx_id in seen or (self.is_confirmed(tx.tx_id) and tx.tx_id not in released):
+                    return True
+                seen.add(tx.tx_id)
+        return False
+
+    def _update_mempool(self, connected, disconnected=()):
+        """Drop pending transactions that connected blocks confirmed or made unaffordable.
+
+        Transactions of disconnected blocks are offered to the mempool again.
+        """
+        included = {tx.tx_id for block in connected for tx in block.transactions}
+        self.mempool.remove(included)
+        for block in disconnected:
+            for tx in block.transactions:
+                if tx.sender != "coinbase" and tx.tx_id not in included:
+                    self.mempool.add(tx, self.get_balance(tx.sender))
+        senders = {tx.sender for block in connected for tx in block.transactions}
+        self.mempool.enforce_balances(senders, self.get_balance)
+
+    def get_indexed_block(self, block_hash):
+        """Any block we have accepted, on the main chain or a side branch."""
+        entry = self.block_index.get(block_hash)
+        return entry.block if entry else None
+
+    def get_chain_work(self, block_hash):
+        """Cumulative work of the branch ending at a block we have accepted, or None."""
+        entry = self.block_index.get(block_hash)
+        return entry.chain_work if entry else None
+
+    def set_difficulty(self, difficulty):
+        with self.write_lock:
+            self.difficulty = difficulty
+            self._publish_snapshot()
+
+    def save_chainstate(self):
+        """Write the small mutable state (difficulty) atomically.
+
+        The mempool is persisted separately by its journal.
+        """
         payload = {
-            'chain': [b.to_dict() for b in self.chain],
-            'pending_transactions': [tx.to_dict() for tx in self.pending_transactions],
             'difficulty': self.difficulty
         }
-        with open(self.blockchain_file, 'w') as f:
-            json.dump(payload, f, indent=2)
+        tmp_file = self.chainstate_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_file, self.chainstate_file)
 
     def get_latest_block(self):
-        return self.chain[-1] if self.chain else None
+        return self.snapshot.get_latest_block()
 
     def add_transaction(self, transaction):
-        if self.is_valid_transaction(transaction):
-            self.pending_transactions.append(transaction)
-            return True
-        return False
+        """Admit a transaction to the mempool; False if refused."""
+        if not transaction.has_valid_signature():
+            return False
+        with self.write_lock:
+            if (self.is_confirmed(transaction.tx_id) or
+                    not self.mempool.add(transaction, self.get_balance(transaction.sender))):
+                return False
+            self._publish_snapshot()
+        self._notify('mempool')
+        return True
 
-    def is_valid_transaction(self, transaction):
+    def add_transactions(self, transactions):
+        """Admit a batch of signed transactions; an error message per transaction, None if admitted.
+
+        Entries may be None for items that could not be parsed. Batches come
+        from outside clients, so each transaction must carry
+        the public key it was signed with and an id matching its contents.
+        Transactions that are already pending or confirmed, or that their
+        sender cannot afford, are refused before any signature is checked. The rest have
+        their signatures checked by the validator's worker processes and are
+        then admitted under one write lock, in order, so a sender's later
+        transactions are checked against what their earlier ones spend.
+        """
+        errors = [None] * len(transactions)
+        unverified = []
+        for i, tx in enumerate(transactions):
+            if tx is None:
+                errors[i] = 'Invalid transaction data'
+            elif tx.public_key is None:
+                errors[i] = 'Missing public key'
+            elif tx.tx_id != tx.calculate_hash():
+                errors[i] = 'Transaction id does not match its contents'
+            else:
+                errors[i] = self._admission_error(tx)
+                if errors[i] is None:
+                    unverified.append(i)
+
+        valid = self.validator.verify_signatures([transactions[i] for i in unverified])
+        admitted = False
+        with self.write_lock:
+            for i, signature_ok in zip(unverified, valid):
+                tx = transactions[i]
+                if not signature_ok:
+                    errors[i] = 'Invalid signature'
+                elif self.is_confirmed(tx.tx_id):
+                    # Confirmed by a block connected while signatures were checked
+                    errors[i] = 'Transaction already confirmed'
+                elif self.mempool.add(tx, self.get_balance(tx.sender)):
+                    admitted = True
+                else:
+                    errors[i] = self._admission_error(tx) or 'Mempool full'
+            if admitted:
+                self._publish_snapshot()
+        if admitted:
+            self._notify('mempool')
+        return errors
+
+    def submit_transactions(self, data):
+        """Admit a client's batch, ``{"transactions": [tx dict, ...]}``.
+
+        Returns the admitted transactions and one result per item, in
+        order. Raises ValueError if ``data`` is not such a batch.
+        """
+        items = data.get('transactions') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValueError('Expected a list of transactions')
+        if len(items) > Config.MAX_TRANSACTION_BATCH:
+            raise ValueError(f'At most {Config.MAX_TRANSACTION_BATCH} transactions per batch')
+
+        transactions = parse_transactions(items)
+        errors = self.add_transactions(transactions)
+        accepted = [tx for tx, error in zip(transactions, errors) if error is None]
+        results = [
+            {'tx_id': tx.tx_id, 'status': 'success'} if error is None else
+            {'tx_id': tx.tx_id if tx else None, 'status': 'error', 'message': error}
+            for tx, error in zip(transactions, errors)
+        ]
+        return accepted, results
+
+    def _admission_error(self, transaction):
+        """Why the mempool would refuse ``transaction`` right now, if it would."""
         if transaction.sender == "coinbase":
-            return True
-        return self.get_balance(transaction.sender) >= (transaction.amount + transaction.fee)
+            return 'Coinbase transactions cannot be submitted'
+        if not transaction.has_valid_amounts():
+            return 'Amount must be positive and fee not negative'
+        if transaction.tx_id in self.mempool:
+            return 'Transaction already pending'
+        if self.is_confirmed(transaction.tx_id):
+            return 'Transaction already confirmed'
+        if not self.is_valid_transaction(transaction):
+            return 'Insufficient balance'
+        return None
+
+    def is_confirmed(self, tx_id):
+        """Whether a transaction with ``tx_id`` is in our chain."""
+        return tx_id in self.tx_index.by_tx_id
+
+    def is_valid_transaction(self, transaction):
+        """Whether the sender can pay for ``transaction`` on top of their pending ones."""
+        return self.mempool.can_admit(transaction, self.get_balance(transaction.sender))
 
     def get_block_reward(self, height=None):
         """Calculate mining reward with halving."""
         if height is None:
-            height = len(self.chain)
+            height = self.snapshot.height
         halvings = height // Config.HALVING_INTERVAL
         return Config.MINING_REWARD / (2 ** halvings)
 
     def get_lwma_difficulty(self, window=60):
         """Calculate difficulty using LWMA algorithm."""
-        if len(self.chain) < window + 1:
-            return self.difficulty
+        snapshot = self.snapshot
+        if snapshot.height < window + 1:
+            return snapshot.difficulty
         sum_inverse = 0
         weighted_times = 0
         k = window * (window + 1) // 2
         for i in range(1, window + 1):
-            block = self.chain[-i]
-            prev_block = self.chain[-i - 1]
+            block = snapshot.get_block(snapshot.height - i)
+            prev_block = snapshot.get_block(snapshot.height - i - 1)
             solve_time = block.timestamp - prev_block.timestamp
             solve_time = max(1, min(solve_time, 6 * Config.BLOCK_TIME_TARGET))
             weighted_times += solve_time * i
             sum_inverse += i
         avg = weighted_times / k
-        new_difficulty = max(1, int(self.difficulty * Config.BLOCK_TIME_TARGET / avg))
+        new_difficulty = max(1, int(snapshot.difficulty * Config.BLOCK_TIME_TARGET / avg))
         return new_difficulty
 
-    def mine_pending_transactions(self, mining_reward_address):
-        reward = self.get_block_reward()
+    def _solve_block(self, block, pow_backend=None, progress=None):
+        """Run proof of work on a block; False if the backend was cancelled."""
+        if pow_backend is None:
+            return block.mine_block(self.get_lwma_difficulty(), progress)
+        return pow_backend.mine(block, self.get_lwma_difficulty(), progress)
+
+    def create_block_template(self, mining_reward_address, include_pending=True):
+        """Build an unmined block on the current tip paying the reward to an address.
+
+        Pending transactions are taken highest fee rate first.
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            txs = self.mempool.select(Config.MAX_TRANSACTIONS_PER_BLOCK - 1) if include_pending else []
+        reward = self.get_block_reward(snapshot.height)
         reward_tx = Transaction("coinbase", mining_reward_address, reward, 0)
-        txs = self.pending_transactions[:Config.MAX_TRANSACTIONS_PER_BLOCK - 1]
         txs.append(reward_tx)
-        new_block = Block(len(self.chain), txs, self.get_latest_block().hash)
-        new_block.mine_block(self.get_lwma_difficulty())
-        self.chain.append(new_block)
-        self.pending_transactions = self.pending_transactions[Config.MAX_TRANSACTIONS_PER_BLOCK - 1:]
-        self.difficulty = self.get_lwma_difficulty()
-        self.save_blockchain()
+        return Block(snapshot.height, txs, snapshot.tip_hash)
+
+    def mine_pending_transactions(self, mining_reward_address, pow_backend=None, progress=None):
+        new_block = self.create_block_template(mining_reward_address)
+        if not self._solve_block(new_block, pow_backend, progress) or not self.add_block(new_block):
+            return None
         return new_block
 
-    def mine_empty_block(self, mining_reward_address):
-        reward = self.get_block_reward()
-        reward_tx = Transaction("coinbase", mining_reward_address, reward, 0)
-        new_block = Block(len(self.chain), [reward_tx], self.get_latest_block().hash)
-        new_block.mine_block(self.get_lwma_difficulty())
-        self.chain.append(new_block)
-        self.difficulty = self.get_lwma_difficulty()
-        self.save_blockchain()
+    def mine_empty_block(self, mining_reward_address, pow_backend=None, progress=None):
+        new_block = self.create_block_template(mining_reward_address, include_pending=False)
+        if not self._solve_block(new_block, pow_backend, progress) or not self.add_block(new_block):
+            return None
         return new_block
 
+    def get_locator(self):
+        """[height, hash] pairs from the tip back to genesis, denser near the tip.
+
+        Sent with get_headers so a peer can find the last block we share.
+        """
+        snapshot = self.snapshot
+        locator = []
+        height = snapshot.height - 1
+        step = 1
+        while height > 0:
+            locator.append([height, snapshot.get_block(height).hash])
+            if len(locator) >= 10:
+                step *= 2
+            height -= step
+        locator.append([0, snapshot.get_block(0).hash])
+        return locator
+
+    def find_fork_height(self, locator, snapshot=None):
+        """Height of the highest locator entry on our chain, or -1 if none is."""
+        snapshot = snapshot or self.snapshot
+        for height, block_hash in locator:
+            if 0 <= height < snapshot.height and snapshot.get_block(height).hash == block_hash:
+                return height
+        return -1
+
+    def get_block_range(self, start, end, snapshot=None):
+        """Blocks with heights in [start, end), clamped to the chain."""
+        snapshot = snapshot or self.snapshot
+        return list(snapshot.iter_blocks(max(start, 0), min(end, snapshot.height)))
+
+    def get_block_at(self, height, block_hash, snapshot=None):
+        """Our block at ``height`` if its hash is ``block_hash``, else None."""
+        snapshot = snapshot or self.snapshot
+        if 0 <= height < snapshot.height and snapshot.get_block(height).hash == block_hash:
+            return snapshot.get_block(height)
+        return None
+
+    def get_pending_transaction(self, tx_id):
+        return self.mempool.get(tx_id)
+
     def get_balance(self, address):
-        balance = 0
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address and tx.sender != "coinbase":
-                    balance -= (tx.amount + tx.fee)
-                if tx.recipient == address:
-                    balance += tx.amount
-        return balance
+        return self.state.get_balance(address)
 
-    def get_transaction_history(self, address):
+    @staticmethod
+    def _history_entries(snapshot, entries):
         history = []
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address or tx.recipient == address:
-                    data = tx.to_dict()
-                    data.update(block_index=block.index, block_hash=block.hash)
-                    history.append(data)
+        for height, position in entries:
+            if height >= snapshot.height:
+                continue
+            block = snapshot.get_block(height)
+            data = block.transactions[position].to_dict()
+            data.update(block_index=block.index, block_hash=block.hash)
+            history.append(data)
         return history
 
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            curr, prev = self.chain[i], self.chain[i-1]
-            if not curr.is_valid(prev) or curr.previous_hash != prev.hash:
-                return False
-        return True
+    def get_transaction_history(self, address):
+        entries = list(self.tx_index.by_address.get(address, []))
+        return self._history_entries(self.snapshot, entries)
+
+    def get_transaction_history_page(self, address, cursor=None, limit=Config.HISTORY_PAGE_SIZE):
+        """Return one page of an address's history, newest first.
+
+        ``cursor`` is the ``next_cursor`` of the previous page ("height-position").
+        Raises ValueError for a malformed cursor.
+        """
+        before = None
+        if cursor:
+            height, position = cursor.split('-')
+            before = (int(height), int(position))
+        limit = max(1, min(int(limit), Config.MAX_HISTORY_PAGE_SIZE))
+
+        snapshot = self.snapshot
+        entries, has_more = self.tx_index.get_page(address, before, limit)
+        return {
+            'transactions': self._history_entries(snapshot, entries),
+            'next_cursor': f"{entries[-1][0]}-{entries[-1][1]}" if has_more else None
+        }
+
+    def is_chain_valid(self, chain=None):
+        """Validate our chain, or a candidate chain without loading it."""
+        if chain is None:
+            chain = self.snapshot.tail(self.snapshot.height)
+        return self.validator.validate(chain)
 
     def get_stats(self):
+        snapshot = self.snapshot
         return {
-            'total_blocks': len(self.chain),
-            'pending_transactions': len(self.pending_transactions),
-            'difficulty': self.difficulty,
-            'latest_block_hash': self.get_latest_block().hash if self.chain else None,
-            'total_supply': sum(self.get_balance(addr) for addr in self.get_all_addresses())
+            'total_blocks': snapshot.height,
+            'pending_transactions': snapshot.pending_count,
+            'difficulty': snapshot.difficulty,
+            'latest_block_hash': snapshot.tip_hash,
+            'total_supply': snapshot.total_supply
         }
 
     def get_all_addresses(self):
-        addresses = set()
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender != "coinbase":
-                    addresses.add(tx.sender)
-                addresses.add(tx.recipient)
-        return list(addresses)
+        return list(self.state.balances)
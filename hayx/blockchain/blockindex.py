@@ -0,0 +1,92 @@
+def block_work(block):
+    """Work a block adds to its branch: 16 ** the difficulty it was mined at.
+
+    The difficulty is the number of leading zero hex digits the header
+    commits to, so a hash luckier than its target earns no extra work.
+    Blocks before version 3 do not record their target and each count as
+    the minimum work.
+    """
+    return 16 ** block.difficulty
+
+
+class BlockIndexEntry:
+    __slots__ = ('block', 'height', 'chain_work', 'parent')
+
+    def __init__(self, block, parent):
+        self.block = block
+        self.height = block.index
+        self.parent = parent
+        self.chain_work = (parent.chain_work if parent else 0) + block_work(block)
+
+    @property
+    def hash(self):
+        return self.block.hash
+
+
+class BlockIndex:
+    """Tree of every block we know, on the main chain or on side branches.
+
+    Entries are keyed by block hash and link to their parent, with the
+    height and the cumulative work of the branch ending at them. The
+    Blockchain uses it to pick the branch with the most work and to find
+    the fork point with a competing tip without walking the whole chain.
+    Each node mines its own genesis, so a peer's chain can be a separate
+    tree with a root of its own.
+    Mutated under the Blockchain's write lock; lookups need no lock.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, block_hash):
+        return block_hash in self.entries
+
+    def get(self, block_hash):
+        return self.entries.get(block_hash)
+
+    def add(self, block):
+        """Index a block whose parent is known (or genesis); None if it does not fit."""
+        entry = self.entries.get(block.hash)
+        if entry is not None:
+            return entry
+        parent = self.entries.get(block.previous_hash)
+        if parent is None and block.index != 0:
+            return None
+        if parent is not None and block.index != parent.height + 1:
+            return None
+        entry = BlockIndexEntry(block, parent)
+        self.entries[block.hash] = entry
+        return entry
+
+    def discard(self, block_hash):
+        """Forget a block that failed to connect; it must have no children."""
+        self.entries.pop(block_hash, None)
+
+    def load(self, chain):
+        """Index the main chain, genesis first."""
+        for block in chain:
+            self.add(block)
+
+    @staticmethod
+    def fork_point(a, b):
+        """Last entry that both branches share, or None if their genesis differs."""
+        while a.height > b.height:
+            a = a.parent
+        while b.height > a.height:
+            b = b.parent
+        while a is not b:
+            a, b = a.parent, b.parent
+        return a
+
+    @staticmethod
+    def branch(ancestor, tip):
+        """Blocks after ``ancestor`` (None: from genesis) up to and including ``tip``, oldest first."""
+        blocks = []
+        while tip is not ancestor:
+            blocks.append(tip.block)
+            tip = tip.parent
+        blocks.reverse()
+        return blocks
@@ -0,0 +1,257 @@
+import heapq
+import itertools
+import json
+import os
+from .transaction import Transaction
+from config import Config
+
+
+class MempoolEntry:
+    __slots__ = ('tx', 'size', 'fee_rate', 'seq')
+
+    def __init__(self, tx, seq):
+        self.tx = tx
+        self.size = len(json.dumps(tx.to_dict(), separators=(',', ':')))
+        self.fee_rate = tx.fee / self.size
+        self.seq = seq
+
+
+class Mempool:
+    """Pending transactions, indexed for admission, block templates and eviction.
+
+    ``entries`` maps tx ids to entries, and ``outflow`` holds what each
+    sender's pending transactions spend, so admitting a transaction is a
+    few dict lookups and a sender can never queue more than their balance.
+    Two heaps order the entries by fee rate (fee per serialized byte):
+    highest first for block templates, lowest first for eviction once the
+    pool exceeds ``max_bytes``. Removed entries stay in the heaps until they
+    surface or the heaps are compacted.
+
+    ``transactions`` keeps arrival order for display. Like the chain list it
+    is only appended to in place and otherwise replaced, so a ChainSnapshot
+    can share it. Mutations run under the Blockchain's write lock and are
+    recorded in ``journal`` when one is attached.
+    """
+
+    def __init__(self, max_bytes=Config.MAX_MEMPOOL_BYTES, journal=None):
+        self.max_bytes = max_bytes
+        self.journal = journal
+        self.entries = {}  # tx_id -> MempoolEntry
+        self.by_sender = {}  # sender -> tx ids of their pending transactions
+        self.outflow = {}  # sender -> amount + fee of their pending transactions
+        self.best = []  # (-fee_rate, seq, tx_id): template order
+        self.worst = []  # (fee_rate, -seq, tx_id): eviction order, newest first on ties
+        self.transactions = []
+        self.total_bytes = 0
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, tx_id):
+        return tx_id in self.entries
+
+    def get(self, tx_id):
+        entry = self.entries.get(tx_id)
+        return entry.tx if entry else None
+
+    def can_admit(self, tx, balance):
+        """Whether ``tx`` is new and its sender can cover it on top of their pending outflow."""
+        if tx.sender == "coinbase" or tx.tx_id in self.entries or not tx.has_valid_amounts():
+            return False
+        return self.outflow.get(tx.sender, 0) + tx.amount + tx.fee <= balance
+
+    def add(self, tx, balance):
+        """Admit ``tx`` given its sender's confirmed ``balance``; False if refused.
+
+        When the pool is full, cheaper transactions are evicted to make room;
+        a transaction that pays less than everything it would displace is
+        refused instead.
+        """
+        if not self.can_admit(tx, balance):
+            return False
+        entry = MempoolEntry(tx, next(self.sequence))
+        if self.total_bytes + entry.size > self.max_bytes and not self._make_room(entry):
+            return False
+
+        self.entries[tx.tx_id] = entry
+        self.by_sender.setdefault(tx.sender, set()).add(tx.tx_id)
+        self.outflow[tx.sender] = self.outflow.get(tx.sender, 0) + tx.amount + tx.fee
+        self.total_bytes += entry.size
+        heapq.heappush(self.best, (-entry.fee_rate, entry.seq, tx.tx_id))
+        heapq.heappush(self.worst, (entry.fee_rate, -entry.seq, tx.tx_id))
+        self.transactions.append(tx)
+        if self.journal:
+            self.journal.record_add(tx)
+        return True
+
+    def _make_room(self, entry):
+        """Evict the cheapest entries until ``entry`` fits; False if they pay as much."""
+        evicted = []
+        freed = 0
+        needed = self.total_bytes + entry.size - self.max_bytes
+        while freed < needed:
+            cheapest = self._pop_worst()
+            if cheapest is None or cheapest.fee_rate >= entry.fee_rate:
+                if cheapest is not None:
+                    evicted.append(cheapest)
+                for kept in evicted:
+                    heapq.heappush(self.worst, (kept.fee_rate, -kept.seq, kept.tx.tx_id))
+                return False
+            evicted.append(cheapest)
+            freed += cheapest.size
+        self.remove(entry.tx.tx_id for entry in evicted)
+        return True
+
+    def _pop_worst(self):
+        while self.worst:
+            _, neg_seq, tx_id = heapq.heappop(self.worst)
+            entry = self.entries.get(tx_id)
+            if entry is not None and entry.seq == -neg_seq:
+                return entry
+        return None
+
+    def remove(self, tx_ids):
+        """Drop the given transactions, ignoring ids that are not pending."""
+        removed = []
+        for tx_id in tx_ids:
+            entry = self.entries.pop(tx_id, None)
+            if entry is None:
+                continue
+            removed.append(tx_id)
+            sender = entry.tx.sender
+            self.by_sender[sender].discard(tx_id)
+            if self.by_sender[sender]:
+                self.outflow[sender] -= entry.tx.amount + entry.tx.fee
+            else:
+                del self.by_sender[sender]
+                del self.outflow[sender]
+            self.total_bytes -= entry.size
+        if removed:
+            self.transactions = [tx for tx in self.transactions if tx.tx_id in self.entries]
+            if len(self.best) > 2 * len(self.entries) + 64:
+                self._compact()
+            if self.journal:
+                self.journal.record_remove(removed)
+                self.journal.maybe_compact(self.transactions)
+
+    def enforce_balances(self, senders, get_balance):
+        """Evict each sender's cheapest transactions until their balance covers the rest."""
+        evicted = []
+        for sender in senders:
+            tx_ids = self.by_sender.get(sender)
+            if not tx_ids:
+                continue
+            excess = self.outflow[sender] - get_balance(sender)
+            for entry in sorted((self.entries[tx_id] for tx_id in tx_ids), key=lambda e: e.fee_rate):
+                if excess <= 0:
+                    break
+                evicted.append(entry.tx.tx_id)
+                excess -= entry.tx.amount + entry.tx.fee
+        self.remove(evicted)
+
+    def _compact(self):
+        """Rebuild the heaps without removed entries."""
+        self.best = [(-e.fee_rate, e.seq, tx_id) for tx_id, e in self.entries.items()]
+        self.worst = [(e.fee_rate, -e.seq, tx_id) for tx_id, e in self.entries.items()]
+        heapq.heapify(self.best)
+        heapq.heapify(self.worst)
+
+    def select(self, count):
+        """Up to ``count`` transactions, highest fee rate first.
+
+        Walks the heap best-first from its root instead of popping it, so
+        it costs O(count log count) plus skipped removed entries, and
+        leaves the pool untouched.
+        """
+        heap = self.best
+        chosen = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(chosen) < count:
+            (_, seq, tx_id), position = heapq.heappop(frontier)
+            entry = self.entries.get(tx_id)
+            if entry is not None and entry.seq == seq:
+                chosen.append(entry.tx)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return chosen
+
+
+class MempoolJournal:
+    """Append-only log of mempool changes, kept apart from the chain files.
+
+    Each line is one JSON record, ``{"add": tx}`` or ``{"remove": [tx_id, ...]}``,
+    so admitting a transaction costs one short append regardless of chain or
+    mempool size. Once the log holds many more records than there are
+    pending transactions, it is compacted by rewriting one ``add`` per
+    pending transaction. A torn last line left by a crash is skipped on load.
+    """
+
+    COMPACT_SLACK = 1000  # records beyond twice the live count before compacting
+
+    def __init__(self, path=Config.MEMPOOL_FILE):
+        self.path = path
+        self.records = 0
+        self.file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Replay the log; return the pending transactions in arrival order."""
+        pending = {}
+        records = 0
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records += 1
+                if 'add' in record:
+                    pending[record['add']['tx_id']] = record['add']
+                for tx_id in record.get('remove', []):
+                    pending.pop(tx_id, None)
+        self.records = records
+        return [Transaction.from_dict(data) for data in pending.values()]
+
+    def _replaced(self):
+        """Whether the file we append to is no longer the one at ``path``."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _append(self, record):
+        if self.file is not None and self._replaced():
+            self.file.close()
+            self.file = None
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.file.flush()
+        self.records += 1
+
+    def record_add(self, tx):
+        self._append({'add': tx.to_dict()})
+
+    def record_remove(self, tx_ids):
+        if tx_ids:
+            self._append({'remove': list(tx_ids)})
+
+    def maybe_compact(self, transactions):
+        if self.records > 2 * len(transactions) + self.COMPACT_SLACK:
+            self.compact(transactions)
+
+    def compact(self, transactions):
+        """Rewrite the log as one ``add`` record per pending transaction."""
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            for tx in transactions:
+                f.write(json.dumps({'add': tx.to_dict()}, separators=(',', ':')) + '\n')
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        os.replace(tmp_file, self.path)
+        self.records = len(transactions)
@@ -0,0 +1,35 @@
+import hashlib
+
+EMPTY_ROOT = '0' * 64
+
+
+def hash_to_bytes(value):
+    """Return the raw 32 bytes of a hex hash, hashing non-hex legacy values."""
+    try:
+        raw = bytes.fromhex(value)
+        if len(raw) == 32:
+            return raw
+    except (TypeError, ValueError):
+        pass
+    return hashlib.sha256(str(value).encode()).digest()
+
+
+def _hash_pair(left, right):
+    return hashlib.sha256(hashlib.sha256(left + right).digest()).digest()
+
+
+def merkle_root(tx_ids):
+    """Compute the Merkle root of a list of transaction ids.
+
+    Pairs are hashed with double SHA-256 and an odd last node is paired with
+    itself, as in Bitcoin.
+    """
+    level = [hash_to_bytes(tx_id) for tx_id in tx_ids]
+    if not level:
+        return EMPTY_ROOT
+
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0].hex()
@@ -0,0 +1,32 @@
+"""
+Process-wide chain state service.
+
+Every component (web app, REST API, socket.io handlers, miners, P2P node)
+shares the single Blockchain returned by ``get_blockchain()``. It is loaded
+from the data directory once, on first use, and is the only object in the
+process that reads or writes the block log and index files.
+
+Ownership model for writers:
+- Blocks enter the chain only through ``add_block``, ``connect_branch`` or
+  ``replace_chain`` (called by the miner and the P2P node).
+- Transactions enter the mempool only through ``add_transaction`` or
+  ``add_transactions`` (called by the API, socket.io handlers and the node).
+- Nobody assigns to ``chain`` or ``pending_transactions`` directly; web
+  handlers are readers only and go through ``blockchain.snapshot``.
+"""
+
+import threading
+from .blockchain import Blockchain
+
+_blockchain = None
+_lock = threading.Lock()
+
+
+def get_blockchain():
+    """Return the shared Blockchain, loading it on first call."""
+    global _blockchain
+    if _blockchain is None:
+        with _lock:
+            if _blockchain is None:
+                _blockchain = Blockchain()
+    return _blockchain
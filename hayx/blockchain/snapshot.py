@@ -0,0 +1,49 @@
+class ChainSnapshot:
+    """Immutable view of the chain at one tip.
+
+    Blockchain publishes a new snapshot after every write, and readers take
+    the current one without locking. The snapshot shares the chain and
+    mempool lists with the writer instead of copying them. It stays
+    consistent because the writer only ever appends to those lists in
+    place, and builds new lists for anything else (reorgs, removing mined
+    transactions). A snapshot only looks at the first ``height`` /
+    ``pending_count`` entries.
+    """
+
+    __slots__ = ('blocks', 'height', 'pending', 'pending_count', 'difficulty', 'total_supply')
+
+    def __init__(self, blocks, pending, difficulty, total_supply):
+        self.blocks = blocks
+        self.height = len(blocks)
+        self.pending = pending
+        self.pending_count = len(pending)
+        self.difficulty = difficulty
+        self.total_supply = total_supply
+
+    def __len__(self):
+        return self.height
+
+    def get_block(self, height):
+        if not 0 <= height < self.height:
+            raise IndexError(height)
+        return self.blocks[height]
+
+    def get_latest_block(self):
+        return self.blocks[self.height - 1] if self.height else None
+
+    @property
+    def tip_hash(self):
+        latest = self.get_latest_block()
+        return latest.hash if latest else None
+
+    def iter_blocks(self, start=0, end=None):
+        end = self.height if end is None else min(end, self.height)
+        for height in range(start, end):
+            yield self.blocks[height]
+
+    def tail(self, count):
+        """The last ``count`` blocks, oldest first."""
+        return [self.blocks[height] for height in range(max(0, self.height - count), self.height)]
+
+    def pending_transactions(self):
+        return self.pending[:self.pending_count]
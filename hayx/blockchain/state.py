@@ -0,0 +1,99 @@
+import os
+import json
+from config import Config
+
+
+class AccountState:
+    """Address balances maintained incrementally as blocks are connected.
+
+    ``apply_block`` and ``undo_block`` move the state forward and backward by
+    one block, so balance lookups never rescan the chain. A snapshot is
+    written to disk periodically; on restart only the blocks above the
+    snapshot height are replayed.
+    """
+
+    def __init__(self, state_file=Config.STATE_FILE):
+        self.state_file = state_file
+        self.balances = {}
+        self.total_supply = 0.0
+        self.height = 0
+        self.tip_hash = None
+
+    @staticmethod
+    def block_deltas(block):
+        """Net balance change per address caused by a block."""
+        deltas = {}
+        for tx in block.transactions:
+            if tx.sender != "coinbase":
+                deltas[tx.sender] = deltas.get(tx.sender, 0) - (tx.amount + tx.fee)
+            deltas[tx.recipient] = deltas.get(tx.recipient, 0) + tx.amount
+        return deltas
+
+    def _apply_deltas(self, deltas, sign):
+        for address, delta in deltas.items():
+            self.balances[address] = self.balances.get(address, 0) + sign * delta
+            self.total_supply += sign * delta
+
+    def apply_block(self, block):
+        """Connect a block on top of the current state."""
+        self._apply_deltas(self.block_deltas(block), 1)
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def undo_block(self, block, previous_hash=None):
+        """Disconnect the tip block, restoring the state below it."""
+        self._apply_deltas(self.block_deltas(block), -1)
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+
+    def rebuild(self, chain):
+        """Recompute the state from scratch."""
+        self.balances = {}
+        self.total_supply = 0.0
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block)
+
+    def get_balance(self, address):
+        return self.balances.get(address, 0)
+
+    def save(self):
+        """Write a snapshot of the state atomically."""
+        payload = {
+            'height': self.height,
+            'tip_hash': self.tip_hash,
+            'total_supply': self.total_supply,
+            'balances': self.balances
+        }
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_file, self.state_file)
+
+    def load(self, chain):
+        """Restore from the last snapshot and replay blocks above it.
+
+        Falls back to a full rebuild when the snapshot is missing, corrupt or
+        no longer on ``chain``.
+        """
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+            height = data['height']
+            if 0 < height <= len(chain) and chain[height - 1].hash == data['tip_hash']:
+                self.balances = data['balances']
+                self.total_supply = data['total_supply']
+                self.height = height
+                self.tip_hash = data['tip_hash']
+                for block in chain[height:]:
+                    self.apply_block(block)
+                return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to load account state: {e}")
+
+        print("🔄 Rebuilding account state from chain…")
+        self.rebuild(chain)
+        self.save()
@@ -0,0 +1,213 @@
+import os
+import json
+import struct
+import zlib
+from .block import Block
+from config import Config
+
+# Record header: payload length, CRC32 of payload
+RECORD_HEADER = struct.Struct('>II')
+# Index entry: segment number, byte offset, payload length
+INDEX_ENTRY = struct.Struct('>IQI')
+
+
+class CorruptRecordError(IOError):
+    """Raised when a stored block record does not match its checksum."""
+
+
+class BlockStore:
+    """Segmented append-only block log.
+
+    Every block is written once as a length-prefixed, checksummed record to
+    the current ``blkNNNNN.log`` segment. ``index.dat`` holds one fixed-size
+    entry per height pointing at its record, so reads are a single seek.
+    On open the tail of the log is checked and any torn record left by a
+    crash is cut off before new blocks are appended. Every read checks the
+    record's checksum and raises CorruptRecordError if it does not match.
+    """
+
+    def __init__(self, directory=Config.BLOCKS_DIR, segment_size=Config.BLOCK_SEGMENT_SIZE,
+                 fsync=Config.BLOCK_LOG_FSYNC):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.index_file = os.path.join(directory, 'index.dat')
+        self.entries = []
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"blk{segment:05d}.log")
+
+    def _segments(self):
+        """List segment numbers present on disk, in order."""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith('blk') and name.endswith('.log'):
+                try:
+                    segments.append(int(name[3:-4]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _recover(self):
+        """Load the offset index and repair the log tail after a crash."""
+        entries = []
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'rb') as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX_ENTRY.size
+            entries = [INDEX_ENTRY.unpack_from(raw, pos) for pos in range(0, usable, INDEX_ENTRY.size)]
+
+        # Drop index entries whose records did not fully reach the log
+        sizes = {seg: os.path.getsize(self._segment_path(seg)) for seg in self._segments()}
+        while entries:
+            segment, offset, length = entries[-1]
+            if sizes.get(segment, -1) >= offset + RECORD_HEADER.size + length:
+                break
+            entries.pop()
+
+        # Index any complete records written after the last indexed one
+        if entries:
+            segment, offset, length = entries[-1]
+            position = offset + RECORD_HEADER.size + length
+        else:
+            segment, position = (self._segments() or [0])[0], 0
+
+        recovered = 0
+        for seg in [s for s in self._segments() if s >= segment]:
+            start = position if seg == segment else 0
+            scanned, end, intact = self._scan_segment(seg, start)
+            entries.extend(scanned)
+            recovered += len(scanned)
+            if not intact:
+                print(f"⚠️ Truncating torn record in {os.path.basename(self._segment_path(seg))} at offset {end}")
+                with open(self._segment_path(seg), 'r+b') as f:
+                    f.truncate(end)
+                for later in [s for s in self._segments() if s > seg]:
+                    os.remove(self._segment_path(later))
+                break
+
+        self.entries = entries
+        if recovered or not os.path.exists(self.index_file) or \
+                os.path.getsize(self.index_file) != len(entries) * INDEX_ENTRY.size:
+            self._rewrite_index()
+        if recovered:
+            print(f"🔧 Recovered {recovered} unindexed block records")
+
+    def _scan_segment(self, segment, start):
+        """Scan records from ``start``; return (entries, end offset, intact)."""
+        entries = []
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(start)
+            position = start
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if not header:
+                    return entries, position, True
+                if len(header) < RECORD_HEADER.size:
+                    return entries, position, False
+                length, checksum = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    return entries, position, False
+                entries.append((segment, position, length))
+                position += RECORD_HEADER.size + length
+
+    def _rewrite_index(self):
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            for entry in self.entries:
+                f.write(INDEX_ENTRY.pack(*entry))
+            self._sync(f)
+        os.replace(tmp_file, self.index_file)
+
+    def append(self, block):
+        """Append one block as a single record and index it."""
+        if block.index != len(self.entries):
+            raise ValueError(f"Block #{block.index} does not extend stored height {len(self.entries)}")
+
+        payload = json.dumps(block.to_dict(), separators=(',', ':')).encode()
+        if self.entries:
+            segment, offset, length = self.entries[-1]
+            position = offset + RECORD_HEADER.size + length
+            if position + RECORD_HEADER.size + len(payload) > self.segment_size:
+                segment, position = segment + 1, 0
+        else:
+            segment, position = 0, 0
+
+        entry = (segment, position, len(payload))
+        try:
+            with open(self._segment_path(segment), 'ab') as f:
+                f.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+                f.write(payload)
+                self._sync(f)
+            with open(self.index_file, 'ab') as f:
+                f.write(INDEX_ENTRY.pack(*entry))
+                self._sync(f)
+        except BaseException:
+            # Leave no partial record behind for the next append to land after
+            self._discard_from(segment, position)
+            raise
+        self.entries.append(entry)
+
+    def _discard_from(self, segment, position):
+        """Cut the log back to ``position`` in ``segment`` and rewrite the index to match."""
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) > position:
+            with open(path, 'r+b') as f:
+                f.truncate(position)
+        self._rewrite_index()
+
+    def _read_payload(self, f, entry):
+        segment, offset, length = entry
+        f.seek(offset)
+        header = f.read(RECORD_HEADER.size)
+        payload = f.read(length)
+        if len(header) == RECORD_HEADER.size:
+            stored_length, checksum = RECORD_HEADER.unpack(header)
+            if stored_length == length and len(payload) == length and zlib.crc32(payload) == checksum:
+                return json.loads(payload)
+        raise CorruptRecordError(f"Block record at {self._segment_path(segment)}:{offset} failed its checksum")
+
+    def read(self, height):
+        """Read the block stored at ``height``."""
+        entry = self.entries[height]
+        with open(self._segment_path(entry[0]), 'rb') as f:
+            return Block.from_dict(self._read_payload(f, entry))
+
+    def iter_blocks(self, start=0):
+        """Yield stored blocks from ``start`` upwards, one segment open at a time."""
+        current, f = None, None
+        try:
+            for entry in self.entries[start:]:
+                if entry[0] != current:
+                    if f:
+                        f.close()
+                    current = entry[0]
+                    f = open(self._segment_path(current), 'rb')
+                yield Block.from_dict(self._read_payload(f, entry))
+        finally:
+            if f:
+                f.close()
+
+    def truncate(self, height):
+        """Discard every stored block at or above ``height``."""
+        if height >= len(self.entries):
+            return
+        segment, offset, _ = self.entries[height]
+        with open(self._segment_path(segment), 'r+b') as f:
+            f.truncate(offset)
+        for later in [s for s in self._segments() if s > segment]:
+            os.remove(self._segment_path(later))
+        self.entries = self.entries[:height]
+        self._rewrite_index()
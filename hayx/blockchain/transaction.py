@@ -1,7 +1,42 @@
 import json
 import hashlib
+import math
 import time
-from hayx.crypto.keys import KeyPair
+from hayx.crypto.keys import KeyPair, address_from_public_key, verify_signature
+from hayx.utils.lru import LRUCache
+from config import Config
+
+# (tx_id, signature, public key) triples whose signature checked out
+_verified_signatures = LRUCache(Config.SIGNATURE_CACHE_SIZE)
+
+def remember_verified(transactions):
+    """Record signatures verified in another process, so they are not checked again here"""
+    for tx in transactions:
+        if tx.signature and tx.public_key is not None and tx.tx_id == tx.calculate_hash():
+            _verified_signatures.add((tx.tx_id, tx.signature, tx.public_key))
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_well_formed(item):
+    """Whether a submitted dict has every transaction field, each of the right type"""
+    if not isinstance(item, dict):
+        return False
+    if not all(isinstance(item.get(key), str) for key in ('tx_id', 'sender', 'recipient')):
+        return False
+    if not all(_is_number(item.get(key)) for key in ('amount', 'fee', 'timestamp')):
+        return False
+    return all(item.get(key) is None or isinstance(item[key], str) for key in ('signature', 'public_key'))
+
+def parse_transactions(items):
+    """Transactions from submitted dicts, with None for any that are malformed"""
+    transactions = []
+    for item in items:
+        try:
+            transactions.append(Transaction.from_dict(item) if _is_well_formed(item) else None)
+        except (OverflowError, ValueError):
+            transactions.append(None)
+    return transactions
 
 class Transaction:
     def __init__(self, sender, recipient, amount, fee=0.01):
@@ -11,6 +46,7 @@ class Transaction:
         self.fee = float(fee)
         self.timestamp = time.time()
         self.signature = None
+        self.public_key = None  # signer's key; absent on transactions from older versions
         self.tx_id = self.calculate_hash()
     
     def calculate_hash(self):
@@ -26,6 +62,7 @@ class Transaction:
         keypair = KeyPair(private_key_hex)
         message = f"{self.sender}{self.recipient}{self.amount}{self.fee}"
         self.signature = keypair.sign_message(message)
+        self.public_key = keypair.get_public_key_hex()
         return True
     
     def verify_signature(self, public_key_hex):
@@ -35,14 +72,43 @@ class Transaction:
             
         if not self.signature:
             return False
-            
-        keypair = KeyPair()
+        
+        # A remembered check only vouches for this tx if its id matches its contents
+        cache_key = (self.tx_id, self.signature, public_key_hex)
+        id_matches = self.tx_id == self.calculate_hash()
+        if id_matches and cache_key in _verified_signatures:
+            return True
+        
         message = f"{self.sender}{self.recipient}{self.amount}{self.fee}"
-        return keypair.verify_signature(message, self.signature, public_key_hex)
+        if not verify_signature(message, self.signature, public_key_hex):
+            return False
+        if id_matches:
+            _verified_signatures.add(cache_key)
+        return True
+    
+    def has_valid_amounts(self):
+        """Whether the amount is positive and the fee not negative, both finite"""
+        return (math.isfinite(self.amount) and math.isfinite(self.fee)
+                and self.amount > 0 and self.fee >= 0)
+    
+    def has_valid_signature(self):
+        """Signature check used when validating transactions and blocks.
+        
+        Transactions that carry their public key must be signed with it, and
+        it must belong to the sender address. Older transactions without one
+        can only be checked for having a signature.
+        """
+        if self.sender == "coinbase":
+            return True
+        if not self.signature:
+            return False
+        if self.public_key is None:
+            return True
+        return address_from_public_key(self.public_key) == self.sender and self.verify_signature(self.public_key)
     
     def to_dict(self):
         """Convert transaction to dictionary"""
-        return {
+        data = {
             'tx_id': self.tx_id,
             'sender': self.sender,
             'recipient': self.recipient,
@@ -51,6 +117,9 @@ class Transaction:
             'timestamp': self.timestamp,
             'signature': self.signature
         }
+        if self.public_key is not None:
+            data['public_key'] = self.public_key
+        return data
     
     @classmethod
     def from_dict(cls, data):
@@ -59,6 +128,7 @@ class Transaction:
         tx.tx_id = data['tx_id']
         tx.timestamp = data['timestamp']
         tx.signature = data.get('signature')
+        tx.public_key = data.get('public_key')
         return tx
     
     def __str__(self):
@@ -0,0 +1,110 @@
+import os
+import json
+from bisect import bisect_left
+from config import Config
+
+
+class TransactionIndex:
+    """Inverted index from addresses and tx ids to chain positions.
+
+    Each address maps to an ascending list of ``(block height, tx position)``
+    entries, so a page of history is a bisect plus a slice instead of a walk
+    over the whole chain. Maintained block by block alongside the account
+    state and snapshotted the same way.
+    """
+
+    def __init__(self, index_file=Config.TX_INDEX_FILE):
+        self.index_file = index_file
+        self.by_address = {}
+        self.by_tx_id = {}
+        self.height = 0
+        self.tip_hash = None
+
+    def apply_block(self, block):
+        """Index the transactions of a newly connected block."""
+        for position, tx in enumerate(block.transactions):
+            entry = (block.index, position)
+            self.by_tx_id[tx.tx_id] = entry
+            for address in {tx.sender, tx.recipient} - {"coinbase"}:
+                self.by_address.setdefault(address, []).append(entry)
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def undo_block(self, block, previous_hash=None):
+        """Remove the entries of the disconnected tip block."""
+        for position, tx in enumerate(block.transactions):
+            if self.by_tx_id.get(tx.tx_id) == (block.index, position):
+                del self.by_tx_id[tx.tx_id]
+            for address in {tx.sender, tx.recipient} - {"coinbase"}:
+                entries = self.by_address.get(address)
+                while entries and entries[-1][0] >= block.index:
+                    entries.pop()
+                if entries == []:
+                    del self.by_address[address]
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+
+    def rebuild(self, chain):
+        """Recompute the index from scratch."""
+        self.by_address = {}
+        self.by_tx_id = {}
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block)
+
+    def get_location(self, tx_id):
+        """Return ``(height, position)`` of a confirmed transaction, or None."""
+        return self.by_tx_id.get(tx_id)
+
+    def get_page(self, address, before=None, limit=20):
+        """Return up to ``limit`` entries for ``address``, newest first.
+
+        ``before`` is an exclusive ``(height, position)`` upper bound taken
+        from the last entry of the previous page.
+        """
+        entries = self.by_address.get(address, [])
+        end = len(entries) if before is None else bisect_left(entries, tuple(before))
+        start = max(0, end - limit)
+        page = entries[start:end][::-1]
+        has_more = start > 0
+        return page, has_more
+
+    def save(self):
+        """Write a snapshot of the index atomically."""
+        payload = {
+            'height': self.height,
+            'tip_hash': self.tip_hash,
+            'by_address': self.by_address,
+            'by_tx_id': self.by_tx_id
+        }
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_file, self.index_file)
+
+    def load(self, chain):
+        """Restore from the last snapshot and index blocks above it."""
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+            height = data['height']
+            if 0 < height <= len(chain) and chain[height - 1].hash == data['tip_hash']:
+                self.by_address = {
+                    address: [tuple(entry) for entry in entries]
+                    for address, entries in data['by_address'].items()
+                }
+                self.by_tx_id = {tx_id: tuple(entry) for tx_id, entry in data['by_tx_id'].items()}
+                self.height = height
+                self.tip_hash = data['tip_hash']
+                for block in chain[height:]:
+                    self.apply_block(block)
+                return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to load transaction index: {e}")
+
+        print("🔄 Rebuilding transaction index from chain…")
+        self.rebuild(chain)
+        self.save()
@@ -0,0 +1,133 @@
+"""
+Chain validation across worker processes.
+
+Most of the work in checking a chain is per block and needs nothing but
+the block itself: recomputing transaction ids, the Merkle root and the
+block hash, and verifying signatures. That part is split into chunks of
+consecutive blocks and checked in a process pool. What depends on block
+order, the links between consecutive blocks, is checked in this process.
+Batches of submitted transactions have their signatures checked the same
+way.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .transaction import remember_verified
+from hayx.utils.processes import worker_context
+from config import Config
+
+
+def _check_contents(blocks):
+    """Worker: whether every block in a chunk has valid contents."""
+    return all(block.has_valid_contents() for block in blocks)
+
+
+def _check_signatures(transactions):
+    """Worker: has_valid_signature() of each transaction in a chunk."""
+    return [tx.has_valid_signature() for tx in transactions]
+
+
+class ChainValidator:
+    """Validates runs of blocks and transaction batches, fanning the work out to processes.
+
+    Chains with fewer than ``min_transactions`` transactions, and batches
+    with fewer than ``min_signatures``, are checked here, since shipping
+    them to the workers costs more than checking them. The pool starts on
+    first use and is kept for later work.
+    """
+
+    CHUNKS_PER_WORKER = 4  # smaller chunks even out blocks of different sizes
+
+    def __init__(self, workers=None, min_transactions=Config.PARALLEL_VALIDATION_MIN_TXS,
+                 min_signatures=Config.PARALLEL_VERIFY_MIN_TXS):
+        self.workers = workers or Config.VALIDATION_WORKERS or os.cpu_count() or 1
+        self.min_transactions = min_transactions
+        self.min_signatures = min_signatures
+        self.executor = None
+
+    def start(self):
+        """Start the worker processes."""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=worker_context())
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    @staticmethod
+    def is_linked(chain):
+        """Whether each block builds on the one before it."""
+        for i in range(1, len(chain)):
+            curr, prev = chain[i], chain[i-1]
+            if curr.previous_hash != prev.hash or curr.index != prev.index + 1:
+                return False
+        return True
+
+    @staticmethod
+    def has_unique_transactions(chain):
+        """Whether no transaction id appears twice in the chain."""
+        tx_ids = [tx.tx_id for block in chain for tx in block.transactions]
+        return len(tx_ids) == len(set(tx_ids))
+
+    def _chunks(self, blocks, transactions):
+        """Consecutive runs of blocks with about the same number of transactions."""
+        target = transactions // (self.workers * self.CHUNKS_PER_WORKER) + 1
+        chunk = []
+        size = 0
+        for block in blocks:
+            chunk.append(block)
+            size += len(block.transactions) + 1
+            if size >= target:
+                yield chunk
+                chunk = []
+                size = 0
+        if chunk:
+            yield chunk
+
+    def validate(self, chain):
+        """Whether ``chain`` is linked, repeats no transaction and every block after the first is valid.
+
+        The first block is trusted; it is our genesis or a block we already
+        accepted.
+        """
+        if not self.is_linked(chain) or not self.has_unique_transactions(chain):
+            return False
+        blocks = chain[1:]
+        transactions = sum(len(block.transactions) for block in blocks)
+        if self.workers == 1 or transactions < self.min_transactions:
+            return _check_contents(blocks)
+
+        self.start()
+        futures = [self.executor.submit(_check_contents, chunk)
+                   for chunk in self._chunks(blocks, transactions)]
+        try:
+            return all(future.result() for future in futures)
+        except BrokenProcessPool:
+            # A worker died; check here and start a fresh pool next time
+            self.executor = None
+            return _check_contents(blocks)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def verify_signatures(self, transactions):
+        """has_valid_signature() of each transaction, in order."""
+        if self.workers == 1 or len(transactions) < self.min_signatures:
+            return _check_signatures(transactions)
+
+        self.start()
+        size = len(transactions) // (self.workers * self.CHUNKS_PER_WORKER) + 1
+        chunks = [transactions[i:i + size] for i in range(0, len(transactions), size)]
+        results = []
+        try:
+            for chunk_results in self.executor.map(_check_signatures, chunks):
+                results += chunk_results
+        except BrokenProcessPool:
+            self.executor = None
+            return _check_signatures(transactions)
+        # So mining and block checks here do not verify them again
+        remember_verified([tx for tx, valid in zip(transactions, results) if valid])
+        return results
@@ -1,8 +1,45 @@
 import hashlib
 import ecdsa
 from ecdsa import SigningKey, SECP256k1
+from ecdsa.ellipticcurve import PointJacobi
 import binascii
 import os
+from hayx.utils.lru import LRUCache
+from config import Config
+
+# public key hex -> [VerifyingKey, verifications so far]
+_verifying_keys = LRUCache(Config.VERIFYING_KEY_CACHE_SIZE)
+
+def load_verifying_key(public_key_hex):
+    """Parsed public key, cached; keys in regular use get a precomputed multiplication table"""
+    cached = _verifying_keys.get(public_key_hex)
+    if cached is None:
+        # Give the point its order so ecdsa can precompute for it
+        point = PointJacobi.from_bytes(
+            SECP256k1.curve, binascii.unhexlify(public_key_hex), order=SECP256k1.order
+        )
+        cached = [ecdsa.VerifyingKey.from_public_point(point, curve=SECP256k1), 0]
+        _verifying_keys.put(public_key_hex, cached)
+    cached[1] += 1
+    if cached[1] == Config.VERIFYING_KEY_PRECOMPUTE_AFTER:
+        # Costs about as much as a few dozen verifications, so only for busy keys
+        cached[0].precompute()
+    return cached[0]
+
+def verify_signature(message, signature, public_key_hex):
+    """Verify a hex signature of ``message`` by a hex public key"""
+    try:
+        message_hash = hashlib.sha256(message.encode()).digest()
+        return load_verifying_key(public_key_hex).verify(binascii.unhexlify(signature), message_hash)
+    except Exception:
+        return False
+
+def address_from_public_key(public_key_hex):
+    """Wallet address of a hex public key"""
+    sha256_hash = hashlib.sha256(public_key_hex.encode()).hexdigest()
+    ripemd160 = hashlib.new('ripemd160')
+    ripemd160.update(sha256_hash.encode())
+    return ripemd160.hexdigest()[:20]  # Take first 20 characters
 
 class KeyPair:
     def __init__(self, private_key=None):
@@ -23,11 +60,7 @@ class KeyPair:
     
     def get_address(self):
         """Generate wallet address from public key"""
-        public_key_hex = self.get_public_key_hex()
-        sha256_hash = hashlib.sha256(public_key_hex.encode()).hexdigest()
-        ripemd160 = hashlib.new('ripemd160')
-        ripemd160.update(sha256_hash.encode())
-        return ripemd160.hexdigest()[:20]  # Take first 20 characters
+        return address_from_public_key(self.get_public_key_hex())
     
     def sign_message(self, message):
         """Sign a message with private key"""
@@ -37,11 +70,4 @@ class KeyPair:
     
     def verify_signature(self, message, signature, public_key_hex):
         """Verify signature using public key"""
-        try:
-            public_key = ecdsa.VerifyingKey.from_string(
-                binascii.unhexlify(public_key_hex), curve=SECP256k1
-            )
-            message_hash = hashlib.sha256(message.encode()).digest()
-            return public_key.verify(binascii.unhexlify(signature), message_hash)
-        except:
-            return False
+        return verify_signature(message, signature, public_key_hex)
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import deque
+
+
+class HashRateMeter:
+    """Measured hash rate from attempt counts reported by the PoW loop.
+
+    ``record`` is fed the number of hashes actually computed; a rate is the
+    growth of the cumulative count over a trailing time window.
+    """
+
+    def __init__(self, instant_window=2.0, window=60.0):
+        self.instant_window = instant_window
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start measuring from now."""
+        with self.lock:
+            self.started = time.time()
+            self.total = 0
+            self.samples = deque()
+
+    def record(self, count):
+        """Add ``count`` hashes computed just now."""
+        now = time.time()
+        with self.lock:
+            self.total += count
+            self.samples.append((now, self.total))
+            # Keep one sample at or before the start of the longest window
+            while len(self.samples) > 1 and self.samples[1][0] <= now - self.window:
+                self.samples.popleft()
+
+    def rate(self, window=None):
+        """Hashes per second over the last ``window`` seconds."""
+        window = self.window if window is None else window
+        now = time.time()
+        with self.lock:
+            start = max(now - window, self.started)
+            base = 0
+            for sample_time, sample_count in reversed(self.samples):
+                if sample_time <= start:
+                    base = sample_count
+                    break
+            elapsed = now - start
+            return (self.total - base) / elapsed if elapsed > 0 else 0.0
+
+    def instantaneous(self):
+        """Hashes per second over the short instant window."""
+        return self.rate(self.instant_window)
@@ -0,0 +1,47 @@
+import threading
+import time
+from config import Config
+
+
+class MiningJob:
+    """One attempt at solving a block template.
+
+    The PoW loop polls ``should_stop`` between hash batches, so a job can be
+    abandoned from any thread within one batch: ``cancel`` is used when the
+    chain tip moves under the template, and ``notify_mempool_changed`` lets
+    the job go stale so a fresh template picks up new transactions.
+    """
+
+    def __init__(self, block, difficulty, refresh_interval=Config.TEMPLATE_REFRESH_INTERVAL):
+        self.block = block
+        self.difficulty = difficulty
+        self.refresh_interval = refresh_interval
+        self.created = time.time()
+        self.cancelled = threading.Event()
+        self.reason = None
+        self.mempool_changed = False
+
+    def cancel(self, reason):
+        """Stop working on this template."""
+        if not self.cancelled.is_set():
+            self.reason = reason
+            self.cancelled.set()
+
+    def notify_mempool_changed(self):
+        """Mark the template for refresh if it still has room for transactions."""
+        if len(self.block.transactions) < Config.MAX_TRANSACTIONS_PER_BLOCK:
+            self.mempool_changed = True
+
+    def should_stop(self):
+        if self.cancelled.is_set():
+            return True
+        if self.mempool_changed and time.time() - self.created >= self.refresh_interval:
+            self.cancel("mempool changed")
+            return True
+        return False
+
+    def run(self, pow_backend=None, progress=None):
+        """Mine the template; True if solved, False if cancelled."""
+        if pow_backend is None:
+            return self.block.mine_block(self.difficulty, progress, self.should_stop)
+        return pow_backend.mine(self.block, self.difficulty, progress, self.should_stop)
@@ -1,17 +1,27 @@
 import threading
 import time
 from datetime import datetime, timedelta
-from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.service import get_blockchain
 from hayx.blockchain.transaction import Transaction
+from .parallel import ParallelMiner
+from .hashrate import HashRateMeter
+from .job import MiningJob
 from config import Config
 
 class Miner:
-    def __init__(self, wallet_address):
+    def __init__(self, wallet_address, workers=1, blockchain=None):
         self.wallet_address = wallet_address
-        self.blockchain = Blockchain()
+        self.blockchain = blockchain or get_blockchain()
+        # workers > 1 (or 0 for one per core) mines on a process pool
+        self.workers = workers
+        self.pow_backend = ParallelMiner(workers or None) if workers != 1 else None
         self.is_mining = False
         self.mining_thread = None
+        self.current_job = None
         self.hash_rate = 0
+        self.hash_rate_avg = 0
+        self.hash_rate_meter = HashRateMeter()
+        self.last_rate_update = 0
         self.blocks_mined = 0
         self.last_block_time = None
         self.hash_rate_history = []
@@ -25,6 +35,8 @@ class Miner:
         if not self.is_mining:
             self.is_mining = True
             self.mining_start_time = time.time()
+            self.hash_rate_meter.reset()
+            self.blockchain.subscribe(self._on_chain_event)
             self.mining_thread = threading.Thread(target=self._mine_loop)
             self.mining_thread.daemon = True
             self.mining_thread.start()
@@ -33,83 +45,93 @@ class Miner:
     def stop_mining(self):
         """Stop mining process"""
         self.is_mining = False
+        self.blockchain.unsubscribe(self._on_chain_event)
+        job = self.current_job
+        if job:
+            job.cancel("mining stopped")
         if self.mining_thread:
             self.mining_thread.join()
+        if self.pow_backend:
+            self.pow_backend.close()
         print("🛑 Mining stopped")
     
+    def _record_hashes(self, count):
+        """Progress callback from the PoW loop with hashes actually computed"""
+        self.total_hash_count += count
+        self.hash_rate_meter.record(count)
+        self._update_hash_rate()
+
+    def _update_hash_rate(self):
+        """Refresh instantaneous and windowed hash rate once per second"""
+        current_time = time.time()
+        if current_time - self.last_rate_update >= 1:
+            self.hash_rate = self.hash_rate_meter.instantaneous()
+            self.hash_rate_avg = self.hash_rate_meter.rate()
+            self._add_hash_rate_to_history(self.hash_rate)
+            self.last_rate_update = current_time
+
+    def _on_chain_event(self, event):
+        """Chain listener: drop or refresh the job when its template goes stale"""
+        job = self.current_job
+        if job is None:
+            return
+        if event == 'tip':
+            job.cancel("chain tip changed")
+        elif event == 'mempool':
+            job.notify_mempool_changed()
+
     def _mine_loop(self):
-        """Main mining loop with improved algorithm"""
-        last_hash_time = time.time()
-        hash_count = 0
+        """Main mining loop: mine block templates as cancellable jobs"""
         block_start_time = time.time()
         
         while self.is_mining:
             try:
                 # Calculate current difficulty based on target block time
                 self._adjust_difficulty()
+                self._update_hash_rate()
+                
+                # Mine when there are pending transactions, or an empty block after target time
+                has_pending = self.blockchain.snapshot.pending_count > 0
+                if not has_pending and time.time() - block_start_time < self.target_block_time:
+                    time.sleep(0.1)
+                    continue
                 
-                # Simulate hash rate while mining
-                hash_count += 1000  # Simulate 1000 hashes per iteration
-                self.total_hash_count += 1000
+                template = self.blockchain.create_block_template(self.wallet_address)
+                job = MiningJob(template, self.blockchain.get_lwma_difficulty())
+                self.current_job = job
+                if not self.is_mining:
+                    break
+                if has_pending:
+                    print(f"⛏️ Mining block with {len(template.transactions) - 1} transactions...")
+                else:
+                    print("⛏️ Mining empty block (no pending transactions)...")
                 
-                # Update hash rate every second
-                current_time = time.time()
-                if current_time - last_hash_time >= 1:
-                    self.hash_rate = self.total_hash_count / (current_time - self.mining_start_time) if (current_time - self.mining_start_time) > 0 else 0
-                    self._add_hash_rate_to_history(self.hash_rate)
-                    last_hash_time = current_time
+                solved = job.run(self.pow_backend, self._record_hashes)
+                self.current_job = None
                 
-                # Check if there are pending transactions or mine empty block
-                if len(self.blockchain.pending_transactions) > 0:
-                    print(f"⛏️ Mining block with {len(self.blockchain.pending_transactions)} transactions...")
-                    
-                    start_time = time.time()
-                    new_block = self.blockchain.mine_pending_transactions(self.wallet_address)
-                    end_time = time.time()
-                    
-                    if new_block:
-                        self.blocks_mined += 1
-                        mining_time = end_time - start_time
-                        self.last_block_time = datetime.now()
-                        reward = self.blockchain.get_block_reward(new_block.index)
-                        print(f"✅ Block #{new_block.index} mined successfully!")
-                        print(f"Hash: {new_block.hash[:16]}...")
-                        print(f"Mining time: {mining_time:.2f} seconds")
-                        print(f"Nonce: {new_block.nonce}")
-                        print(f"Reward: {reward} HayX")
-                        print(f"Hash rate: {self.hash_rate:.2f} H/s")
-                        block_start_time = time.time()
-                    else:
-                        print("❌ Failed to mine block")
-                        time.sleep(1)
+                if not solved:
+                    if self.is_mining:
+                        print(f"🔄 Refreshing block template ({job.reason})")
+                    continue
                 
-                else:
-                    # No pending transactions, mine empty block after target time
-                    elapsed_time = time.time() - block_start_time
-                    if elapsed_time >= self.target_block_time:
-                        print("⛏️ Mining empty block (no pending transactions)...")
-                        
-                        start_time = time.time()
-                        new_block = self.blockchain.mine_empty_block(self.wallet_address)
-                        end_time = time.time()
-                        
-                        if new_block:
-                            self.blocks_mined += 1
-                            mining_time = end_time - start_time
-                            self.last_block_time = datetime.now()
-                            reward = self.blockchain.get_block_reward(new_block.index)
-                            print(f"✅ Empty block #{new_block.index} mined!")
-                            print(f"Hash rate: {self.hash_rate:.2f} H/s")
-                            print(f"Reward: {reward} HayX")
-                            block_start_time = time.time()
-                        else:
-                            print("❌ Failed to mine empty block")
-                            time.sleep(1)
-                    else:
-                        # Continue hashing while waiting
-                        time.sleep(0.1)
+                new_block = job.block
+                if not self.blockchain.add_block(new_block):
+                    print(f"⚠️ Block #{new_block.index} is stale, chain tip moved")
+                    continue
+                
+                self.blocks_mined += 1
+                self.last_block_time = datetime.now()
+                reward = self.blockchain.get_block_reward(new_block.index)
+                print(f"✅ Block #{new_block.index} mined successfully!")
+                print(f"Hash: {new_block.hash[:16]}...")
+                print(f"Mining time: {new_block.mining_time:.2f} seconds")
+                print(f"Nonce: {new_block.nonce}")
+                print(f"Reward: {reward} HayX")
+                print(f"Hash rate: {self._block_hash_rate(new_block):.2f} H/s ({new_block.hash_attempts} hashes)")
+                block_start_time = time.time()
                 
             except Exception as e:
+                self.current_job = None
                 print(f"❌ Mining error: {e}")
                 time.sleep(1)
     
@@ -120,13 +142,18 @@ class Miner:
             
             if time_since_last_block < self.target_block_time * 0.5:
                 # Blocks are being mined too fast, increase difficulty
-                self.blockchain.difficulty = min(self.blockchain.difficulty + 1, 10)
+                self.blockchain.set_difficulty(min(self.blockchain.difficulty + 1, 10))
                 print(f"📈 Increased difficulty to {self.blockchain.difficulty}")
             elif time_since_last_block > self.target_block_time * 2:
                 # Blocks are taking too long, decrease difficulty
-                self.blockchain.difficulty = max(self.blockchain.difficulty - 1, 1)
+                self.blockchain.set_difficulty(max(self.blockchain.difficulty - 1, 1))
                 print(f"📉 Decreased difficulty to {self.blockchain.difficulty}")
     
+    @staticmethod
+    def _block_hash_rate(block):
+        """Average hash rate achieved while mining a single block"""
+        return block.hash_attempts / block.mining_time if block.mining_time > 0 else 0
+
     def _add_hash_rate_to_history(self, hash_rate):
         """Add hash rate to history for charting"""
         self.hash_rate_history.append({
@@ -148,6 +175,7 @@ class Miner:
         return {
             'is_mining': self.is_mining,
             'hash_rate': self.hash_rate,
+            'hash_rate_avg': self.hash_rate_avg,
             'blocks_mined': self.blocks_mined,
             'wallet_address': self.wallet_address,
             'difficulty': self.blockchain.difficulty,
@@ -157,5 +185,7 @@ class Miner:
             'mining_reward': reward,
             'hash_rate_history': self.hash_rate_history[-20:] if self.hash_rate_history else [],
             'total_hash_count': self.total_hash_count,
-            'mining_duration': mining_duration
+            'mining_duration': mining_duration,
+            'workers': self.pow_backend.workers if self.pow_backend else 1,
+            'worker_hash_counts': self.pow_backend.get_worker_hash_counts() if self.pow_backend else []
         }
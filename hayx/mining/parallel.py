@@ -0,0 +1,145 @@
+import os
+import queue
+import time
+from .proof_of_work import mine_header, MAX_NONCE
+from hayx.blockchain.block import HEADER_BLOCK_VERSION
+from hayx.utils.processes import worker_context
+
+def _worker_main(worker_id, jobs, results, generation, counts, batch_size):
+    """Worker process: grind nonce ranges until told to stop or solved."""
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+
+        job_generation, header_prefix, difficulty, start, end = job
+        nonce = start
+        found = None
+        while nonce < end and generation.value == job_generation:
+            batch_end = min(nonce + batch_size, end)
+            found = mine_header(header_prefix, difficulty, nonce, batch_end)
+            if found:
+                counts[worker_id] += found[0] - nonce + 1
+                break
+            counts[worker_id] += batch_end - nonce
+            nonce = batch_end
+
+        results.put((job_generation, worker_id, found))
+
+
+class ParallelMiner:
+    """Process-pool proof-of-work backend.
+
+    The nonce space above the block's current nonce is split into one
+    contiguous range per worker process. The first worker to find a valid
+    nonce wins; bumping the shared generation counter makes every other
+    worker drop its range after its current batch.
+    """
+
+    def __init__(self, workers=None, batch_size=50000):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.processes = []
+        self.jobs = []
+        self.results = None
+        self.generation = None
+        self.counts = None
+
+    def start(self):
+        """Start the worker processes."""
+        if self.processes:
+            return
+        ctx = worker_context()
+        self.results = ctx.Queue()
+        self.generation = ctx.Value('Q', 0)
+        self.counts = ctx.Array('Q', self.workers, lock=False)
+        for worker_id in range(self.workers):
+            jobs = ctx.Queue()
+            process = ctx.Process(
+                target=_worker_main,
+                args=(worker_id, jobs, self.results, self.generation, self.counts, self.batch_size)
+            )
+            process.daemon = True
+            process.start()
+            self.jobs.append(jobs)
+            self.processes.append(process)
+        print(f"⚙️ Started {self.workers} mining worker processes")
+
+    def close(self):
+        """Stop any running job and shut the worker processes down."""
+        if not self.processes:
+            return
+        self.cancel()
+        for jobs in self.jobs:
+            jobs.put(None)
+        for process in self.processes:
+            process.join(timeout=1)
+        self.processes = []
+        self.jobs = []
+
+    def cancel(self):
+        """Abandon the current job; ``mine`` returns False."""
+        if self.generation is not None:
+            with self.generation.get_lock():
+                self.generation.value += 1
+
+    def get_worker_hash_counts(self):
+        """Total hashes computed by each worker since the pool started."""
+        return list(self.counts) if self.counts is not None else [0] * self.workers
+
+    def mine(self, block, difficulty, progress=None, should_stop=None):
+        """Mine ``block`` in place. Returns True if solved, False if cancelled.
+
+        ``progress`` is called about ten times a second with the hashes all
+        workers computed since the previous call; ``should_stop`` is polled
+        at the same rate and cancels the job when it returns True.
+        """
+        if block.version < HEADER_BLOCK_VERSION:
+            # Legacy JSON-hashed blocks have no fixed header to split up
+            return block.mine_block(difficulty, progress, should_stop)
+
+        self.start()
+        header_prefix = block.prepare_header(difficulty)
+
+        with self.generation.get_lock():
+            self.generation.value += 1
+            job_generation = self.generation.value
+
+        span = (MAX_NONCE - block.nonce) // self.workers
+        for worker_id, jobs in enumerate(self.jobs):
+            start = block.nonce + worker_id * span
+            jobs.put((job_generation, header_prefix, difficulty, start, start + span))
+
+        start_time = time.time()
+        start_count = reported = sum(self.counts)
+        solution = None
+        pending = self.workers
+        while pending:
+            try:
+                result_generation, worker_id, found = self.results.get(timeout=0.1)
+            except queue.Empty:
+                result_generation = None
+            if progress:
+                current = sum(self.counts)
+                progress(current - reported)
+                reported = current
+            if solution is None and should_stop and should_stop():
+                self.cancel()
+            if result_generation != job_generation:
+                continue
+            pending -= 1
+            if found and solution is None:
+                solution = found
+                self.cancel()
+
+        total = sum(self.counts)
+        if progress and total > reported:
+            progress(total - reported)
+        block.hash_attempts = total - start_count
+        block.mining_time = time.time() - start_time
+        if solution is None:
+            return False
+
+        block.nonce, block.hash = solution
+        print(f"Block mined: {block.hash}")
+        return True
@@ -1,5 +1,11 @@
 import hashlib
 import json
+import struct
+import time
+
+NONCE_FORMAT = struct.Struct('>Q')
+MAX_NONCE = 2 ** 64 - 1
+PROGRESS_INTERVAL = 100  # JSON-hashed attempts between progress callbacks
 
 def calculate_hash(index, timestamp, transactions, previous_hash, nonce):
     """Calculate the SHA-256 hash of a block."""
@@ -12,15 +18,50 @@ def calculate_hash(index, timestamp, transactions, previous_hash, nonce):
     }, sort_keys=True)
     return hashlib.sha256(block_string.encode()).hexdigest()
 
-def mine_block(index, transactions, previous_hash, difficulty, timestamp):
+def mine_block(index, transactions, previous_hash, difficulty, timestamp, stats=None, progress=None):
     """
     Perform proof of work:
     Find a nonce such that the block hash has `difficulty` leading zeroes.
+    If given, `stats` is filled with the hash attempts made and the elapsed
+    seconds, and `progress` is called with the attempts made since its last
+    call every PROGRESS_INTERVAL hashes.
     """
     nonce = 0
     target = '0' * difficulty
+    start_time = time.time()
     while True:
         hash_value = calculate_hash(index, timestamp, transactions, previous_hash, nonce)
+        nonce += 1
+        if progress and nonce % PROGRESS_INTERVAL == 0:
+            progress(PROGRESS_INTERVAL)
+        if hash_value.startswith(target):
+            break
+
+    if progress and nonce % PROGRESS_INTERVAL:
+        progress(nonce % PROGRESS_INTERVAL)
+    if stats is not None:
+        stats.update(attempts=nonce, elapsed=time.time() - start_time)
+    return nonce - 1, hash_value
+
+def calculate_header_hash(header_prefix, nonce):
+    """Hash a fixed-size block header: everything but the nonce, then the nonce."""
+    return hashlib.sha256(header_prefix + NONCE_FORMAT.pack(nonce)).hexdigest()
+
+def mine_header(header_prefix, difficulty, start_nonce=0, end_nonce=MAX_NONCE):
+    """
+    Search nonces in [start_nonce, end_nonce) for a header hash with
+    `difficulty` leading zeroes. The nonce-free prefix is absorbed into a
+    SHA-256 midstate once; each attempt only copies it and hashes 8 bytes.
+    Returns (nonce, hash) or None if the range is exhausted; the attempts
+    made are nonce - start_nonce + 1, or the whole range on None.
+    """
+    target = '0' * difficulty
+    midstate = hashlib.sha256(header_prefix)
+    pack = NONCE_FORMAT.pack
+    for nonce in range(start_nonce, end_nonce):
+        h = midstate.copy()
+        h.update(pack(nonce))
+        hash_value = h.hexdigest()
         if hash_value.startswith(target):
             return nonce, hash_value
-        nonce += 1
+    return None
@@ -0,0 +1,357 @@
+"""
+Compact binary encoding for the relay-heavy P2P messages.
+
+Peers agree on it in the 'version' handshake; until then, and for message
+types without a binary layout, messages are JSON. Each frame says which
+encoding it carries, so a peer can switch at any time.
+
+Layout (version 2): a version byte, a message type byte, then the body.
+Integers are fixed-width big-endian or varints and floats are 8-byte
+doubles. The strings of a record, or of a whole list of transactions, go
+in one string table: a kind byte per string, the byte lengths of the
+lowercase hex ones (hashes, addresses, signatures, keys), their raw
+bytes, then any other text. A table is turned back into hex with a single
+call, and a transaction list packs all its numbers with one precompiled
+struct, so encoding and decoding cost about what the C-accelerated JSON
+codec does while the payload is less than half the size. Fields a layout
+does not know about travel as JSON at the end, so older layouts survive
+new fields.
+"""
+
+import json
+import struct
+from functools import lru_cache
+from .compact import SHORT_ID_BYTES
+
+CODEC_JSON = 'json'
+CODEC_BINARY = 'binary/2'
+SUPPORTED_CODECS = [CODEC_BINARY, CODEC_JSON]  # most preferred first
+
+BINARY_VERSION = 2
+
+_MAX_HEX_BYTES = 255  # hex strings must fit a one-byte length
+_TX_NUMBERS = 3  # amount, fee, timestamp
+_BLOCK_FIELDS = struct.Struct('>BIdQ')  # flags, index, timestamp, nonce
+_VERSION_AND_TYPE = struct.Struct('>BB')
+
+# String kinds
+_NONE, _HEX_BYTES, _TEXT = 0, 1, 2
+
+_BLOCK_HAS_TRANSACTIONS = 0x01
+_BLOCK_HAS_DIFFICULTY = 0x02  # one byte follows the block's hashes
+
+_TX_STRINGS = ('tx_id', 'sender', 'recipient', 'signature', 'public_key')
+_TX_KEYS = frozenset(_TX_STRINGS + ('amount', 'fee', 'timestamp'))
+_BLOCK_KEYS = frozenset(('version', 'index', 'timestamp', 'transactions', 'previous_hash',
+                         'merkle_root', 'nonce', 'hash', 'difficulty'))
+
+
+class CodecError(ValueError):
+    """Raised when a binary payload cannot be decoded."""
+
+
+def negotiate(codecs):
+    """Best codec supported by both sides, given the peer's list."""
+    for codec in SUPPORTED_CODECS:
+        if codec in codecs:
+            return codec
+    return CODEC_JSON
+
+
+@lru_cache(maxsize=64)
+def _doubles(count):
+    """Precompiled struct for ``count`` doubles."""
+    return struct.Struct(f'>{count}d')
+
+
+def _varint(value, out):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _strings(values, out):
+    """Write a string table; None is kept, hex strings go as raw bytes."""
+    kinds = bytearray()
+    hex_lengths = bytearray()
+    hex_bytes = []
+    texts = []
+    for value in values:
+        if value is None:
+            kinds.append(_NONE)
+            continue
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            raw = None
+        # fromhex also takes upper case and spaces, which would not round-trip
+        if raw is not None and len(raw) <= _MAX_HEX_BYTES and raw.hex() == value:
+            kinds.append(_HEX_BYTES)
+            hex_lengths.append(len(raw))
+            hex_bytes.append(raw)
+        else:
+            kinds.append(_TEXT)
+            texts.append(value.encode())
+    out += kinds
+    out += hex_lengths
+    out += b''.join(hex_bytes)
+    for data in texts:
+        _varint(len(data), out)
+        out += data
+
+
+def _extra(records, keys, out):
+    """Fields outside ``keys``, as one JSON list for the records, if any have them."""
+    if any(record.keys() - keys for record in records):
+        extra = [{key: value for key, value in record.items() if key not in keys} for record in records]
+        data = json.dumps(extra).encode()
+        out.append(_TEXT)
+        _varint(len(data), out)
+        out += data
+    else:
+        out.append(_NONE)
+
+
+def _transactions(transactions, out):
+    """Write a list of transactions, column by column; the count is the caller's."""
+    _strings([tx.get(key) for tx in transactions for key in _TX_STRINGS], out)
+    numbers = [value for tx in transactions for value in (tx['amount'], tx['fee'], tx['timestamp'])]
+    out += _doubles(len(numbers)).pack(*numbers)
+    _extra(transactions, _TX_KEYS, out)
+
+
+def _tx(tx, out):
+    _transactions([tx], out)
+
+
+def _block(block, out):
+    transactions = block.get('transactions')
+    difficulty = block.get('difficulty')
+    flags = _BLOCK_HAS_TRANSACTIONS if transactions is not None else 0
+    if difficulty is not None:
+        flags |= _BLOCK_HAS_DIFFICULTY
+    _varint(block.get('version', 1), out)
+    out += _BLOCK_FIELDS.pack(flags, block['index'], block['timestamp'], block['nonce'])
+    _strings((block['previous_hash'], block.get('merkle_root'), block['hash']), out)
+    if difficulty is not None:
+        out.append(difficulty)
+    if transactions is not None:
+        _varint(len(transactions), out)
+        _transactions(transactions, out)
+    _extra([block], _BLOCK_KEYS, out)
+
+
+def _inventory(data, out):
+    blocks = data.get('blocks', [])
+    _varint(len(blocks), out)
+    for height, _ in blocks:
+        _varint(height, out)
+    _strings([block_hash for _, block_hash in blocks], out)
+    txs = data.get('txs', [])
+    _varint(len(txs), out)
+    _strings(txs, out)
+
+
+def _blocks(blocks, out):
+    _varint(len(blocks), out)
+    for block in blocks:
+        _block(block, out)
+
+
+def _headers(data, out):
+    _varint(data['height'], out)
+    _blocks(data['headers'], out)
+
+
+def _compact_block(data, out):
+    _block(data['header'], out)
+    _varint(len(data['short_ids']), out)
+    out += bytes.fromhex(''.join(data['short_ids']))
+    _varint(len(data['prefilled']), out)
+    for index, _ in data['prefilled']:
+        _varint(index, out)
+    _transactions([tx for _, tx in data['prefilled']], out)
+
+
+def _block_txn(data, out):
+    _strings([data['hash']], out)
+    _varint(len(data['transactions']), out)
+    _transactions(data['transactions'], out)
+
+
+class _Reader:
+    __slots__ = ('data', 'pos')
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def take(self, size):
+        raw = self.data[self.pos:self.pos + size]
+        if len(raw) != size:
+            raise CodecError("truncated message")
+        self.pos += size
+        return raw
+
+    def varint(self):
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def strings(self, count):
+        kinds = self.take(count)
+        hex_lengths = self.take(kinds.count(_HEX_BYTES))
+        text = self.take(sum(hex_lengths)).hex()
+        values = []
+        lengths = iter(hex_lengths)
+        start = 0
+        for kind in kinds:
+            if kind == _HEX_BYTES:
+                end = start + 2 * next(lengths)
+                values.append(text[start:end])
+                start = end
+            elif kind == _NONE:
+                values.append(None)
+            elif kind == _TEXT:
+                values.append(self.take(self.varint()).decode())
+            else:
+                raise CodecError(f"unknown string kind {kind}")
+        return values
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.pos)
+        self.pos += layout.size
+        return values
+
+    def extra(self, records):
+        kind = self.data[self.pos]
+        self.pos += 1
+        if kind == _NONE:
+            return records
+        extra = json.loads(self.take(self.varint()))
+        if not isinstance(extra, list) or len(extra) != len(records):
+            raise CodecError("extra fields do not match the records")
+        for record, fields in zip(records, extra):
+            record.update(fields)
+        return records
+
+    def transactions(self, count):
+        strings = iter(self.strings(count * len(_TX_STRINGS)))
+        numbers = iter(self.unpack(_doubles(count * _TX_NUMBERS)))
+        transactions = []
+        for tx_id, sender, recipient, signature, public_key in zip(strings, strings, strings, strings, strings):
+            tx = {
+                'tx_id': tx_id,
+                'sender': sender,
+                'recipient': recipient,
+                'amount': next(numbers),
+                'fee': next(numbers),
+                'timestamp': next(numbers),
+                'signature': signature
+            }
+            if public_key is not None:
+                tx['public_key'] = public_key
+            transactions.append(tx)
+        return self.extra(transactions)
+
+    def tx(self):
+        return self.transactions(1)[0]
+
+    def block(self):
+        version = self.varint()
+        flags, index, timestamp, nonce = self.unpack(_BLOCK_FIELDS)
+        previous_hash, merkle_root, block_hash = self.strings(3)
+        block = {
+            'version': version,
+            'index': index,
+            'timestamp': timestamp,
+            'previous_hash': previous_hash,
+            'merkle_root': merkle_root,
+            'nonce': nonce,
+            'hash': block_hash
+        }
+        if block['merkle_root'] is None:
+            del block['merkle_root']
+        if flags & _BLOCK_HAS_DIFFICULTY:
+            block['difficulty'] = self.data[self.pos]
+            self.pos += 1
+        if flags & _BLOCK_HAS_TRANSACTIONS:
+            block['transactions'] = self.transactions(self.varint())
+        return self.extra([block])[0]
+
+    def blocks(self):
+        return [self.block() for _ in range(self.varint())]
+
+    def inventory(self):
+        heights = [self.varint() for _ in range(self.varint())]
+        blocks = [[height, block_hash] for height, block_hash in zip(heights, self.strings(len(heights)))]
+        txs = self.strings(self.varint())
+        return {'blocks': blocks, 'txs': txs}
+
+    def headers(self):
+        height = self.varint()
+        return {'height': height, 'headers': self.blocks()}
+
+    def compact_block(self):
+        header = self.block()
+        text = self.take(self.varint() * SHORT_ID_BYTES).hex()
+        width = 2 * SHORT_ID_BYTES
+        short_ids = [text[start:start + width] for start in range(0, len(text), width)]
+        indexes = [self.varint() for _ in range(self.varint())]
+        prefilled = [[index, tx] for index, tx in zip(indexes, self.transactions(len(indexes)))]
+        return {'header': header, 'short_ids': short_ids, 'prefilled': prefilled}
+
+    def block_txn(self):
+        block_hash, = self.strings(1)
+        return {'hash': block_hash, 'transactions': self.transactions(self.varint())}
+
+
+# type byte, message type, encoder, decoder
+_LAYOUTS = [
+    (1, 'new_transaction', _tx, _Reader.tx),
+    (2, 'new_block', _block, _Reader.block),
+    (3, 'blocks', _blocks, _Reader.blocks),
+    (4, 'headers', _headers, _Reader.headers),
+    (5, 'inv', _inventory, _Reader.inventory),
+    (6, 'get_data', _inventory, _Reader.inventory),
+    (7, 'compact_block', _compact_block, _Reader.compact_block),
+    (8, 'block_txn', _block_txn, _Reader.block_txn),
+]
+_ENCODERS = {msg_type: (type_id, encode) for type_id, msg_type, encode, _ in _LAYOUTS}
+_DECODERS = {type_id: (msg_type, decode) for type_id, msg_type, _, decode in _LAYOUTS}
+
+
+def has_binary_layout(message):
+    return message.get('type') in _ENCODERS
+
+
+def encode_binary(message):
+    """Binary payload for a message whose type has a binary layout."""
+    type_id, encode = _ENCODERS[message['type']]
+    out = bytearray(_VERSION_AND_TYPE.pack(BINARY_VERSION, type_id))
+    encode(message['data'], out)
+    return bytes(out)
+
+
+def decode_binary(payload):
+    """Inverse of encode_binary; raises CodecError on bad input."""
+    try:
+        reader = _Reader(bytes(payload))
+        version, type_id = reader.unpack(_VERSION_AND_TYPE)
+        if version != BINARY_VERSION or type_id not in _DECODERS:
+            raise CodecError(f"unsupported binary message {version}/{type_id}")
+        msg_type, decode = _DECODERS[type_id]
+        message = {'type': msg_type, 'data': decode(reader)}
+        if reader.pos != len(reader.data):
+            raise CodecError("trailing bytes")
+        return message
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError, ValueError) as e:
+        if isinstance(e, CodecError):
+            raise
+        raise CodecError(f"malformed binary message: {e}")
@@ -0,0 +1,104 @@
+"""
+Compact block relay.
+
+A compact block is a block header plus a short id for each transaction,
+so a peer whose mempool already holds the transactions can rebuild the
+block without receiving them again. Short ids are keyed with the block
+hash, so nobody can craft transactions that collide with a given block's
+ids in advance. Transactions the receiver cannot have seen (the coinbase)
+are sent in full as "prefilled" entries.
+"""
+
+import hashlib
+
+SHORT_ID_BYTES = 6
+
+
+def short_tx_id(block_hash, tx_id):
+    """Short id of a transaction within the block with ``block_hash``"""
+    key = block_hash.encode()[:64]
+    return hashlib.blake2b(tx_id.encode(), key=key, digest_size=SHORT_ID_BYTES).hexdigest()
+
+
+def compact_block(block):
+    """Message data announcing ``block`` as header, short ids and prefilled txs"""
+    short_ids = []
+    prefilled = []
+    for index, tx in enumerate(block.transactions):
+        if tx.sender == "coinbase":
+            prefilled.append([index, tx.to_dict()])
+        else:
+            short_ids.append(short_tx_id(block.hash, tx.tx_id))
+    return {
+        'header': block.header_to_dict(),
+        'short_ids': short_ids,
+        'prefilled': prefilled
+    }
+
+
+class PartialBlock:
+    """A compact block being rebuilt from the mempool.
+
+    ``missing`` lists the transaction indexes still to be fetched from the
+    peer; once it is empty, ``to_block`` assembles the block.
+    """
+
+    def __init__(self, data, pending_transactions):
+        from hayx.blockchain.block import Block
+        from hayx.blockchain.transaction import Transaction
+        self.header = Block.from_header_dict(data['header'])
+
+        count = len(data['short_ids']) + len(data['prefilled'])
+        self.transactions = [None] * count
+        for index, tx_data in data['prefilled']:
+            if not 0 <= index < count or self.transactions[index] is not None:
+                raise ValueError("invalid prefilled transaction index")
+            self.transactions[index] = Transaction.from_dict(tx_data)
+
+        # Two mempool transactions with the same short id are ambiguous;
+        # such slots are fetched from the peer instead
+        by_short_id = {}
+        for tx in pending_transactions:
+            short_id = short_tx_id(self.header.hash, tx.tx_id)
+            by_short_id[short_id] = None if short_id in by_short_id else tx
+
+        short_ids = iter(data['short_ids'])
+        self.missing = []
+        for index, tx in enumerate(self.transactions):
+            if tx is None:
+                tx = by_short_id.get(next(short_ids))
+                if tx is None:
+                    self.missing.append(index)
+                self.transactions[index] = tx
+
+    @property
+    def hash(self):
+        return self.header.hash
+
+    def fill(self, transactions):
+        """Insert the transactions a peer sent for our ``missing`` indexes"""
+        from hayx.blockchain.transaction import Transaction
+        if len(transactions) != len(self.missing):
+            raise ValueError("wrong number of block transactions")
+        for index, tx_data in zip(self.missing, transactions):
+            self.transactions[index] = Transaction.from_dict(tx_data)
+        self.missing = []
+
+    def to_block(self):
+        """The rebuilt block, or None if it does not match the header"""
+        from hayx.blockchain.block import Block, HEADER_BLOCK_VERSION
+        block = Block(self.header.index, self.transactions, self.header.previous_hash,
+                      self.header.nonce, self.header.version)
+        block.timestamp = self.header.timestamp
+        block.difficulty = self.header.difficulty
+        if block.version >= HEADER_BLOCK_VERSION:
+            # The header commits to the tx ids through the Merkle root
+            if block.merkle_root != self.header.merkle_root:
+                return None
+            block.hash = self.header.hash
+        else:
+            block.merkle_root = self.header.merkle_root
+            block.hash = block.calculate_hash()
+            if block.hash != self.header.hash:
+                return None
+        return block
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import deque
+from config import Config
+
+class BlockDownloader:
+    """Download the blocks behind a known header chain from many peers at once.
+
+    Missing heights are requested as ranges of up to MAX_BLOCKS_PER_MESSAGE
+    blocks. Every connected peer whose chain is long enough gets up to
+    DOWNLOAD_WINDOW ranges in flight, least busy peer first. A range that
+    is not delivered within BLOCK_DOWNLOAD_TIMEOUT, or whose peer
+    disconnects, is handed to another peer. Downloaded blocks are buffered
+    and connected strictly in height order, so validation proceeds while
+    later ranges are still arriving.
+
+    Peers answer requests in order, so a 'blocks' reply always belongs to
+    the oldest outstanding request to that peer.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.start = None  # height of the first block not yet connected
+        self.hashes = []  # expected block hashes from ``start`` on
+        self.last_header = None  # header of the last entry in ``hashes``
+        self.target_height = 0  # chain height the peers announced
+        self.blocks = {}  # height -> downloaded block waiting to be connected
+        self.requests = {}  # peer -> deque of [start, end, sent_at, abandoned]
+        self.failed = {}  # height -> peers that failed to deliver it
+        self.headers_requested = 0.0  # when we last asked for more headers
+
+    @property
+    def active(self):
+        return self.start is not None
+
+    def begin(self, headers, peer_height):
+        """Start downloading the blocks for ``headers``, validated by the caller."""
+        with self.lock:
+            self.reset()
+            self.start = headers[0].index
+            self.hashes = [header.hash for header in headers]
+            self.last_header = headers[-1]
+            self.target_height = peer_height
+            print(f"Downloading blocks #{self.start}..#{peer_height - 1}")
+            self._assign()
+
+    def extend(self, headers, peer_height):
+        """Append a further batch of headers; False if it does not follow ours."""
+        with self.lock:
+            self.headers_requested = 0.0
+            if not self.active:
+                return False
+            if not headers:
+                if not self.hashes:
+                    self.reset()  # peer has nothing beyond what we connected
+                else:
+                    self._assign()
+                return True
+            if not headers[0].is_header_valid(self.last_header):
+                return False
+            self.hashes.extend(header.hash for header in headers)
+            self.last_header = headers[-1]
+            self.target_height = max(self.target_height, peer_height)
+            self._assign()
+            return True
+
+    def on_blocks(self, peer, blocks):
+        """Handle a peer's reply to its oldest outstanding get_blocks."""
+        with self.lock:
+            queue = self.requests.get(peer)
+            if not self.active or not queue:
+                return
+            first, last, _, _ = queue.popleft()
+
+            end = self.start + len(self.hashes)
+            height = first
+            wrong = False
+            for block in blocks:
+                if height >= last or block.index != height:
+                    wrong = True
+                    break
+                if self.start <= height < end:
+                    if block.hash != self.hashes[height - self.start]:
+                        wrong = True
+                        break
+                    self.blocks[height] = block
+                height += 1
+            if wrong or not blocks:
+                # A short but correct reply is fine; the rest is requested again
+                self._mark_failed(peer, height)
+
+            self._connect_ready()
+            self._assign()
+
+    def tick(self):
+        """Reassign requests that timed out or whose peer went away."""
+        with self.lock:
+            if not self.active:
+                return
+            now = time.time()
+            for peer, queue in list(self.requests.items()):
+                for request in queue:
+                    first, _, sent_at, abandoned = request
+                    if abandoned:
+                        continue
+                    if not peer.is_connected or now - sent_at > Config.BLOCK_DOWNLOAD_TIMEOUT:
+                        request[3] = True
+                        self._mark_failed(peer, first)
+                if not peer.is_connected:
+                    del self.requests[peer]
+            if self.headers_requested and now - self.headers_requested > Config.BLOCK_DOWNLOAD_TIMEOUT:
+                self.headers_requested = 0.0
+            self._assign()
+
+    def _mark_failed(self, peer, height):
+        self.failed.setdefault(height, set()).add(peer)
+
+    def _in_flight(self):
+        heights = set()
+        for queue in self.requests.values():
+            for first, last, _, abandoned in queue:
+                if not abandoned:
+                    heights.update(range(first, last))
+        return heights
+
+    def _assign(self):
+        """Hand every missing, unrequested range to the least busy eligible peer."""
+        if not self.active:
+            return
+        peers = [peer for peer in self.node._live_sessions() if peer.height > self.start]
+        load = {peer: sum(1 for request in self.requests.get(peer, ()) if not request[3]) for peer in peers}
+        busy = self._in_flight()
+        end = self.start + len(self.hashes)
+
+        height = self.start
+        while height < end:
+            if height in self.blocks or height in busy:
+                height += 1
+                continue
+            last = height + 1
+            while (last < end and last - height < Config.MAX_BLOCKS_PER_MESSAGE
+                   and last not in self.blocks and last not in busy):
+                last += 1
+
+            failed = self.failed.get(height, ())
+            eligible = [peer for peer in peers if peer.height >= last]
+            # Peers that already failed this range are only retried if no one else can serve it
+            eligible = [peer for peer in eligible if peer not in failed] or eligible
+            candidates = [peer for peer in eligible if load[peer] < Config.DOWNLOAD_WINDOW]
+            if not candidates:
+                height = last
+                continue
+            peer = min(candidates, key=lambda candidate: load[candidate])
+            self.requests.setdefault(peer, deque()).append([height, last, time.time(), False])
+            load[peer] += 1
+            peer.send({'type': 'get_blocks', 'data': {'from': height, 'to': last - 1}})
+            height = last
+
+        if end < self.target_height and not self.headers_requested and peers:
+            # Fetch the next batch of headers while blocks are downloading
+            self.headers_requested = time.time()
+            peer = max(peers, key=lambda candidate: candidate.height)
+            locator = [[self.last_header.index, self.last_header.hash]]
+            peer.send({'type': 'get_headers', 'data': {'locator': locator}})
+
+    def _connect_ready(self):
+        """Connect the downloaded blocks that follow our chain, in order."""
+        run = []
+        height = self.start
+        while height in self.blocks:
+            run.append(self.blocks[height])
+            height += 1
+        if not run:
+            return
+
+        # Fork blocks are kept on a side branch until it has more work than our chain
+        if not self.node._connect_blocks(self.start, run):
+            print("Downloaded blocks failed validation, aborting sync")
+            self.reset()
+            return
+
+        for connected in range(self.start, height):
+            del self.blocks[connected]
+            self.failed.pop(connected, None)
+        self.hashes = self.hashes[height - self.start:]
+        self.start = height
+        if not self.hashes and self.start >= self.target_height:
+            print(f"Sync complete at block #{self.start - 1}")
+            self.reset()
@@ -1,103 +1,53 @@
-import socket
+import asyncio
 import threading
-import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from config import Config, load_peers, save_peers
+from hayx.utils.lru import LRUCache
+from .codec import SUPPORTED_CODECS, negotiate
+from .compact import PartialBlock, compact_block
+from .download import BlockDownloader
+from .orphans import OrphanPool
+from .protocol import PROTOCOL_VERSION
+from .peer import AsyncPeer
 
 class Node:
+    """P2P node serving every peer connection from one asyncio event loop.
+
+    The loop runs in a background thread so the node can be started and
+    used from synchronous code (web app, API, CLI). Message handlers touch
+    the blockchain and may block on disk or validation, so they run on a
+    small thread pool; each session waits for its handler before reading
+    its next message.
+
+    Blocks and transactions are gossiped inv/get_data style: peers are told
+    the ids, and only request the full item if it is not in their seen-set,
+    so each item crosses each link in full at most once. Peers that ask for
+    it in the version handshake get new blocks pushed as compact blocks
+    instead, which they rebuild from their mempool.
+    """
+
     def __init__(self, blockchain, port=Config.P2P_PORT):
         self.blockchain = blockchain
         self.port = port
-        self.peers = set(load_peers())
+        self.peer_last_seen = load_peers()  # "host:port" -> when we last reached it
+        self.peers = set(self.peer_last_seen)
         self.is_running = False
-        self.server_socket = None
-        self.peer_threads = []
-        
-    def start(self):
-        """Start the P2P node"""
-        if self.is_running:
-            return
-            
-        self.is_running = True
-        
-        # Start server to accept incoming connections
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        
-        try:
-            self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(10)
-            print(f"P2P Node started on port {self.port}")
-            
-            # Start accepting connections
-            server_thread = threading.Thread(target=self._accept_connections)
-            server_thread.daemon = True
-            server_thread.start()
-            
-            # Connect to known peers
-            self._connect_to_peers()
-            
-            # Start peer discovery
-            discovery_thread = threading.Thread(target=self._peer_discovery)
-            discovery_thread.daemon = True
-            discovery_thread.start()
-            
-        except Exception as e:
-            print(f"Failed to start node: {e}")
-            self.is_running = False
+        self.dead_hosts = LRUCache(4096)  # LAN host -> time before which it is not probed again
+        self.seen_blocks = LRUCache(Config.SEEN_BLOCKS_CACHE)
+        self.seen_txs = LRUCache(Config.SEEN_TX_CACHE)
+        self.requested = LRUCache(Config.SEEN_TX_CACHE)  # id -> time we sent get_data
+        self.partial_blocks = LRUCache(16)  # block hash -> PartialBlock waiting for block_txn
+        self.orphans = OrphanPool()
+        self.downloader = BlockDownloader(self)
+        self.loop = None
+        self.loop_thread = None
+        self.server = None
+        self.executor = None
+        self.sessions = {}  # "host:port" -> outbound AsyncPeer session
+        self.inbound = set()  # sessions opened by peers connecting to us
     
-    def stop(self):
-        """Stop the P2P node"""
-        self.is_running = False
-        
-        if self.server_socket:
-            self.server_socket.close()
-            
-        for thread in self.peer_threads:
-            if thread.is_alive():
-                thread.join(timeout=1)
-        
-        print("P2P Node stopped")
-    
-    def _accept_connections(self):
-        """Accept incoming peer connections"""
-        while self.is_running:
-            try:
-                client_socket, address = self.server_socket.accept()
-                print(f"New peer connected: {address}")
-                
-                peer_thread = threading.Thread(
-                    target=self._handle_peer, 
-                    args=(client_socket, address)
-                )
-                peer_thread.daemon = True
-                peer_thread.start()
-                self.peer_threads.append(peer_thread)
-                
-            except Exception as e:
-                if self.is_running:
-                    print(f"Error accepting connection: {e}")
-    
-    def _handle_peer(self, client_socket, address):
-        """Handle communication with a peer"""
-        try:
-            while self.is_running:
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                    
-                try:
-                    message = json.loads(data.decode())
-                    self._handle_message(message, client_socket)
-                except json.JSONDecodeError:
-                    print(f"Invalid JSON from {address}")
-                    
-        except Exception as e:
-            print(f"Error handling peer {address}: {e}")
-        finally:
-            client_socket.close()
-    
-    def _handle_message(self, message, client_socket):
+    def _handle_message(self, message, peer):
         """Handle incoming messages from peers"""
         msg_type = message.get('type')
         
@@ -105,9 +55,9 @@ class Node:
             # Send our blockchain
             response = {
                 'type': 'chain',
-                'data': [block.to_dict() for block in self.blockchain.chain]
+                'data': [block.to_dict() for block in self.blockchain.snapshot.iter_blocks()]
             }
-            self._send_message(client_socket, response)
+            peer.send(response)
             
         elif msg_type == 'chain':
             # Received a blockchain from peer
@@ -117,19 +67,64 @@ class Node:
             # Received a new transaction
             from hayx.blockchain.transaction import Transaction
             tx = Transaction.from_dict(message['data'])
-            self.blockchain.add_transaction(tx)
+            self.requested.discard(tx.tx_id)
+            # Only an accepted transaction is marked seen (by the broadcast), so a
+            # tampered copy with the same id does not shut out the real one
+            if tx.tx_id not in self.seen_txs and self.blockchain.add_transaction(tx):
+                self.broadcast_transaction(tx, exclude=peer)
             
         elif msg_type == 'new_block':
             # Received a new block
             from hayx.blockchain.block import Block
             block = Block.from_dict(message['data'])
-            self._handle_new_block(block)
+            self.requested.discard(block.hash)
+            if block.hash not in self.seen_blocks:
+                self._handle_new_block(block, peer)
+        
+        elif msg_type == 'compact_block':
+            self._handle_compact_block(message['data'], peer)
+        
+        elif msg_type == 'get_block_txn':
+            # Send the transactions a peer could not find for our compact block
+            data = message['data']
+            block = self.blockchain.get_block_at(data['height'], data['hash'])
+            if block:
+                transactions = [block.transactions[index].to_dict() for index in data['indexes']
+                                if 0 <= index < len(block.transactions)]
+                peer.send({'type': 'block_txn', 'data': {'hash': block.hash, 'transactions': transactions}})
+        
+        elif msg_type == 'block_txn':
+            partial = self.partial_blocks.get(message['data']['hash'])
+            if partial is not None:
+                self.partial_blocks.discard(partial.hash)
+                partial.fill(message['data']['transactions'])
+                self._complete_compact_block(partial, peer)
+        
+        elif msg_type == 'inv':
+            self._handle_inv(message['data'], peer)
+        
+        elif msg_type == 'get_data':
+            # Send the full items a peer asked for after our inv
+            data = message['data']
+            snapshot = self.blockchain.snapshot
+            for height, block_hash in data.get('blocks', []):
+                block = self.blockchain.get_block_at(height, block_hash, snapshot)
+                if block:
+                    peer.send({'type': 'new_block', 'data': block.to_dict()})
+            for tx_id in data.get('txs', []):
+                tx = self.blockchain.get_pending_transaction(tx_id)
+                if tx:
+                    peer.send({'type': 'new_transaction', 'data': tx.to_dict()})
             
         elif msg_type == 'peer_list':
             # Received peer list
-            new_peers = set(message['data'])
-            self.peers.update(new_peers)
-            save_peers(list(self.peers))
+            new_peers = set(message['data']) - self.peers
+            if new_peers:
+                now = time.time()
+                for new_peer in new_peers:
+                    self.peer_last_seen.setdefault(new_peer, now)
+                self.peers.update(new_peers)
+                self._save_peers()
         
         elif msg_type == 'get_peers':
             # Peer requested our peer list; respond with current peers
@@ -137,7 +132,192 @@ class Node:
                 'type': 'peer_list',
                 'data': list(self.peers)
             }
-            self._send_message(client_socket, response)
+            peer.send(response)
+        
+        elif msg_type == 'version':
+            # Handshake; from now on we send in the best encoding we both support
+            peer.codec = negotiate(message['data'].get('codecs', []))
+            peer.compact_blocks = bool(message['data'].get('compact_blocks'))
+        
+        elif msg_type == 'get_headers':
+            # Peer sent a locator; reply with headers after the last block we share
+            snapshot = self.blockchain.snapshot
+            start = self.blockchain.find_fork_height(message['data']['locator'], snapshot) + 1
+            blocks = self.blockchain.get_block_range(start, start + Config.MAX_HEADERS_PER_MESSAGE, snapshot)
+            response = {
+                'type': 'headers',
+                'data': {
+                    'height': snapshot.height,
+                    'headers': [block.header_to_dict() for block in blocks]
+                }
+            }
+            peer.send(response)
+        
+        elif msg_type == 'headers':
+            self._handle_headers(message['data'], peer)
+        
+        elif msg_type == 'get_blocks':
+            # Peer requested a height range of full blocks
+            start = message['data']['from']
+            end = min(message['data']['to'] + 1, start + Config.MAX_BLOCKS_PER_MESSAGE)
+            response = {
+                'type': 'blocks',
+                'data': [block.to_dict() for block in self.blockchain.get_block_range(start, end)]
+            }
+            peer.send(response)
+        
+        elif msg_type == 'blocks':
+            self._handle_blocks(message['data'], peer)
+    
+    def _handle_inv(self, data, peer):
+        """Request announced items we have not seen and are not already fetching"""
+        now = time.time()
+        latest_block = self.blockchain.get_latest_block()
+        wanted = {'blocks': [], 'txs': []}
+        
+        for height, block_hash in data.get('blocks', []):
+            if (block_hash in self.seen_blocks or block_hash in self.orphans or
+                    self.blockchain.get_indexed_block(block_hash)):
+                continue
+            if not self._should_request(block_hash, now):
+                continue
+            if height > latest_block.index + 1:
+                # Too far ahead to connect a single block; sync headers instead
+                if not self.downloader.active:
+                    self._request_headers(peer)
+                continue
+            wanted['blocks'].append([height, block_hash])
+        
+        for tx_id in data.get('txs', []):
+            if tx_id not in self.seen_txs and self._should_request(tx_id, now):
+                wanted['txs'].append(tx_id)
+        
+        if wanted['blocks'] or wanted['txs']:
+            peer.send({'type': 'get_data', 'data': wanted})
+    
+    def _handle_compact_block(self, data, peer):
+        """Rebuild a pushed block from our mempool, fetching only what is missing"""
+        from hayx.blockchain.block import Block
+        header = Block.from_header_dict(data['header'])
+        if (header.hash in self.seen_blocks or header.hash in self.partial_blocks or
+                self.blockchain.get_indexed_block(header.hash)):
+            return
+        
+        # A block whose parent we lack is still rebuilt, to be kept as an orphan
+        parent = self.blockchain.get_indexed_block(header.previous_hash)
+        if not header.is_header_valid(parent):
+            return
+        
+        partial = PartialBlock(data, self.blockchain.snapshot.pending_transactions())
+        if partial.missing:
+            self.partial_blocks.put(partial.hash, partial)
+            peer.send({
+                'type': 'get_block_txn',
+                'data': {'height': header.index, 'hash': header.hash, 'indexes': partial.missing}
+            })
+        else:
+            self._complete_compact_block(partial, peer)
+    
+    def _complete_compact_block(self, partial, peer):
+        """Connect a fully rebuilt compact block, or fetch it whole if it does not match"""
+        block = partial.to_block()
+        if block is None:
+            # Short id collision or a bad reply; fall back to the full block
+            self.requested.put(partial.hash, time.time())
+            peer.send({'type': 'get_data', 'data': {'blocks': [[partial.header.index, partial.hash]]}})
+            return
+        self.requested.discard(block.hash)
+        if block.hash not in self.seen_blocks:
+            self._handle_new_block(block, peer)
+    
+    def _should_request(self, item_id, now):
+        """True unless another peer was asked for this item recently"""
+        requested_at = self.requested.get(item_id)
+        if requested_at is not None and now - requested_at < Config.GETDATA_TIMEOUT:
+            return False
+        self.requested.put(item_id, now)
+        return True
+    
+    def _send_version(self, peer):
+        """Open a session with our protocol version and supported encodings"""
+        peer.send({
+            'type': 'version',
+            'data': {'version': PROTOCOL_VERSION, 'codecs': SUPPORTED_CODECS, 'compact_blocks': True}
+        })
+    
+    def _request_headers(self, peer):
+        """Ask a peer for the headers after our best block it also has"""
+        peer.send({'type': 'get_headers', 'data': {'locator': self.blockchain.get_locator()}})
+    
+    def _handle_headers(self, data, peer):
+        """Start or extend the block download for a header chain with more work"""
+        from hayx.blockchain.block import Block
+        from hayx.blockchain.blockindex import block_work
+        headers = [Block.from_header_dict(header) for header in data['headers']]
+        peer.height = data['height']
+        if self.downloader.active:
+            self.downloader.extend(headers, data['height'])
+            return
+        
+        snapshot = self.blockchain.snapshot
+        if not headers:
+            return
+        
+        start = headers[0].index
+        if start > snapshot.height:
+            return
+        previous = snapshot.get_block(start - 1) if start > 0 else None
+        for header in headers:
+            if not header.is_header_valid(previous):
+                print(f"Invalid headers from {peer.key}")
+                return
+            previous = header
+        
+        # Same fork choice as the Blockchain: follow the branch with the most work.
+        # A batch that stops short of the peer's tip is fetched and judged as it arrives.
+        fork_work = self.blockchain.get_chain_work(headers[0].previous_hash) if start > 0 else 0
+        work = fork_work + sum(block_work(header) for header in headers)
+        reaches_tip = headers[-1].index + 1 >= data['height']
+        if reaches_tip and work <= self.blockchain.get_chain_work(snapshot.get_latest_block().hash):
+            return
+        
+        self.downloader.begin(headers, data['height'])
+    
+    def _handle_blocks(self, block_data, peer):
+        """Hand a downloaded block range to the scheduler"""
+        from hayx.blockchain.block import Block
+        self.downloader.on_blocks(peer, [Block.from_dict(data) for data in block_data])
+        if not self.downloader.active:
+            self._connect_orphans(self.blockchain.get_latest_block())
+    
+    def _is_valid_branch(self, blocks):
+        """Whether consecutive ``blocks`` are valid on the known block they build on.
+
+        Genesis is mined by each node, so a peer's chain may start from a
+        genesis we do not have; such a chain is checked from its genesis on.
+        """
+        first = blocks[0]
+        previous = self.blockchain.get_indexed_block(first.previous_hash)
+        if previous is None:
+            return first.index == 0 and first.is_valid() and self.blockchain.is_chain_valid(blocks)
+        return previous.index == first.index - 1 and self.blockchain.is_chain_valid([previous] + blocks)
+    
+    def _connect_blocks(self, start, blocks):
+        """Validate blocks following height ``start - 1`` and adopt them"""
+        if blocks[0].index != start or not self._is_valid_branch(blocks):
+            return False
+        
+        if blocks[0].previous_hash == self.blockchain.get_latest_block().hash:
+            for block in blocks:
+                if not self.blockchain.add_block(block):
+                    return False
+            print(f"Synced to block #{blocks[-1].index}")
+            return True
+        
+        # Fork: only the blocks after the fork point were validated
+        if self.blockchain.connect_branch(blocks):
+            print(f"Switched to chain with more work, now at block #{blocks[-1].index}")
+        return True
     
     def _handle_received_chain(self, chain_data):
         """Handle received blockchain from peer"""
@@ -145,156 +325,151 @@ class Node:
             from hayx.blockchain.block import Block
             received_chain = [Block.from_dict(block_data) for block_data in chain_data]
             
-            # Check if received chain is longer and valid
-            if len(received_chain) > len(self.blockchain.chain):
-                # Create temporary blockchain to validate
-                temp_blockchain = type(self.blockchain)()
-                temp_blockchain.chain = received_chain
-                
-                if temp_blockchain.is_chain_valid():
-                    print("Replacing chain with longer valid chain")
-                    self.blockchain.chain = received_chain
-                    self.blockchain.save_blockchain()
+            # Only the blocks after the last one we already know need checking
+            fork = len(received_chain)
+            while fork > 0 and self.blockchain.get_indexed_block(received_chain[fork - 1].hash) is None:
+                fork -= 1
+            if fork == len(received_chain):
+                return
+            blocks = received_chain[fork:]
+            if not self._is_valid_branch(blocks):
+                return
+            if self.blockchain.connect_branch(blocks):
+                print("Switched to received chain with more work")
                     
         except Exception as e:
             print(f"Error handling received chain: {e}")
     
-    def _handle_new_block(self, block):
+    def _handle_new_block(self, block, peer=None):
         """Handle new block from peer"""
         try:
-            # Verify block is valid and extends our chain
             latest_block = self.blockchain.get_latest_block()
+            parent = self.blockchain.get_indexed_block(block.previous_hash)
             
-            if (block.index == latest_block.index + 1 and 
-                block.previous_hash == latest_block.hash and
-                block.is_valid(latest_block)):
-                
-                self.blockchain.chain.append(block)
-                self.blockchain.save_blockchain()
-                print(f"Added new block #{block.index}")
-                
-                # Broadcast to other peers
-                self._broadcast_block(block)
+            if parent is None:
+                # Parent not here yet; hold the block until it connects, and
+                # fetch what we are missing. Its body is checked first, so a
+                # tampered copy cannot take the real block's place
+                if block.has_valid_contents() and self.orphans.add(block):
+                    print(f"Holding orphan block #{block.index}")
+                if block.index > latest_block.index + 1 and peer is not None and not self.downloader.active:
+                    self._request_headers(peer)
+            
+            elif block.index == parent.index + 1 and block.is_valid(parent):
+                if self._accept_block(block, parent):
+                    print(f"Added new block #{block.index}")
+                    
+                    # Announce to other peers
+                    self._broadcast_block(block, exclude=peer)
+                self._connect_orphans(block)
                 
         except Exception as e:
             print(f"Error handling new block: {e}")
     
-    def _connect_to_peers(self):
-        """Connect to known peers"""
-        for peer in list(self.peers):
-            try:
-                host, port = peer.split(':')
-                port = int(port)
-                
-                peer_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                peer_socket.connect((host, port))
-                
-                # Request their blockchain
-                message = {'type': 'get_chain'}
-                self._send_message(peer_socket, message)
-                
-                # Request their peer list
-                message = {'type': 'get_peers'}
-                self._send_message(peer_socket, message)
-                
-                peer_socket.close()
-                
-            except Exception as e:
-                print(f"Failed to connect to peer {peer}: {e}")
-                self.peers.discard(peer)
+    def _accept_block(self, block, parent):
+        """Add a validated block on its known parent; True if it became our tip"""
+        # Marked seen only now, once the block is known to be genuine
+        self.seen_blocks.add(block.hash)
+        # add_block rejects it if the tip moved since we looked
+        if parent.hash == self.blockchain.get_latest_block().hash and self.blockchain.add_block(block):
+            return True
+        return self.blockchain.connect_branch([block])
     
-    def _peer_discovery(self):
-        """Discover new peers periodically"""
-        while self.is_running:
-            try:
-                # Try to discover peers on local network
-                self._discover_local_peers()
-                time.sleep(30)  # Discovery every 30 seconds
-            except Exception as e:
-                print(f"Peer discovery error: {e}")
-                time.sleep(30)
+    def _connect_orphans(self, parent):
+        """Connect held orphans descending from ``parent``, a block we just accepted"""
+        parents = [parent]
+        while parents:
+            parent = parents.pop()
+            for block in self.orphans.pop_children(parent.hash):
+                if not block.is_valid(parent):
+                    continue
+                if self._accept_block(block, parent):
+                    print(f"Connected orphan block #{block.index}")
+                    self._broadcast_block(block)
+                if self.blockchain.get_indexed_block(block.hash):
+                    parents.append(block)
+    
+    def _save_peers(self):
+        now = time.time()
+        save_peers({peer: self.peer_last_seen.get(peer, now) for peer in list(self.peers)})
+    
+    def _mark_seen(self, peer):
+        self.peer_last_seen[peer] = time.time()
     
-    def _discover_local_peers(self):
-        """Discover peers on local network"""
+    def _expire_peers(self):
+        """Forget peers we have not reached for PEER_EXPIRY seconds"""
+        now = time.time()
+        expired = [peer for peer in list(self.peers)
+                   if now - self.peer_last_seen.get(peer, now) > Config.PEER_EXPIRY]
+        for peer in expired:
+            self.peers.discard(peer)
+            self.peer_last_seen.pop(peer, None)
+            print(f"Expired peer: {peer}")
+        return bool(expired)
+    
+    def _discovery_targets(self):
+        """LAN hosts worth probing: our 192.168.x.0/24 minus known and recently dead hosts"""
         import subprocess
         import re
         
-        try:
-            # Get local network range
-            result = subprocess.run(['ip', 'route', 'show'], 
-                                  capture_output=True, text=True)
-            
-            for line in result.stdout.split('\n'):
-                if 'src' in line and '192.168' in line:
-                    network = re.search(r'192\.168\.\d+\.0/24', line)
-                    if network:
-                        network_base = network.group().split('/')[0][:-1]  # Remove .0
-                        
-                        # Scan common IP range
-                        for i in range(1, 255):
-                            ip = f"{network_base}{i}"
-                            peer = f"{ip}:{Config.P2P_PORT}"
-                            
-                            if peer not in self.peers:
-                                # Quick check if port is open
-                                if self._is_port_open(ip, Config.P2P_PORT):
-                                    self.peers.add(peer)
-                                    print(f"Discovered new peer: {peer}")
-                        break
-                        
-        except Exception as e:
-            print(f"Local discovery error: {e}")
+        # Get local network range
+        result = subprocess.run(['ip', 'route', 'show'], 
+                              capture_output=True, text=True)
+        
+        for line in result.stdout.split('\n'):
+            if 'src' in line and '192.168' in line:
+                network = re.search(r'192\.168\.\d+\.0/24', line)
+                if network:
+                    network_base = network.group().split('/')[0][:-1]  # Remove .0
+                    break
+        else:
+            return []
+        
+        now = time.time()
+        hosts = []
+        for i in range(1, 255):
+            ip = f"{network_base}{i}"
+            if f"{ip}:{Config.P2P_PORT}" not in self.peers and self.dead_hosts.get(ip, 0) <= now:
+                hosts.append(ip)
+        return hosts
     
-    def _is_port_open(self, host, port, timeout=1):
-        """Check if a port is open on a host"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            return result == 0
-        except:
+    def _record_probe(self, host, is_open):
+        """Remember the outcome of probing a LAN host"""
+        if not is_open:
+            self.dead_hosts.put(host, time.time() + Config.DEAD_HOST_TTL)
             return False
+        peer = f"{host}:{Config.P2P_PORT}"
+        self.peers.add(peer)
+        self._mark_seen(peer)
+        print(f"Discovered new peer: {peer}")
+        return True
     
-    def _send_message(self, socket, message):
-        """Send message to peer"""
-        try:
-            data = json.dumps(message).encode()
-            socket.send(data)
-        except Exception as e:
-            print(f"Error sending message: {e}")
+    def broadcast_transaction(self, transaction, exclude=None):
+        """Announce a new transaction to peers"""
+        self.broadcast_transactions([transaction], exclude)
     
-    def _broadcast_message(self, message):
-        """Broadcast message to all peers"""
-        for peer in list(self.peers):
-            try:
-                host, port = peer.split(':')
-                port = int(port)
-                
-                peer_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                peer_socket.connect((host, port))
-                self._send_message(peer_socket, message)
-                peer_socket.close()
-                
-            except Exception as e:
-                print(f"Failed to broadcast to {peer}: {e}")
-                self.peers.discard(peer)
-    
-    def broadcast_transaction(self, transaction):
-        """Broadcast new transaction to peers"""
+    def broadcast_transactions(self, transactions, exclude=None):
+        """Announce new transactions to peers in one inventory message"""
+        for tx in transactions:
+            self.seen_txs.add(tx.tx_id)
         message = {
-            'type': 'new_transaction',
-            'data': transaction.to_dict()
+            'type': 'inv',
+            'data': {'txs': [tx.tx_id for tx in transactions]}
         }
-        self._broadcast_message(message)
+        self._broadcast_message(message, exclude)
     
-    def _broadcast_block(self, block):
-        """Broadcast new block to peers"""
+    def _broadcast_block(self, block, exclude=None):
+        """Push a new block to peers as a compact block, or announce it"""
+        self.seen_blocks.add(block.hash)
         message = {
-            'type': 'new_block',
-            'data': block.to_dict()
+            'type': 'inv',
+            'data': {'blocks': [[block.index, block.hash]]}
+        }
+        compact_message = {
+            'type': 'compact_block',
+            'data': compact_block(block)
         }
-        self._broadcast_message(message)
+        self._broadcast_message(message, exclude, compact_message)
     
     def get_peers(self):
         """Get list of connected peers"""
@@ -303,4 +478,167 @@ class Node:
     def add_peer(self, peer_address):
         """Manually add a peer"""
         self.peers.add(peer_address)
-        save_peers(list(self.peers))
+        self._mark_seen(peer_address)
+        self._save_peers()
+    
+    def start(self):
+        """Start the P2P node"""
+        if self.is_running:
+            return
+        
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever)
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+        self.executor = ThreadPoolExecutor(max_workers=Config.P2P_HANDLER_THREADS)
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self._start_server(), self.loop).result()
+        except Exception as e:
+            print(f"Failed to start node: {e}")
+            self._stop_loop()
+            return
+        
+        self.is_running = True
+        print(f"P2P Node started on port {self.port}")
+    
+    def stop(self):
+        """Stop the P2P node"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        except Exception as e:
+            print(f"Error stopping node: {e}")
+        self._stop_loop()
+        
+        print("P2P Node stopped")
+    
+    def _stop_loop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(timeout=5)
+        self.loop.close()
+        self.executor.shutdown(wait=False)
+    
+    async def _start_server(self):
+        self.server = await asyncio.start_server(
+            self._accept_connection, '0.0.0.0', self.port,
+            reuse_address=True, backlog=Config.P2P_BACKLOG
+        )
+        self.loop.create_task(self._maintain_sessions())
+        self.loop.create_task(self._peer_discovery())
+    
+    async def _shutdown(self):
+        self.server.close()
+        for session in self._live_sessions():
+            session.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _accept_connection(self, reader, writer):
+        """Wrap an incoming connection in a session"""
+        address = writer.get_extra_info('peername')
+        print(f"New peer connected: {address}")
+        session = AsyncPeer(address[0], address[1], self._dispatch, self.inbound.discard)
+        self.inbound.add(session)
+        session.attach(reader, writer)
+        self._send_version(session)
+        self._request_headers(session)
+    
+    async def _dispatch(self, message, peer):
+        """Run the handler for a message off the event loop"""
+        await self.loop.run_in_executor(self.executor, self._handle_message, message, peer)
+    
+    def _live_sessions(self):
+        """Connected sessions in both directions"""
+        sessions = list(self.sessions.values()) + list(self.inbound)
+        return [session for session in sessions if session.is_connected]
+    
+    async def _maintain_sessions(self):
+        """(Re)connect to known peers, backing off on failures"""
+        while True:
+            try:
+                await self._connect_to_peers()
+                await self.loop.run_in_executor(self.executor, self.downloader.tick)
+            except Exception as e:
+                print(f"Peer session error: {e}")
+            await asyncio.sleep(1)
+    
+    async def _connect_to_peers(self):
+        """Open a session to every known peer that is not connected"""
+        now = time.time()
+        pending = []
+        for peer in list(self.peers):
+            session = self.sessions.get(peer)
+            if session is None:
+                try:
+                    host, port = peer.split(':')
+                    session = AsyncPeer(host, int(port), self._dispatch)
+                except ValueError:
+                    print(f"Invalid peer address: {peer}")
+                    self.peers.discard(peer)
+                    continue
+                self.sessions[peer] = session
+            
+            if not session.is_connected and now >= session.next_attempt:
+                pending.append(session)
+        
+        changed = self._expire_peers()
+        for session, connected in zip(pending, await asyncio.gather(*(s.connect() for s in pending))):
+            if connected:
+                self._mark_seen(session.key)
+                changed = True
+                # Sync missing blocks and request their peer list
+                self._send_version(session)
+                self._request_headers(session)
+                session.send({'type': 'get_peers'})
+        if changed:
+            self._save_peers()
+    
+    async def _peer_discovery(self):
+        """Discover new peers periodically"""
+        while True:
+            try:
+                await self._discover_local_peers()
+            except Exception as e:
+                print(f"Peer discovery error: {e}")
+            await asyncio.sleep(Config.DISCOVERY_INTERVAL)
+    
+    async def _discover_local_peers(self):
+        """Probe the LAN for open P2P ports, DISCOVERY_CONCURRENCY hosts at a time"""
+        hosts = await self.loop.run_in_executor(self.executor, self._discovery_targets)
+        limit = asyncio.Semaphore(Config.DISCOVERY_CONCURRENCY)
+        results = await asyncio.gather(*(self._probe(host, Config.P2P_PORT, limit) for host in hosts))
+        if any([self._record_probe(host, is_open) for host, is_open in zip(hosts, results)]):
+            self._save_peers()
+    
+    async def _probe(self, host, port, limit):
+        """Check if a port is open on a host"""
+        async with limit:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), Config.DISCOVERY_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            return True
+    
+    def _broadcast_message(self, message, exclude=None, compact_message=None):
+        """Broadcast message to all peers over their open sessions
+
+        Peers that asked for compact blocks get ``compact_message`` instead,
+        if one is given.
+        """
+        if self.is_running:
+            self.loop.call_soon_threadsafe(self._broadcast_now, message, exclude, compact_message)
+    
+    def _broadcast_now(self, message, exclude=None, compact_message=None):
+        for session in self._live_sessions():
+            if session is not exclude:
+                if compact_message is not None and session.compact_blocks:
+                    session.send_nowait(compact_message)
+                else:
+                    session.send_nowait(message)
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class OrphanPool:
+    """Blocks that arrived before their parent, waiting for it to connect.
+
+    Orphans are indexed by the hash of the parent they need. The pool holds
+    at most ``capacity`` blocks, evicting the oldest first, and forgets a
+    block ``expiry`` seconds after it arrived.
+    """
+
+    def __init__(self, capacity=Config.MAX_ORPHAN_BLOCKS, expiry=Config.ORPHAN_BLOCK_EXPIRY):
+        self.capacity = capacity
+        self.expiry = expiry
+        self.blocks = OrderedDict()  # block hash -> (block, received_at), oldest first
+        self.children = {}  # parent hash -> hashes of orphans building on it
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __contains__(self, block_hash):
+        with self.lock:
+            return block_hash in self.blocks
+
+    def add(self, block):
+        """Keep ``block`` until its parent arrives; False if already held."""
+        with self.lock:
+            self._expire(time.time())
+            if block.hash in self.blocks:
+                return False
+            self.blocks[block.hash] = (block, time.time())
+            self.children.setdefault(block.previous_hash, set()).add(block.hash)
+            while len(self.blocks) > self.capacity:
+                self._remove(next(iter(self.blocks)))
+            return True
+
+    def pop_children(self, parent_hash):
+        """Remove and return the orphans whose parent is ``parent_hash``."""
+        with self.lock:
+            self._expire(time.time())
+            hashes = self.children.pop(parent_hash, ())
+            return [self.blocks.pop(block_hash)[0] for block_hash in hashes]
+
+    def _expire(self, now):
+        while self.blocks:
+            block_hash, (_, received_at) = next(iter(self.blocks.items()))
+            if now - received_at <= self.expiry:
+                break
+            self._remove(block_hash)
+
+    def _remove(self, block_hash):
+        block, _ = self.blocks.pop(block_hash)
+        siblings = self.children.get(block.previous_hash)
+        if siblings is not None:
+            siblings.discard(block_hash)
+            if not siblings:
+                del self.children[block.previous_hash]
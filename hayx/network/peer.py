@@ -1,58 +1,144 @@
+import asyncio
 import socket
-import json
-import threading
+import time
+from config import Config
+from .codec import CODEC_JSON
+from .protocol import RECV_SIZE, MessageReader, ProtocolError, iter_frames
 
-class Peer:
-    def __init__(self, address, port):
+def reconnect_delay(failures):
+    """Exponential backoff before reconnecting after `failures` failed attempts."""
+    return min(Config.PEER_RECONNECT_MAX, Config.PEER_RECONNECT_BASE * 2 ** (failures - 1))
+
+class AsyncPeer:
+    """Long-lived, bidirectional session with one peer, on an asyncio event loop.
+
+    A read task awaits ``on_message(message, peer)`` for each message
+    before reading the next one, so a peer that floods us is throttled by
+    TCP. A write task drains a bounded queue and waits on ``drain()`` after
+    every frame, so a slow reader fills its own queue instead of our memory;
+    messages beyond PEER_SEND_QUEUE are dropped. ``send`` may be called from
+    any thread. Outbound sessions can be reconnected after a failure;
+    ``next_attempt`` backs off exponentially.
+    """
+
+    def __init__(self, address, port, on_message=None, on_disconnect=None):
         self.address = address
         self.port = port
+        self.on_message = on_message
+        self.on_disconnect = on_disconnect
         self.is_connected = False
-        self.socket = None
-        self.listener_thread = None
+        self.loop = None
+        self.reader = None
+        self.writer = None
+        self.outbox = None
+        self.tasks = []
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.height = 0  # chain height the peer last reported in 'headers'
+        self.codec = CODEC_JSON  # encoding we send with; set by the version handshake
+        self.compact_blocks = False  # peer wants new blocks pushed as compact blocks
 
-    def connect(self):
+    @property
+    def key(self):
+        return f"{self.address}:{self.port}"
+
+    async def connect(self):
         """Establish connection to peer."""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.address, self.port))
-            self.is_connected = True
-            self.listener_thread = threading.Thread(target=self.listen)
-            self.listener_thread.daemon = True
-            self.listener_thread.start()
-            print(f"Connected to peer {self.address}:{self.port}")
-        except Exception as e:
-            print(f"Failed to connect to peer {self.address}:{self.port} -> {e}")
-            self.is_connected = False
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.address, self.port), Config.PEER_CONNECT_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            self.next_attempt = time.time() + reconnect_delay(self.failures)
+            print(f"Failed to connect to peer {self.address}:{self.port} -> {e!r}")
+            return False
+        self.failures = 0
+        self.attach(reader, writer)
+        print(f"Connected to peer {self.address}:{self.port}")
+        return True
+
+    def attach(self, reader, writer):
+        """Run the session over connected streams; must be called on the loop."""
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.loop = asyncio.get_running_loop()
+        self.reader = reader
+        self.writer = writer
+        self.outbox = asyncio.Queue(maxsize=Config.PEER_SEND_QUEUE)
+        self.is_connected = True
+        self.tasks = [
+            self.loop.create_task(self._read_loop()),
+            self.loop.create_task(self._write_loop()),
+        ]
 
-    def listen(self):
-        """Listen for incoming data from peer."""
+    async def _read_loop(self):
+        messages = MessageReader()
         try:
             while self.is_connected:
-                data = self.socket.recv(4096)
-                if data:
-                    message = json.loads(data.decode())
-                    print(f"Message from {self.address}:{self.port} -> {message}")
-                else:
+                data = await self.reader.read(RECV_SIZE)
+                if not data:
                     break
+                for message in messages.feed(data):
+                    if self.on_message:
+                        await self.on_message(message, self)
+        except asyncio.CancelledError:
+            pass
+        except ProtocolError as e:
+            print(f"Protocol error from peer {self.address}:{self.port} -> {e}")
         except Exception as e:
-            print(f"Error receiving data from peer {self.address}:{self.port} -> {e}")
+            if self.is_connected:
+                print(f"Error receiving data from peer {self.address}:{self.port} -> {e}")
         finally:
-            self.disconnect()
+            self.close()
 
-    def send(self, message):
-        """Send a JSON message to the peer."""
+    async def _write_loop(self):
+        try:
+            while True:
+                message = await self.outbox.get()
+                for frame in iter_frames(message, self.codec):
+                    self.writer.write(frame)
+                    await self.writer.drain()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if self.is_connected:
+                print(f"Error sending message to {self.address}:{self.port} -> {e}")
+        finally:
+            self.close()
+
+    def send_nowait(self, message):
+        """Queue a message; must be called on the loop."""
         if not self.is_connected:
             return False
         try:
-            self.socket.send(json.dumps(message).encode())
+            self.outbox.put_nowait(message)
             return True
-        except Exception as e:
-            print(f"Error sending message to {self.address}:{self.port} -> {e}")
+        except asyncio.QueueFull:
+            print(f"Send queue full for {self.address}:{self.port}, dropping message")
+            return False
+
+    def send(self, message):
+        """Queue a JSON message for the peer; thread-safe."""
+        if not self.is_connected:
             return False
+        try:
+            self.loop.call_soon_threadsafe(self.send_nowait, message)
+        except RuntimeError:  # loop already closed
+            return False
+        return True
 
-    def disconnect(self):
-        """Close connection to peer."""
-        if self.socket:
-            self.socket.close()
+    def close(self):
+        """Close connection to peer; must be called on the loop."""
+        if not self.is_connected:
+            return
         self.is_connected = False
+        self.writer.close()
+        current = asyncio.current_task()
+        for task in self.tasks:
+            if task is not current:
+                task.cancel()
         print(f"Disconnected from peer {self.address}:{self.port}")
+        if self.on_disconnect:
+            self.on_disconnect(self)
@@ -2,8 +2,20 @@
 HayX P2P Protocol Definitions
 
 Standard message types used for communication between nodes.
+
+Wire format: a message is split into one or more frames. Each frame is a
+5-byte header (flags, payload length) followed by the payload; every frame
+but the last has FLAG_MORE set, and FLAG_BINARY marks payloads in the
+binary encoding from codec.py rather than JSON. Senders encode a message
+once and slice it into frames, and receivers reassemble frames
+incrementally, refusing any message larger than Config.MAX_MESSAGE_SIZE.
 """
 
+import json
+import struct
+from config import Config
+from .codec import CODEC_BINARY, CODEC_JSON, CodecError, decode_binary, encode_binary, has_binary_layout
+
 # Message Types
 MSG_GET_CHAIN = 'get_chain'
 MSG_CHAIN = 'chain'
@@ -11,6 +23,29 @@ MSG_NEW_TRANSACTION = 'new_transaction'
 MSG_NEW_BLOCK = 'new_block'
 MSG_GET_PEERS = 'get_peers'
 MSG_PEER_LIST = 'peer_list'
+MSG_GET_HEADERS = 'get_headers'  # data: {'locator': [[height, hash], ...]}
+MSG_HEADERS = 'headers'  # data: {'height': sender's chain height, 'headers': [...]}
+MSG_GET_BLOCKS = 'get_blocks'  # data: {'from': height, 'to': height} (inclusive)
+MSG_BLOCKS = 'blocks'  # data: [block, ...]
+MSG_INV = 'inv'  # data: {'blocks': [[height, hash], ...], 'txs': [tx_id, ...]}
+MSG_GET_DATA = 'get_data'  # same shape as inv; answered with new_block / new_transaction
+MSG_VERSION = 'version'  # data: {'version': PROTOCOL_VERSION, 'codecs': [...], 'compact_blocks': bool}, sent first
+MSG_COMPACT_BLOCK = 'compact_block'  # data: {'header': {...}, 'short_ids': [...], 'prefilled': [[index, tx], ...]}
+MSG_GET_BLOCK_TXN = 'get_block_txn'  # data: {'height': height, 'hash': hash, 'indexes': [...]}
+MSG_BLOCK_TXN = 'block_txn'  # data: {'hash': hash, 'transactions': [...]}
+
+PROTOCOL_VERSION = 1
+
+# Framing
+FRAME_HEADER = struct.Struct('>BI')  # flags, payload length
+FLAG_MORE = 0x01  # more frames of the same message follow
+FLAG_BINARY = 0x02  # payload uses the binary codec
+RECV_SIZE = 64 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised on malformed or oversized frames; the connection should be dropped."""
+
 
 def create_message(msg_type, data=None):
     """Create a standard protocol message."""
@@ -24,3 +59,55 @@ def parse_message(message):
     msg_type = message.get('type')
     data = message.get('data')
     return msg_type, data
+
+def iter_frames(message, codec=CODEC_JSON, chunk_size=Config.MESSAGE_CHUNK_SIZE):
+    """Encode a message once and slice the payload into frames.
+
+    With the binary codec, message types that have a binary layout are sent
+    binary-encoded; everything else stays JSON.
+    """
+    binary = codec == CODEC_BINARY and has_binary_layout(message)
+    payload = memoryview(encode_binary(message) if binary else json.dumps(message).encode())
+    for start in range(0, len(payload), chunk_size):
+        chunk = payload[start:start + chunk_size]
+        flags = (FLAG_BINARY if binary else 0) | (FLAG_MORE if start + chunk_size < len(payload) else 0)
+        yield FRAME_HEADER.pack(flags, len(chunk)) + chunk
+
+
+class MessageReader:
+    """Incremental frame reassembly: feed received bytes, get complete messages."""
+
+    def __init__(self, max_size=Config.MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self.payload = bytearray()
+
+    def feed(self, data):
+        """Consume bytes from the stream; return the messages they complete."""
+        self.buffer += data
+        messages = []
+        offset = 0
+        while len(self.buffer) - offset >= FRAME_HEADER.size:
+            flags, length = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if len(self.payload) + length > self.max_size:
+                raise ProtocolError(f"message exceeds {self.max_size} bytes")
+            start = offset + FRAME_HEADER.size
+            if len(self.buffer) - start < length:
+                break
+            self.payload += self.buffer[start:start + length]
+            offset = start + length
+            if not flags & FLAG_MORE:
+                messages.append(self._decode(flags & FLAG_BINARY))
+        del self.buffer[:offset]
+        return messages
+
+    def _decode(self, binary):
+        try:
+            message = decode_binary(self.payload) if binary else json.loads(self.payload)
+        except (CodecError, ValueError) as e:
+            raise ProtocolError(f"invalid message: {e}")
+        finally:
+            self.payload = bytearray()
+        if not isinstance(message, dict):
+            raise ProtocolError("message is not an object")
+        return message
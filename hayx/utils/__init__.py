@@ -0,0 +1,7 @@
+# hayx/utils/__init__.py
+
+"""
+HayX Utilities
+
+Small helpers shared across modules.
+"""
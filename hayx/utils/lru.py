@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry past ``capacity``.
+
+    Also used as a bounded set via ``add`` / ``in``.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def add(self, key):
+        """Insert ``key``; False if it was already present."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return False
+            self.entries[key] = True
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
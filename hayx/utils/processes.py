@@ -0,0 +1,26 @@
+"""
+Start method for worker process pools.
+
+The node runs many threads (Flask-SocketIO, the P2P event loop, message
+handlers), and forking such a process can copy a lock that another
+thread holds. Worker pools therefore start from a fork server that has
+imported only the worker modules, or are spawned where there is no fork
+server. Either way a worker also imports the main script as
+``__mp_main__``, so entry points keep their startup code under
+``if __name__ == "__main__"``.
+"""
+
+import multiprocessing as mp
+
+# Imported once by the fork server; workers are forked from it
+WORKER_MODULES = ['hayx.blockchain.validation', 'hayx.mining.parallel']
+
+
+def worker_context():
+    """Multiprocessing context for worker pools."""
+    if 'forkserver' in mp.get_all_start_methods():
+        context = mp.get_context('forkserver')
+        context.set_forkserver_preload(WORKER_MODULES)
+        return context
+    return mp.get_context('spawn')
+
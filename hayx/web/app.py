@@ -3,11 +3,11 @@ from flask_socketio import SocketIO, emit
 import threading
 import time
 from datetime import datetime, timedelta
-from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.service import get_blockchain
 from hayx.crypto.wallet import Wallet
 from hayx.mining.miner import Miner
 from hayx.network.node import Node
-from hayx.api.rest_api import api
+from hayx.api import rest_api
 from config import Config
 
 # Initialize Flask app
@@ -16,13 +16,13 @@ app.config['SECRET_KEY'] = 'hayx_secret_key_2024'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Register REST API Blueprint
-app.register_blueprint(api, url_prefix='/api')
+app.register_blueprint(rest_api.api, url_prefix='/api')
 
-# Global instances
-blockchain = Blockchain()
+# Global instances (the chain is shared with the API blueprint, miners and node)
+blockchain = get_blockchain()
 current_wallet = None
 current_miner = None
-node = None
+node = rest_api.node  # the P2P node started and stopped through /api/node
 
 # Helper: Load/Create Wallet
 def init_default_wallet():
@@ -66,7 +66,6 @@ def wallet():
     global current_wallet
     wallets = Wallet.list_wallets()
     balance = 0
-    transactions = []
 
     if not current_wallet and wallets:
         try:
@@ -79,16 +78,13 @@ def wallet():
     if current_wallet:
         try:
             balance = blockchain.get_balance(current_wallet.get_address())
-            transactions = blockchain.get_transaction_history(current_wallet.get_address())
         except Exception as e:
             print(f"⚠️ Failed to fetch wallet data: {e}")
             balance = 0
-            transactions = []
 
     return render_template("wallet.html",
                            wallet=current_wallet,
                            balance=balance,
-                           transactions=transactions,
                            wallets=wallets)
 @app.route('/miner')
 def miner():
@@ -113,7 +109,7 @@ def miner():
 
 @app.route('/chain')
 def chain():
-    blocks = [block.to_dict() for block in reversed(blockchain.chain[-10:])]
+    blocks = [block.to_dict() for block in reversed(blockchain.snapshot.tail(10))]
     stats = blockchain.get_stats()
     return render_template('chain.html', blocks=blocks, stats=stats)
 
@@ -183,11 +179,12 @@ def get_mining_stats_api():
         
         return jsonify({
             'hash_rate': stats.get('hash_rate', 0),
+            'hash_rate_avg': stats.get('hash_rate_avg', 0),
             'blocks_mined': stats.get('blocks_mined', 0),
             'total_rewards': stats.get('total_rewards', 0),
             'is_mining': stats.get('is_mining', False),
             'difficulty': blockchain.difficulty if hasattr(blockchain, 'difficulty') else 1,
-            'pending_transactions': len(blockchain.pending_transactions) if hasattr(blockchain, 'pending_transactions') else 0,
+            'pending_transactions': blockchain.snapshot.pending_count,
             'wallet_balance': wallet_balance,
             'wallet_address': current_wallet.get_address(),
             'mining_reward': stats.get('mining_reward', 1.0),
@@ -206,28 +203,13 @@ def get_hashrate_history():
     if not current_miner:
         return jsonify({'error': 'No active miner'}), 400
     
-    history = getattr(current_miner, 'hash_rate_history', [])
-    if not history:
-        current_hash_rate = current_miner.get_mining_stats().get('hash_rate', 0)
-        now = datetime.now()
-        history = []
-        for i in range(20):
-            timestamp = now - timedelta(minutes=i)
-            variation = current_hash_rate * 0.1 * (0.5 - abs(i % 10 - 5) / 10)
-            hash_rate = max(0, current_hash_rate + variation)
-            history.append({
-                'timestamp': timestamp.isoformat(),
-                'hash_rate': round(hash_rate, 2)
-            })
-        history.reverse()
-    
-    return jsonify(history)
+    return jsonify(getattr(current_miner, 'hash_rate_history', []))
 
 @app.route('/api/mining/pending-transactions')
 def get_pending_transactions():
     pending_txs = []
     if hasattr(blockchain, 'pending_transactions'):
-        for tx in blockchain.pending_transactions[:10]:
+        for tx in blockchain.snapshot.pending_transactions()[:10]:
             pending_txs.append({
                 'from_address': tx.from_address if hasattr(tx, 'from_address') else 'N/A',
                 'to_address': tx.to_address if hasattr(tx, 'to_address') else 'N/A',
@@ -309,6 +291,18 @@ def handle_connect():
 def handle_disconnect():
     print('Client disconnected')
 
+@socketio.on('send_transactions')
+def handle_send_transactions(data):
+    """Socket counterpart of POST /api/transactions/send; replies with 'transactions_result'."""
+    try:
+        accepted, results = blockchain.submit_transactions(data)
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+        return
+    if accepted:
+        node.broadcast_transactions(accepted)
+    emit('transactions_result', {'accepted': len(accepted), 'results': results})
+
 # Periodic Background Updates
 def background_updates():
     while True:
@@ -1,13 +1,13 @@
 from flask import render_template, request, jsonify
 from hayx.crypto.wallet import Wallet
-from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.service import get_blockchain
 from hayx.mining.miner import Miner
 from hayx.network.node import Node
 from config import Config
 
-# Shared instances (usually you’d inject or import these from a common state manager)
-blockchain = Blockchain()
-current_wallet = Wallet.list_wallets()[0] if Wallet.list_wallets() else Wallet("default")
+# Shared instances (the chain comes from the process-wide chain state service)
+blockchain = get_blockchain()
+current_wallet = Wallet(Wallet.list_wallets()[0]) if Wallet.list_wallets() else Wallet("default")
 current_miner = Miner(current_wallet.get_address())
 node = Node(blockchain)
 
@@ -15,12 +15,10 @@ def register_routes(app):
     @app.route('/wallet')
     def wallet():
         balance = blockchain.get_balance(current_wallet.get_address())
-        transactions = blockchain.get_transaction_history(current_wallet.get_address())
         wallets = Wallet.list_wallets()
         return render_template('wallet.html',
                                wallet=current_wallet,
                                balance=balance,
-                               transactions=transactions,
                                wallets=wallets)
 
     @app.route('/miner')
@@ -30,7 +28,7 @@ def register_routes(app):
 
     @app.route('/chain')
     def chain():
-        blocks = [block.to_dict() for block in reversed(blockchain.chain[-10:])]
+        blocks = [block.to_dict() for block in reversed(blockchain.snapshot.tail(10))]
         stats = blockchain.get_stats()
         return render_template('chain.html', blocks=blocks, stats=stats)
 
@@ -1,10 +1,10 @@
 from flask_socketio import emit
-from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.service import get_blockchain
 from hayx.mining.miner import Miner
 from hayx.crypto.wallet import Wallet
 from hayx.network.node import Node
 
-blockchain = Blockchain()
+blockchain = get_blockchain()
 current_wallet = None
 current_miner = None
 node = None
@@ -70,7 +70,7 @@ def register_socketio_events(socketio):
 
     @socketio.on('get_chain')
     def handle_get_chain():
-        chain_data = [block.to_dict() for block in blockchain.chain]
+        chain_data = [block.to_dict() for block in blockchain.snapshot.iter_blocks()]
         emit('chain_data', {'chain': chain_data})
 
 def get_stats():
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-from hayx.web.app import app, socketio
 from config import Config
 
 if __name__ == "__main__":
+    # Imported here so worker processes, which re-import this script, do not load the app
+    from hayx.web.app import app, socketio
     print(f"🚀 Starting HayX Web Server on http://localhost:{Config.WEB_PORT}")
     socketio.run(app, host="0.0.0.0", port=Config.WEB_PORT, debug=False)
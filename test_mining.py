@@ -3,12 +3,35 @@
 Test script for HayX mining functionality
 """
 
+import os
+import shutil
+import tempfile
 import time
 import requests
 import json
+from contextlib import contextmanager
 from hayx.blockchain.blockchain import Blockchain
 from hayx.crypto.wallet import Wallet
 from hayx.mining.miner import Miner
+from config import Config
+
+@contextmanager
+def temporary_data_dir():
+    """Point every data file at a scratch directory, so the node's own data is left alone"""
+    data_dir = tempfile.mkdtemp(prefix='hayx-test-')
+    saved = dict(vars(Config))
+    for name, value in saved.items():
+        if isinstance(value, str) and value.startswith(Config.DATA_DIR + os.sep):
+            setattr(Config, name, os.path.join(data_dir, os.path.relpath(value, Config.DATA_DIR)))
+    Config.DATA_DIR = data_dir
+    os.makedirs(Config.WALLETS_DIR)
+    try:
+        yield data_dir
+    finally:
+        for name, value in saved.items():
+            if name in vars(Config) and not name.startswith('__'):
+                setattr(Config, name, value)
+        shutil.rmtree(data_dir, ignore_errors=True)
 
 def test_mining_functionality():
     """Test the mining functionality"""
@@ -16,6 +39,10 @@ def test_mining_functionality():
     print("=" * 50)
     
     # Initialize components
+    with temporary_data_dir():
+        return _check_mining()
+
+def _check_mining():
     try:
         blockchain = Blockchain()
         print("✅ Blockchain initialized")
@@ -30,7 +57,7 @@ def test_mining_functionality():
             print(f"✅ Loaded wallet: {wallet.name}")
         
         # Initialize miner
-        miner = Miner(wallet.get_address())
+        miner = Miner(wallet.get_address(), blockchain=blockchain)
         print(f"✅ Miner initialized for address: {wallet.get_address()}")
         
         # Test mining stats
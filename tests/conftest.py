@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+def use_data_dir(monkeypatch, path):
+    """Point every data file at ``path``."""
+    os.makedirs(path, exist_ok=True)
+    monkeypatch.setattr(Config, 'DATA_DIR', str(path))
+    monkeypatch.setattr(Config, 'BLOCKCHAIN_FILE', os.path.join(path, 'blockchain.json'))
+    monkeypatch.setattr(Config, 'BLOCKS_DIR', os.path.join(path, 'blocks'))
+    monkeypatch.setattr(Config, 'CHAINSTATE_FILE', os.path.join(path, 'chainstate.json'))
+    monkeypatch.setattr(Config, 'MEMPOOL_FILE', os.path.join(path, 'mempool.log'))
+    monkeypatch.setattr(Config, 'STATE_FILE', os.path.join(path, 'state.json'))
+    monkeypatch.setattr(Config, 'TX_INDEX_FILE', os.path.join(path, 'txindex.json'))
+    monkeypatch.setattr(Config, 'PEERS_FILE', os.path.join(path, 'peers.json'))
+    monkeypatch.setattr(Config, 'WALLETS_DIR', os.path.join(path, 'wallets'))
+    os.makedirs(Config.WALLETS_DIR, exist_ok=True)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A fresh data directory, mining at difficulty 1."""
+    use_data_dir(monkeypatch, str(tmp_path))
+    monkeypatch.setattr(Config, 'DIFFICULTY_TARGET', 1)
+    monkeypatch.setattr(Config, 'BLOCK_LOG_FSYNC', False)
+    return tmp_path
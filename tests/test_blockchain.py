@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import pytest
+from hayx.blockchain.block import Block
+from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.blockindex import block_work
+from hayx.blockchain.storage import BlockStore
+from hayx.blockchain.transaction import Transaction
+from hayx.crypto.keys import KeyPair
+from config import Config
+
+
+def mine(blockchain, count, address='miner'):
+    for _ in range(count):
+        assert blockchain.mine_empty_block(address)
+
+
+def test_indexes_are_snapshotted_while_mining(data_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'STATE_SNAPSHOT_INTERVAL', 5)
+    blockchain = Blockchain()
+    mine(blockchain, 12)
+    assert os.path.exists(Config.STATE_FILE)
+    assert os.path.exists(Config.TX_INDEX_FILE)
+
+    reloaded = Blockchain()
+    assert reloaded.get_latest_block().hash == blockchain.get_latest_block().hash
+    assert reloaded.get_balance('miner') == blockchain.get_balance('miner')
+
+
+def test_migrates_shipped_legacy_chain(data_dir):
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'fixtures', 'legacy_blockchain.json'), Config.BLOCKCHAIN_FILE)
+    blockchain = Blockchain()
+    assert [block.hash for block in blockchain.chain] == ['0000abcd1234ef5678...', '0000bcde2345fa6789...']
+    assert blockchain.get_balance('genesis') == Config.GENESIS_REWARD
+    assert os.path.exists(Config.BLOCKCHAIN_FILE + '.migrated')
+
+    mine(blockchain, 1)
+    reloaded = Blockchain()
+    assert len(reloaded.chain) == 3
+    assert reloaded.get_latest_block().hash == blockchain.get_latest_block().hash
+
+
+def write_legacy_file(blocks):
+    with open(Config.BLOCKCHAIN_FILE, 'w') as f:
+        json.dump({'chain': [block.to_dict() for block in blocks], 'difficulty': 1}, f)
+
+
+def test_interrupted_migration_is_redone(data_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'STATE_SNAPSHOT_INTERVAL', 5)
+    source = Blockchain()
+    mine(source, 11)
+    blocks = list(source.chain)
+    shutil.rmtree(Config.BLOCKS_DIR)
+    for name in (Config.STATE_FILE, Config.TX_INDEX_FILE, Config.CHAINSTATE_FILE):
+        os.remove(name)
+    write_legacy_file(blocks)
+
+    # Crash after the state snapshot at height 5 but before the log is complete
+    append = BlockStore.append
+    def crashing_append(store, block):
+        if block.index == 8:
+            raise OSError("disk full")
+        append(store, block)
+    monkeypatch.setattr(BlockStore, 'append', crashing_append)
+    with pytest.raises(OSError):
+        Blockchain()
+    assert len(BlockStore(Config.BLOCKS_DIR)) == 0
+    assert os.path.exists(Config.BLOCKCHAIN_FILE)
+
+    monkeypatch.setattr(BlockStore, 'append', append)
+    migrated = Blockchain()
+    assert [block.hash for block in migrated.chain] == [block.hash for block in blocks]
+    assert migrated.get_balance('miner') == source.get_balance('miner')
+    assert not os.path.exists(Config.BLOCKS_DIR + '.tmp')
+    assert not os.path.exists(Config.BLOCKCHAIN_FILE)
+
+    reloaded = Blockchain()
+    assert len(reloaded.chain) == 12
+    assert reloaded.get_balance('miner') == source.get_balance('miner')
+
+
+def test_block_that_fails_to_connect_is_rolled_back(data_dir, monkeypatch):
+    blockchain = Blockchain()
+    mine(blockchain, 2)
+    balance = blockchain.get_balance('miner')
+    block = blockchain.create_block_template('miner')
+    block.mine_block(blockchain.difficulty)
+
+    def failing_apply(block):
+        raise OSError("disk full")
+    with monkeypatch.context() as patch:
+        patch.setattr(blockchain.tx_index, 'apply_block', failing_apply)
+        with pytest.raises(OSError):
+            blockchain.add_block(block)
+    assert len(blockchain.chain) == len(blockchain.store) == 3
+    assert blockchain.snapshot.blocks[-1].hash != block.hash
+    assert blockchain.get_balance('miner') == balance
+    assert block.hash not in blockchain.block_index
+
+    assert blockchain.add_block(block)
+    reloaded = Blockchain()
+    assert reloaded.get_latest_block().hash == block.hash
+    assert reloaded.get_balance('miner') == blockchain.get_balance('miner')
+
+
+def test_work_comes_from_the_recorded_difficulty():
+    block = Block(1, [Transaction('coinbase', 'miner', 10, 0)], 'ab' * 32)
+    block.prepare_header(1)
+    block.hash = block.calculate_hash()
+    while not block.hash.startswith('00'):
+        block.nonce += 1
+        block.hash = block.calculate_hash()
+    assert block.has_valid_contents()
+    assert block_work(block) == 16
+
+    # Claiming a higher target changes the header, so the hash no longer meets it
+    overclaimed = Block.from_dict(dict(block.to_dict(), difficulty=4))
+    assert not overclaimed.has_valid_contents()
+
+
+def test_snapshots_keep_their_view_while_the_chain_moves_on(data_dir):
+    blockchain = Blockchain()
+    mine(blockchain, 1)
+    keypair = KeyPair()
+    blockchain.state.balances[keypair.get_address()] = 100.0
+    tx = Transaction(keypair.get_address(), 'recipient', 10, 0.01)
+    tx.sign_transaction(keypair.get_private_key_hex())
+    assert blockchain.add_transaction(tx)
+    before = blockchain.snapshot
+    tip = before.get_latest_block()
+
+    # Appending blocks and mining the pending transaction
+    assert blockchain.mine_pending_transactions('miner')
+    mine(blockchain, 1)
+    assert blockchain.snapshot.pending_transactions() == []
+    assert (before.height, before.get_latest_block()) == (2, tip)
+    assert [pending.tx_id for pending in before.pending_transactions()] == [tx.tx_id]
+    with pytest.raises(IndexError):
+        before.get_block(2)
+
+    # Reorganizing onto a branch with more work
+    mined = blockchain.snapshot
+    replaced = mined.get_block(3)
+    heavy = Block(2, [Transaction('coinbase', 'other', blockchain.get_block_reward(2), 0)], tip.hash)
+    heavy.mine_block(3)
+    assert blockchain.connect_branch([heavy])
+    assert blockchain.get_latest_block().hash == heavy.hash
+    assert mined.height == 4 and mined.get_block(3) is replaced
+    assert [block.hash for block in mined.iter_blocks()] != [block.hash for block in blockchain.snapshot.iter_blocks()]
@@ -0,0 +1,52 @@
+import pytest
+from hayx.blockchain.block import Block
+from hayx.blockchain.transaction import Transaction
+from hayx.crypto.keys import KeyPair
+from hayx.network.codec import CodecError, decode_binary, encode_binary
+from hayx.network.compact import compact_block
+
+
+@pytest.fixture(scope='module')
+def block():
+    """A mined block with a coinbase, a signed and an unsigned transaction."""
+    keypair = KeyPair()
+    signed = Transaction(keypair.get_address(), 'recipient', 12.5, 0.01)
+    signed.sign_transaction(keypair.get_private_key_hex())
+    unsigned = Transaction(keypair.get_address(), keypair.get_address(), 3, 0)
+    block = Block(7, [signed, unsigned, Transaction('coinbase', 'miner', 50, 0)], 'ab' * 32)
+    block.mine_block(1)
+    return block
+
+
+def messages(block):
+    transactions = [tx.to_dict() for tx in block.transactions]
+    with_extra = dict(transactions[0], memo='Ünïcode note')
+    legacy = dict(block.to_dict(), version=1, previous_hash='0')
+    del legacy['merkle_root']
+    return [
+        {'type': 'new_transaction', 'data': transactions[0]},
+        {'type': 'new_transaction', 'data': with_extra},
+        {'type': 'new_block', 'data': block.to_dict()},
+        {'type': 'new_block', 'data': dict(block.to_dict(), transactions=[transactions[1], with_extra])},
+        {'type': 'blocks', 'data': [legacy, block.to_dict()]},
+        {'type': 'blocks', 'data': []},
+        {'type': 'headers', 'data': {'height': 8, 'headers': [block.header_to_dict()]}},
+        {'type': 'inv', 'data': {'blocks': [[7, block.hash]], 'txs': [tx['tx_id'] for tx in transactions]}},
+        {'type': 'get_data', 'data': {'blocks': [], 'txs': ['not-hex', 'ABCD']}},
+        {'type': 'compact_block', 'data': compact_block(block)},
+        {'type': 'block_txn', 'data': {'hash': block.hash, 'transactions': transactions[:2]}},
+    ]
+
+
+def test_every_layout_round_trips(block):
+    for message in messages(block):
+        assert decode_binary(encode_binary(message)) == message
+
+
+def test_truncated_messages_are_rejected(block):
+    payload = encode_binary({'type': 'new_block', 'data': block.to_dict()})
+    for size in (1, 2, len(payload) // 2, len(payload) - 1):
+        with pytest.raises(CodecError):
+            decode_binary(payload[:size])
+    with pytest.raises(CodecError):
+        decode_binary(payload + b'\x00')
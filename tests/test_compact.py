@@ -0,0 +1,59 @@
+import pytest
+from hayx.blockchain.block import Block
+from hayx.blockchain.transaction import Transaction
+from hayx.crypto.keys import KeyPair
+from hayx.network import compact
+from hayx.network.compact import PartialBlock, compact_block
+
+
+@pytest.fixture(scope='module')
+def block():
+    keypair = KeyPair()
+    transactions = [Transaction('coinbase', 'miner', 50, 0)]
+    for amount in (1, 2, 3):
+        tx = Transaction(keypair.get_address(), 'recipient', amount, 0.01)
+        tx.sign_transaction(keypair.get_private_key_hex())
+        transactions.append(tx)
+    block = Block(3, transactions, 'ab' * 32)
+    block.mine_block(1)
+    return block
+
+
+def test_block_is_rebuilt_from_the_mempool(block):
+    data = compact_block(block)
+    assert [index for index, _ in data['prefilled']] == [0]
+    assert len(data['short_ids']) == 3
+
+    unrelated = Transaction('someone', 'else', 5, 0)
+    partial = PartialBlock(data, [unrelated] + block.transactions[:0:-1])
+    assert partial.missing == []
+    assert partial.to_block().to_dict() == block.to_dict()
+
+
+def test_missing_transactions_are_filled_in(block):
+    partial = PartialBlock(compact_block(block), block.transactions[1:3])
+    assert partial.missing == [3]
+    partial.fill([block.transactions[3].to_dict()])
+    assert partial.to_block().hash == block.hash
+
+    wrong = PartialBlock(compact_block(block), block.transactions[1:3])
+    wrong.fill([block.transactions[1].to_dict()])
+    assert wrong.to_block() is None
+    with pytest.raises(ValueError):
+        PartialBlock(compact_block(block), []).fill([])
+
+
+def test_colliding_short_ids_are_fetched(block, monkeypatch):
+    data = compact_block(block)
+    monkeypatch.setattr(compact, 'short_tx_id', lambda block_hash, tx_id: data['short_ids'][0])
+    partial = PartialBlock(data, block.transactions[1:])
+    assert partial.missing == [1, 2, 3]
+
+
+def test_bad_prefilled_indexes_are_refused(block):
+    data = compact_block(block)
+    for index in (-1, 4):
+        with pytest.raises(ValueError):
+            PartialBlock(dict(data, prefilled=[[index, data['prefilled'][0][1]]]), block.transactions)
+    with pytest.raises(ValueError):
+        PartialBlock(dict(data, prefilled=data['prefilled'] * 2, short_ids=data['short_ids'][1:]), [])
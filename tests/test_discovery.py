@@ -0,0 +1,59 @@
+import asyncio
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from test_node import free_port
+from hayx.blockchain.blockchain import Blockchain
+from hayx.network.node import Node
+from config import Config, load_peers, save_peers
+
+ROUTES = "192.168.5.0/24 dev eth0 proto kernel scope link src 192.168.5.10\n"
+
+
+def test_sweep_skips_known_and_recently_dead_hosts(data_dir, monkeypatch):
+    monkeypatch.setattr(subprocess, 'run', lambda *args, **kwargs: SimpleNamespace(stdout=ROUTES))
+    node = Node(Blockchain(), free_port())
+    node.peers.add(f"192.168.5.7:{Config.P2P_PORT}")
+    node.dead_hosts.put('192.168.5.9', time.time() + 60)
+    node.dead_hosts.put('192.168.5.11', time.time() - 1)  # its time is up
+
+    targets = node._discovery_targets()
+    assert len(targets) == 252
+    assert '192.168.5.7' not in targets and '192.168.5.9' not in targets
+    assert '192.168.5.11' in targets
+
+
+def test_probes_record_live_peers_and_dead_hosts(data_dir, monkeypatch):
+    async def sweep(node):
+        node.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', Config.P2P_PORT)
+        try:
+            await node._discover_local_peers()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    monkeypatch.setattr(Config, 'P2P_PORT', free_port())
+    node = Node(Blockchain(), free_port())
+    node.peers = set()
+    monkeypatch.setattr(node, '_discovery_targets', lambda: ['127.0.0.1', '127.0.0.2'])
+    with ThreadPoolExecutor(1) as node.executor:
+        asyncio.run(sweep(node))
+
+    live = f"127.0.0.1:{Config.P2P_PORT}"
+    assert node.peers == {live}
+    assert node.dead_hosts.get('127.0.0.2') > time.time() + Config.DEAD_HOST_TTL - 60
+    assert list(load_peers()) == [live]
+
+
+def test_stale_peers_expire(data_dir):
+    now = time.time()
+    save_peers({'fresh:1': now, 'stale:1': now - Config.PEER_EXPIRY - 1})
+    assert list(load_peers()) == ['fresh:1']
+
+    node = Node(Blockchain(), free_port())
+    node.peers.add('stale:1')
+    node.peer_last_seen['stale:1'] = now - Config.PEER_EXPIRY - 1
+    assert node._expire_peers()
+    assert node.peers == {'fresh:1'}
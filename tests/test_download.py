@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+import pytest
+from hayx.network.download import BlockDownloader
+from config import Config
+
+
+class FakePeer:
+    def __init__(self, name, height):
+        self.key = name
+        self.height = height
+        self.is_connected = True
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def requested(self):
+        return [(m['data']['from'], m['data']['to']) for m in self.sent if m['type'] == 'get_blocks']
+
+
+class FakeNode:
+    def __init__(self, peers):
+        self.peers = peers
+        self.connected = []
+
+    def _live_sessions(self):
+        return [peer for peer in self.peers if peer.is_connected]
+
+    def _connect_blocks(self, start, blocks):
+        assert start == len(self.connected) + 1
+        self.connected += blocks
+        return True
+
+
+def block(height):
+    return SimpleNamespace(index=height, hash=f'hash-{height}')
+
+
+def blocks(first, last):
+    return [block(height) for height in range(first, last + 1)]
+
+
+@pytest.fixture
+def downloader(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_BLOCKS_PER_MESSAGE', 2)
+    monkeypatch.setattr(Config, 'DOWNLOAD_WINDOW', 2)
+    a, b = FakePeer('a', 10), FakePeer('b', 10)
+    node = FakeNode([a, b])
+    downloader = BlockDownloader(node)
+    downloader.begin(blocks(1, 6), 7)
+    assert a.requested() == [(1, 2), (5, 6)] and b.requested() == [(3, 4)]
+    return downloader, node, a, b
+
+
+def test_stalled_range_is_handed_to_another_peer(downloader):
+    downloader, node, a, b = downloader
+    downloader.requests[a][0][2] -= Config.BLOCK_DOWNLOAD_TIMEOUT + 1
+    downloader.tick()
+    assert b.requested() == [(3, 4), (1, 2)]
+    assert a.requested() == [(1, 2), (5, 6)]  # not asked again
+
+    downloader.on_blocks(b, blocks(3, 4))
+    assert node.connected == []  # waits for the heights below
+    downloader.on_blocks(b, blocks(1, 2))
+    downloader.on_blocks(a, blocks(1, 2))  # the late reply to the stalled request
+    downloader.on_blocks(a, blocks(5, 6))
+    assert [connected.index for connected in node.connected] == list(range(1, 7))
+    assert not downloader.active
+
+
+def test_ranges_of_a_disconnected_peer_are_reassigned(downloader):
+    downloader, node, a, b = downloader
+    a.is_connected = False
+    downloader.tick()
+    assert a not in downloader.requests
+    assert sorted(b.requested()[1:]) == [(1, 2)]
+
+    downloader.on_blocks(b, blocks(3, 4))
+    assert b.requested()[2:] == [(5, 6)]
+    downloader.on_blocks(b, blocks(1, 2))
+    downloader.on_blocks(b, blocks(5, 6))
+    assert len(node.connected) == 6 and not downloader.active
+
+
+def test_wrong_blocks_are_requested_from_someone_else(downloader):
+    downloader, node, a, b = downloader
+    downloader.on_blocks(b, [block(3), SimpleNamespace(index=4, hash='forged')])
+    assert downloader.failed[4] == {b}
+    assert 3 in downloader.blocks and 4 not in downloader.blocks
+
+    downloader.on_blocks(a, blocks(1, 2))
+    assert a.requested()[2:] == [(4, 4)]
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import pytest
+from hayx.mining import hashrate
+from hayx.mining.hashrate import HashRateMeter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(hashrate, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def steady(meter, clock, seconds, per_second):
+    for _ in range(seconds):
+        clock.now += 1
+        meter.record(per_second)
+
+
+def test_rates_cover_their_trailing_windows(clock):
+    meter = HashRateMeter(instant_window=2.0, window=60.0)
+    steady(meter, clock, 10, 100)
+    # Before a full window has passed, the rate is over the time since reset
+    assert meter.rate() == pytest.approx(100)
+
+    steady(meter, clock, 90, 100)
+    steady(meter, clock, 2, 400)
+    assert meter.instantaneous() == pytest.approx(400)
+    assert meter.rate() == pytest.approx((58 * 100 + 2 * 400) / 60)
+    assert len(meter.samples) <= 62  # older samples are dropped
+
+    clock.now += 30
+    assert meter.instantaneous() == 0
+    assert meter.rate() == pytest.approx((28 * 100 + 2 * 400) / 60)
+
+
+def test_reset_starts_measuring_again(clock):
+    meter = HashRateMeter()
+    steady(meter, clock, 5, 1000)
+    meter.reset()
+    clock.now += 1
+    assert meter.rate() == 0
+    meter.record(50)
+    assert meter.rate() == pytest.approx(50)
@@ -0,0 +1,108 @@
+import itertools
+import pytest
+from conftest import use_data_dir
+from concurrent.futures import ProcessPoolExecutor
+from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.mempool import Mempool, MempoolEntry, MempoolJournal
+from hayx.blockchain.transaction import Transaction
+from hayx.crypto.keys import KeyPair
+from hayx.utils.processes import worker_context
+from config import Config
+
+
+TIMESTAMPS = itertools.count(1700000000)
+
+
+def pending(fee, sender='alice', amount=1):
+    """An unsigned transfer; equal fees give equal fee rates."""
+    tx = Transaction(sender, 'bob', amount, fee)
+    tx.timestamp = float(next(TIMESTAMPS))
+    tx.tx_id = tx.calculate_hash()
+    return tx
+
+
+def test_templates_take_the_best_fee_rate_first():
+    mempool = Mempool()
+    low, high, tied, dropped = pending(0.01), pending(0.5), pending(0.01), pending(0.3)
+    for tx in (low, high, tied, dropped):
+        assert mempool.add(tx, 100)
+    mempool.remove([dropped.tx_id])
+    assert mempool.select(10) == [high, low, tied]
+    assert mempool.select(1) == [high]
+    assert mempool.transactions == [low, high, tied]
+
+
+def test_full_pool_evicts_cheaper_transactions():
+    txs = [pending(fee) for fee in (0.02, 0.01, 0.03)]
+    mempool = Mempool(max_bytes=sum(MempoolEntry(tx, 0).size for tx in txs))
+    for tx in txs:
+        assert mempool.add(tx, 100)
+
+    # Paying less than the cheapest entry is refused and changes nothing
+    before = (dict(mempool.entries), mempool.total_bytes)
+    assert not mempool.add(pending(0.001), 100)
+    assert (mempool.entries, mempool.total_bytes) == before
+
+    rich = pending(0.5)
+    assert mempool.add(rich, 100)
+    assert txs[1].tx_id not in mempool
+    assert mempool.select(10) == [rich, txs[2], txs[0]]
+    assert mempool.total_bytes <= mempool.max_bytes
+
+
+def test_senders_cannot_queue_more_than_their_balance():
+    mempool = Mempool()
+    cheap, dear = pending(0.01, amount=5), pending(1, amount=5)
+    assert mempool.add(cheap, 12) and mempool.add(dear, 12)
+    assert not mempool.add(pending(0, amount=1), 12)
+    assert mempool.outflow['alice'] == pytest.approx(11.01)
+
+    # The balance dropped: the cheapest transactions go first
+    mempool.enforce_balances(['alice'], lambda sender: 7)
+    assert mempool.select(10) == [dear]
+    assert mempool.outflow['alice'] == pytest.approx(6)
+
+
+def test_journal_follows_a_replaced_file(tmp_path):
+    path = str(tmp_path / 'mempool.log')
+    first, second = Transaction('a', 'b', 1), Transaction('a', 'c', 2)
+    journal = MempoolJournal(path)
+    journal.record_add(first)
+
+    # Another writer compacts the log while our append handle is open
+    MempoolJournal(path).compact([first])
+    journal.record_add(second)
+
+    assert [tx.tx_id for tx in MempoolJournal(path).load()] == [first.tx_id, second.tx_id]
+
+
+def test_restart_drops_journaled_transactions_that_were_confirmed(data_dir):
+    blockchain = Blockchain()
+    keypair = KeyPair()
+    assert blockchain.mine_empty_block(keypair.get_address())
+    tx = Transaction(keypair.get_address(), 'recipient', 4, 0.01)
+    tx.sign_transaction(keypair.get_private_key_hex())
+    assert blockchain.add_transaction(tx)
+    assert blockchain.mine_pending_transactions('miner')
+
+    # Crash after the block was written but before its removal was journaled
+    blockchain.mempool_journal.record_add(tx)
+
+    reloaded = Blockchain()
+    assert len(reloaded.mempool) == 0
+    assert MempoolJournal(Config.MEMPOOL_FILE).load() == []
+
+
+def _mine_in_child(path):
+    monkeypatch = pytest.MonkeyPatch()
+    use_data_dir(monkeypatch, path)
+    monkeypatch.setattr(Config, 'DIFFICULTY_TARGET', 1)
+    blockchain = Blockchain()
+    blockchain.mine_empty_block('miner')
+    return len(blockchain.chain)
+
+
+def test_blockchain_can_run_in_a_child_process(data_dir):
+    with ProcessPoolExecutor(1, mp_context=worker_context()) as executor:
+        assert executor.submit(_mine_in_child, str(data_dir)).result() == 2
+    assert len(Blockchain().chain) == 2
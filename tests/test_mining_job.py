@@ -0,0 +1,46 @@
+import threading
+from hayx.blockchain.block import Block
+from hayx.blockchain.transaction import Transaction
+from hayx.mining.job import MiningJob
+from hayx.mining.miner import Miner
+from config import Config
+
+
+def template(transactions=1):
+    return Block(1, [Transaction('coinbase', 'miner', 10, 0)] * transactions, '0' * 64)
+
+
+def test_cancelled_job_stops_mining_and_keeps_the_first_reason():
+    job = MiningJob(template(), 64)
+    timer = threading.Timer(0.05, job.cancel, ["chain tip changed"])
+    timer.start()
+    assert not job.run()
+    timer.join()
+    job.cancel("mining stopped")
+    assert job.reason == "chain tip changed"
+    assert job.should_stop()
+
+
+def test_mempool_change_refreshes_the_template_after_the_interval():
+    job = MiningJob(template(), 64, refresh_interval=60)
+    job.notify_mempool_changed()
+    assert not job.should_stop()  # too soon to rebuild
+
+    job.created -= 60
+    assert job.should_stop()
+    assert job.reason == "mempool changed"
+
+
+def test_full_template_ignores_mempool_changes():
+    job = MiningJob(template(Config.MAX_TRANSACTIONS_PER_BLOCK), 64, refresh_interval=0)
+    job.notify_mempool_changed()
+    assert not job.should_stop()
+
+
+def test_miner_drops_its_job_on_chain_events():
+    miner = Miner('miner', blockchain=object())
+    miner.current_job = job = MiningJob(template(), 64)
+    miner._on_chain_event('mempool')
+    assert job.mempool_changed and not job.cancelled.is_set()
+    miner._on_chain_event('tip')
+    assert job.reason == "chain tip changed"
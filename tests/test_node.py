@@ -0,0 +1,174 @@
+import socket
+import time
+import pytest
+from conftest import use_data_dir
+from test_sync import chain_work, mine_past
+from hayx.blockchain.block import Block
+from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.transaction import Transaction
+from hayx.crypto.keys import KeyPair
+from hayx.network.node import Node
+from config import Config
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def two_nodes(data_dir, monkeypatch):
+    """A node whose chain has more work, and a fresh node peered with it."""
+    use_data_dir(monkeypatch, str(data_dir / 'b'))
+    chain_b = Blockchain()
+    node_b = Node(chain_b, free_port())
+
+    use_data_dir(monkeypatch, str(data_dir / 'a'))
+    chain_a = Blockchain()
+    mine_past(chain_a, chain_work(chain_b), min_length=20)
+    node_a = Node(chain_a, free_port())
+
+    node_b.peers = {f"127.0.0.1:{node_a.port}"}
+    node_a.peers = set()
+    node_a.start()
+    node_b.start()
+    yield node_a, node_b
+    node_b.stop()
+    node_a.stop()
+
+
+def test_fresh_node_syncs_over_the_network(two_nodes):
+    node_a, node_b = two_nodes
+    tip = node_a.blockchain.get_latest_block().hash
+    assert wait_for(lambda: node_b.blockchain.get_latest_block().hash == tip)
+
+    # New blocks are then relayed as they are mined
+    block = node_a.blockchain.mine_empty_block('miner-a')
+    node_a._broadcast_block(block)
+    assert wait_for(lambda: node_b.blockchain.get_latest_block().hash == block.hash)
+
+
+class FakePeer:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def solved_block(blockchain, previous, address='miner'):
+    """A mined block on ``previous`` that is not added to the chain."""
+    block = Block(previous.index + 1, [Transaction('coinbase', address, 50, 0)], previous.hash)
+    blockchain._solve_block(block)
+    return block
+
+
+def tampered(block):
+    data = block.to_dict()
+    data['transactions'][0]['amount'] += 1000
+    return data
+
+
+def test_tampered_transaction_does_not_shut_out_the_real_one(data_dir):
+    node = Node(Blockchain(), free_port())
+    keypair = KeyPair()
+    node.blockchain.state.balances[keypair.get_address()] = 100.0
+    tx = Transaction(keypair.get_address(), 'recipient', 10, 0.01)
+    tx.sign_transaction(keypair.get_private_key_hex())
+
+    stripped = dict(tx.to_dict(), signature=None)
+    node._handle_message({'type': 'new_transaction', 'data': stripped}, FakePeer())
+    assert tx.tx_id not in node.seen_txs and len(node.blockchain.mempool) == 0
+
+    node._handle_message({'type': 'new_transaction', 'data': tx.to_dict()}, FakePeer())
+    assert node.blockchain.get_pending_transaction(tx.tx_id) is not None
+    assert tx.tx_id in node.seen_txs
+
+
+def test_tampered_block_does_not_shut_out_the_real_one(data_dir):
+    node = Node(Blockchain(), free_port())
+    block = solved_block(node.blockchain, node.blockchain.get_latest_block())
+
+    node._handle_message({'type': 'new_block', 'data': tampered(block)}, FakePeer())
+    assert block.hash not in node.seen_blocks
+
+    node._handle_message({'type': 'new_block', 'data': block.to_dict()}, FakePeer())
+    assert node.blockchain.get_latest_block().hash == block.hash
+    assert block.hash in node.seen_blocks
+
+
+def test_tampered_orphan_does_not_take_the_real_ones_place(data_dir):
+    node = Node(Blockchain(), free_port())
+    parent = solved_block(node.blockchain, node.blockchain.get_latest_block())
+    child = solved_block(node.blockchain, parent)
+
+    node._handle_message({'type': 'new_block', 'data': tampered(child)}, FakePeer())
+    node._handle_message({'type': 'new_block', 'data': child.to_dict()}, FakePeer())
+    node._handle_message({'type': 'new_block', 'data': parent.to_dict()}, FakePeer())
+    assert node.blockchain.get_latest_block().hash == child.hash
+
+
+def test_blocks_we_hold_off_the_main_chain_are_not_requested(data_dir):
+    node = Node(Blockchain(), free_port())
+    blockchain = node.blockchain
+    mine_past(blockchain, 0, min_length=4)
+    side = solved_block(blockchain, blockchain.chain[1])
+    assert not blockchain.connect_branch([side])  # kept on a side branch
+    orphan = solved_block(blockchain, Block(2, [], 'cd' * 32))
+    assert node.orphans.add(orphan)
+
+    peer = FakePeer()
+    node._handle_inv({'blocks': [[side.index, side.hash], [orphan.index, orphan.hash]], 'txs': []}, peer)
+    assert peer.sent == []
+
+
+def fork_headers(previous, difficulties):
+    """Headers of blocks mined on ``previous`` at the given difficulties."""
+    headers = []
+    for difficulty in difficulties:
+        block = Block(previous.index + 1, [Transaction('coinbase', 'peer', 50, 0)], previous.hash)
+        block.mine_block(difficulty)
+        headers.append(block.header_to_dict())
+        previous = block
+    return headers
+
+
+def test_sync_follows_header_chains_with_more_work(data_dir):
+    node = Node(Blockchain(), free_port())
+    mine_past(node.blockchain, 0, min_length=6)
+    fork = node.blockchain.chain[2]
+
+    # Longer but with less work: ignored
+    light = fork_headers(fork, [0] * 4)
+    node._handle_headers({'height': 7, 'headers': light}, FakePeer())
+    assert not node.downloader.active
+
+    # Shorter but with more work: downloaded
+    heavy = fork_headers(fork, [3])
+    node._handle_headers({'height': 4, 'headers': heavy}, FakePeer())
+    assert node.downloader.active
+    assert node.downloader.hashes == [header['hash'] for header in heavy]
+
+
+def test_get_headers_answers_from_the_fork_point(data_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_HEADERS_PER_MESSAGE', 4)
+    node = Node(Blockchain(), free_port())
+    mine_past(node.blockchain, 0, min_length=12)
+    locator = [[height, block_hash if height <= 5 else 'f' * 64] for height, block_hash in node.blockchain.get_locator()]
+
+    peer = FakePeer()
+    node._handle_message({'type': 'get_headers', 'data': {'locator': locator}}, peer)
+    [response] = peer.sent
+    assert response['type'] == 'headers' and response['data']['height'] == 12
+    assert [header['index'] for header in response['data']['headers']] == [6, 7, 8, 9]
+    assert all('transactions' not in header for header in response['data']['headers'])
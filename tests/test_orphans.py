@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+import pytest
+from hayx.network import orphans
+from hayx.network.orphans import OrphanPool
+
+
+def orphan(name, parent):
+    return SimpleNamespace(hash=name, previous_hash=parent)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(orphans, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_children_are_handed_out_once(clock):
+    pool = OrphanPool()
+    assert pool.add(orphan('a', 'p')) and pool.add(orphan('b', 'p')) and pool.add(orphan('c', 'a'))
+    assert not pool.add(orphan('a', 'p'))
+    assert 'a' in pool and len(pool) == 3
+
+    assert sorted(block.hash for block in pool.pop_children('p')) == ['a', 'b']
+    assert pool.pop_children('p') == []
+    assert [block.hash for block in pool.pop_children('a')] == ['c']
+    assert len(pool) == 0 and pool.children == {}
+
+
+def test_oldest_orphans_are_evicted_beyond_capacity(clock):
+    pool = OrphanPool(capacity=2)
+    for name in ('a', 'b', 'c'):
+        clock.now += 1
+        pool.add(orphan(name, 'p-' + name))
+    assert list(pool.blocks) == ['b', 'c']
+    assert 'p-a' not in pool.children
+
+
+def test_orphans_expire(clock):
+    pool = OrphanPool(expiry=60)
+    pool.add(orphan('old', 'p'))
+    clock.now += 30
+    pool.add(orphan('new', 'p'))
+    clock.now += 31
+    assert [block.hash for block in pool.pop_children('p')] == ['new']
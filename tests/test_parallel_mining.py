@@ -0,0 +1,50 @@
+import queue
+from types import SimpleNamespace
+from hayx.blockchain.block import Block
+from hayx.blockchain.transaction import Transaction
+from hayx.mining.parallel import ParallelMiner, _worker_main
+from hayx.mining.proof_of_work import mine_header
+
+
+def test_parallel_miner_solves_a_block():
+    miner = ParallelMiner(workers=2, batch_size=1000)
+    block = Block(1, [Transaction('coinbase', 'miner', 10, 0)], '0' * 64)
+    try:
+        assert miner.mine(block, 2)
+    finally:
+        miner.close()
+    assert block.hash.startswith('00')
+    assert block.hash == block.calculate_hash()
+    assert sum(miner.get_worker_hash_counts()) >= block.hash_attempts > 0
+
+
+def run_worker(header_prefix, ranges, batch_size=7):
+    """Run one worker in-process over ``ranges``; returns its results and hash count."""
+    jobs, results = queue.Queue(), queue.Queue()
+    for start, end in ranges:
+        jobs.put((1, header_prefix, 2, start, end))
+    jobs.put(None)
+    counts = [0]
+    _worker_main(0, jobs, results, SimpleNamespace(value=1), counts, batch_size)
+    return [results.get_nowait()[2] for _ in ranges], counts[0]
+
+
+def test_workers_grind_only_their_nonce_range():
+    header_prefix = Block(1, [Transaction('coinbase', 'miner', 10, 0)], '0' * 64).prepare_header(2)
+    nonce, block_hash = mine_header(header_prefix, 2, 100)
+
+    # A range below the first solution is exhausted; one around it stops at it
+    found, count = run_worker(header_prefix, [(100, nonce), (nonce - 10, nonce + 10)])
+    assert found == [None, (nonce, block_hash)]
+    assert count == (nonce - 100) + 11
+
+
+def test_parallel_mining_can_be_cancelled():
+    miner = ParallelMiner(workers=2, batch_size=1000)
+    block = Block(1, [Transaction('coinbase', 'miner', 10, 0)], '0' * 64)
+    unsolved = block.hash
+    try:
+        assert not miner.mine(block, 64, should_stop=lambda: True)
+    finally:
+        miner.close()
+    assert block.hash == unsolved and block.nonce == 0
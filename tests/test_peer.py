@@ -0,0 +1,53 @@
+import asyncio
+import time
+from test_node import free_port
+from hayx.network.peer import AsyncPeer, reconnect_delay
+from config import Config
+
+
+def test_reconnect_delay_doubles_up_to_the_cap():
+    delays = [reconnect_delay(failures) for failures in range(1, 5)]
+    assert delays == [Config.PEER_RECONNECT_BASE * 2 ** n for n in range(4)]
+    assert reconnect_delay(100) == Config.PEER_RECONNECT_MAX
+
+
+def test_failed_connects_back_off():
+    async def attempt(peer):
+        return await peer.connect()
+
+    peer = AsyncPeer('127.0.0.1', free_port())
+    assert not asyncio.run(attempt(peer))
+    assert not asyncio.run(attempt(peer))
+    assert peer.failures == 2
+    assert peer.next_attempt >= time.time() + reconnect_delay(2) - 1
+
+
+def test_session_exchanges_messages_and_bounds_its_queue(monkeypatch):
+    monkeypatch.setattr(Config, 'PEER_SEND_QUEUE', 1)
+
+    async def session():
+        async def echo(message, peer):
+            peer.send_nowait({'type': 'echo', 'data': message['data']})
+
+        def serve(reader, writer):
+            AsyncPeer('client', 0, on_message=echo).attach(reader, writer)
+
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        replies = asyncio.Queue()
+
+        async def received(message, peer):
+            await replies.put(message)
+
+        peer = AsyncPeer('127.0.0.1', port, on_message=received)
+        assert await peer.connect()
+        # Nothing is written until the loop runs, so the second message overflows
+        assert peer.send_nowait({'type': 'ping', 'data': 1})
+        assert not peer.send_nowait({'type': 'ping', 'data': 2})
+        reply = await asyncio.wait_for(replies.get(), 5)
+        peer.close()
+        server.close()
+        await server.wait_closed()
+        return reply, peer.is_connected
+
+    assert asyncio.run(session()) == ({'type': 'echo', 'data': 1}, False)
@@ -0,0 +1,53 @@
+import json
+import pytest
+from hayx.network.codec import CODEC_BINARY, CODEC_JSON
+from hayx.network.protocol import FLAG_BINARY, FLAG_MORE, FRAME_HEADER, MessageReader, ProtocolError, iter_frames
+
+MESSAGE = {'type': 'inv', 'data': {'blocks': [[height, '%064x' % height] for height in range(40)], 'txs': []}}
+
+
+def frames(message, codec=CODEC_JSON, chunk_size=256):
+    return [bytes(frame) for frame in iter_frames(message, codec, chunk_size)]
+
+
+def test_json_messages_are_sliced_into_frames():
+    sent = frames(MESSAGE)
+    payload = json.dumps(MESSAGE).encode()
+    assert len(sent) == -(-len(payload) // 256)
+    assert b''.join(frame[FRAME_HEADER.size:] for frame in sent) == payload
+    assert [FRAME_HEADER.unpack_from(frame)[0] for frame in sent] == [FLAG_MORE] * (len(sent) - 1) + [0]
+
+    binary = frames(MESSAGE, CODEC_BINARY)
+    assert all(FRAME_HEADER.unpack_from(frame)[0] & FLAG_BINARY for frame in binary)
+
+
+@pytest.mark.parametrize('codec', [CODEC_JSON, CODEC_BINARY])
+def test_messages_are_reassembled_from_partial_reads(codec):
+    stream = b''.join(frames(MESSAGE, codec) * 2)
+    reader = MessageReader()
+    received = []
+    for start in range(0, len(stream), 7):
+        received += reader.feed(stream[start:start + 7])
+    assert received == [MESSAGE, MESSAGE]
+    assert not reader.buffer and not reader.payload
+
+
+def test_oversized_messages_are_refused_before_they_arrive():
+    # A frame header announcing too much is enough
+    with pytest.raises(ProtocolError):
+        MessageReader(max_size=1000).feed(FRAME_HEADER.pack(0, 1001))
+
+    # So is a run of frames that adds up to too much
+    reader = MessageReader(max_size=len(json.dumps(MESSAGE)) - 1)
+    sent = frames(MESSAGE)
+    for frame in sent[:-1]:
+        assert reader.feed(frame) == []
+    with pytest.raises(ProtocolError):
+        reader.feed(sent[-1][:FRAME_HEADER.size])
+
+
+def test_malformed_payloads_are_refused():
+    with pytest.raises(ProtocolError):
+        MessageReader().feed(FRAME_HEADER.pack(0, 5) + b'{"a":')
+    with pytest.raises(ProtocolError):
+        MessageReader().feed(FRAME_HEADER.pack(0, 2) + b'[]')
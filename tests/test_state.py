@@ -0,0 +1,63 @@
+import json
+from hayx.blockchain.block import Block
+from hayx.blockchain.state import AccountState
+from hayx.blockchain.transaction import Transaction
+
+
+def make_chain():
+    """Genesis paying alice, then alice paying bob, then bob paying carol."""
+    specs = [
+        [Transaction('coinbase', 'alice', 100, 0)],
+        [Transaction('alice', 'bob', 30, 1), Transaction('coinbase', 'miner', 10, 0)],
+        [Transaction('bob', 'carol', 5, 0.5), Transaction('coinbase', 'miner', 10, 0)],
+    ]
+    chain = []
+    previous_hash = '0'
+    for index, transactions in enumerate(specs):
+        block = Block(index, transactions, previous_hash)
+        chain.append(block)
+        previous_hash = block.hash
+    return chain
+
+
+def test_blocks_are_applied_and_undone(tmp_path):
+    chain = make_chain()
+    state = AccountState(str(tmp_path / 'state.json'))
+    for block in chain:
+        state.apply_block(block)
+    assert state.balances == {'alice': 69, 'bob': 24.5, 'carol': 5, 'miner': 20}
+    assert state.total_supply == 118.5  # fees leave circulation
+    assert (state.height, state.tip_hash) == (3, chain[-1].hash)
+
+    state.undo_block(chain[-1])
+    assert state.get_balance('bob') == 30 and state.get_balance('carol') == 0
+    assert (state.height, state.tip_hash) == (2, chain[1].hash)
+
+
+def test_load_replays_blocks_above_the_snapshot(tmp_path):
+    chain = make_chain()
+    state = AccountState(str(tmp_path / 'state.json'))
+    state.rebuild(chain[:2])
+    state.balances['marker'] = 7  # only survives if the snapshot is used
+    state.save()
+
+    loaded = AccountState(state.state_file)
+    loaded.load(chain)
+    assert (loaded.height, loaded.tip_hash) == (3, chain[-1].hash)
+    assert loaded.get_balance('carol') == 5
+    assert loaded.get_balance('marker') == 7
+
+
+def test_load_rebuilds_a_snapshot_that_is_off_the_chain(tmp_path):
+    chain = make_chain()
+    state = AccountState(str(tmp_path / 'state.json'))
+    state.rebuild(chain)
+    state.balances['alice'] = 1000  # from some other chain
+    state.tip_hash = 'f' * 64
+    state.save()
+
+    loaded = AccountState(state.state_file)
+    loaded.load(chain)
+    assert loaded.get_balance('alice') == 69
+    with open(state.state_file) as f:
+        assert json.load(f)['tip_hash'] == chain[-1].hash
@@ -0,0 +1,86 @@
+import os
+import pytest
+from hayx.blockchain.block import Block
+from hayx.blockchain.storage import RECORD_HEADER, INDEX_ENTRY, BlockStore, CorruptRecordError
+from hayx.blockchain.transaction import Transaction
+
+
+def make_blocks(count):
+    blocks = []
+    previous_hash = '0'
+    for index in range(count):
+        block = Block(index, [Transaction('coinbase', 'miner', 10, 0)], previous_hash)
+        blocks.append(block)
+        previous_hash = block.hash
+    return blocks
+
+
+def stored(directory, blocks, **options):
+    store = BlockStore(str(directory), fsync=False, **options)
+    for block in blocks:
+        store.append(block)
+    return store
+
+
+def hashes(store):
+    return [block.hash for block in store.iter_blocks()]
+
+
+def test_reads_check_record_checksums(tmp_path):
+    blocks = make_blocks(3)
+    store = stored(tmp_path, blocks)
+    segment, offset, length = store.entries[1]
+    with open(store._segment_path(segment), 'r+b') as f:
+        f.seek(offset + RECORD_HEADER.size + length // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0x01]))
+
+    assert store.read(0).hash == blocks[0].hash
+    with pytest.raises(CorruptRecordError):
+        store.read(1)
+    with pytest.raises(CorruptRecordError):
+        list(store.iter_blocks())
+
+
+def test_torn_tail_is_cut_off_on_open(tmp_path):
+    blocks = make_blocks(4)
+    store = stored(tmp_path, blocks[:3])
+    segment_path = store._segment_path(0)
+    intact_size = os.path.getsize(segment_path)
+    with open(segment_path, 'ab') as f:
+        f.write(RECORD_HEADER.pack(500, 0) + b'{"index": 3')
+
+    reopened = BlockStore(str(tmp_path), fsync=False)
+    assert len(reopened) == 3
+    assert os.path.getsize(segment_path) == intact_size
+    reopened.append(blocks[3])
+    assert hashes(BlockStore(str(tmp_path), fsync=False)) == [block.hash for block in blocks]
+
+
+def test_records_missing_from_the_index_are_recovered(tmp_path):
+    blocks = make_blocks(3)
+    store = stored(tmp_path, blocks)
+    # Crash after the record reached the log but before its index entry did
+    with open(store.index_file, 'r+b') as f:
+        f.truncate(2 * INDEX_ENTRY.size + 5)
+
+    reopened = BlockStore(str(tmp_path), fsync=False)
+    assert hashes(reopened) == [block.hash for block in blocks]
+
+
+def test_segments_roll_over_and_truncate(tmp_path):
+    blocks = make_blocks(10)
+    store = stored(tmp_path, blocks, segment_size=1200)
+    segments = store._segments()
+    assert len(segments) > 2
+    assert all(os.path.getsize(store._segment_path(segment)) <= 1200 for segment in segments)
+    assert [store.read(height).hash for height in range(10)] == [block.hash for block in blocks]
+
+    cut_segment = store.entries[2][0]
+    store.truncate(2)
+    assert store._segments() == list(range(cut_segment + 1))
+    reopened = BlockStore(str(tmp_path), fsync=False, segment_size=1200)
+    assert hashes(reopened) == [block.hash for block in blocks[:2]]
+    reopened.append(blocks[2])
+    assert len(BlockStore(str(tmp_path), fsync=False)) == 3
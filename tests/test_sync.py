@@ -0,0 +1,82 @@
+from conftest import use_data_dir
+from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.blockindex import block_work
+from hayx.network.node import Node
+
+
+def chain_work(blockchain):
+    return blockchain.block_index.get(blockchain.get_latest_block().hash).chain_work
+
+
+def mine_past(blockchain, work, min_length=1):
+    """Mine until the chain has more than ``work`` and at least ``min_length`` blocks."""
+    while chain_work(blockchain) <= work or len(blockchain.chain) < min_length:
+        assert blockchain.mine_empty_block('miner')
+
+
+def peer_chain(data_dir, monkeypatch, work, min_length=1):
+    """Blocks of another node's chain, mined from its own genesis past ``work``."""
+    use_data_dir(monkeypatch, str(data_dir / 'peer'))
+    peer = Blockchain()
+    mine_past(peer, work, min_length)
+    use_data_dir(monkeypatch, str(data_dir / 'node'))
+    return list(peer.chain)
+
+
+def test_fresh_node_syncs_from_peer_with_other_genesis(data_dir, monkeypatch):
+    use_data_dir(monkeypatch, str(data_dir / 'node'))
+    blockchain = Blockchain()
+    blocks = peer_chain(data_dir, monkeypatch, chain_work(blockchain), min_length=5)
+    node = Node(blockchain)
+    assert blockchain.chain[0].hash != blocks[0].hash
+
+    # In two ranges, as the block downloader hands them over
+    assert node._connect_blocks(0, blocks[:2])
+    assert node._connect_blocks(2, blocks[2:])
+    assert [block.hash for block in blockchain.chain] == [block.hash for block in blocks]
+    assert blockchain.get_balance('miner') == sum(
+        tx.amount for block in blocks for tx in block.transactions if tx.recipient == 'miner')
+
+    reloaded = Blockchain()
+    assert reloaded.get_latest_block().hash == blocks[-1].hash
+
+
+def test_received_chain_with_other_genesis_replaces_weaker_chain(data_dir, monkeypatch):
+    use_data_dir(monkeypatch, str(data_dir / 'node'))
+    blockchain = Blockchain()
+    blocks = peer_chain(data_dir, monkeypatch, chain_work(blockchain))
+    Node(blockchain)._handle_received_chain([block.to_dict() for block in blocks])
+    assert blockchain.get_latest_block().hash == blocks[-1].hash
+
+
+def test_weaker_chain_with_other_genesis_stays_aside(data_dir, monkeypatch):
+    blocks = peer_chain(data_dir, monkeypatch, 0)
+    blockchain = Blockchain()
+    mine_past(blockchain, sum(block_work(block) for block in blocks))
+    tip = blockchain.get_latest_block().hash
+
+    # Kept on a side branch, in case more of it arrives
+    assert Node(blockchain)._connect_blocks(0, blocks)
+    assert blockchain.get_latest_block().hash == tip
+    assert blockchain.get_indexed_block(blocks[-1].hash) is not None
+
+
+def test_locator_thins_out_towards_genesis(data_dir):
+    blockchain = Blockchain()
+    mine_past(blockchain, 0, min_length=31)
+    locator = blockchain.get_locator()
+    assert [height for height, _ in locator] == list(range(30, 20, -1)) + [19, 15, 7, 0]
+    assert all(blockchain.chain[height].hash == block_hash for height, block_hash in locator)
+
+
+def test_fork_height_is_the_highest_shared_locator_entry(data_dir):
+    blockchain = Blockchain()
+    mine_past(blockchain, 0, min_length=31)
+    locator = blockchain.get_locator()
+    diverged = [[height, block_hash if height <= 12 else 'f' * 64] for height, block_hash in locator]
+    assert blockchain.find_fork_height(locator) == 30
+    assert blockchain.find_fork_height(diverged) == 7
+    assert blockchain.find_fork_height([[0, 'f' * 64]]) == -1
+
+    blocks = blockchain.get_block_range(28, 28 + 100)
+    assert [block.index for block in blocks] == [28, 29, 30]
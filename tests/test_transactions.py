@@ -0,0 +1,161 @@
+import pytest
+from hayx.blockchain.block import Block
+from hayx.blockchain.blockchain import Blockchain
+from hayx.blockchain.transaction import Transaction, parse_transactions
+from hayx.blockchain.validation import ChainValidator
+from hayx.crypto.keys import KeyPair
+
+
+@pytest.fixture
+def funded(data_dir):
+    """A blockchain and a key whose address holds 100 coins."""
+    blockchain = Blockchain()
+    keypair = KeyPair()
+    blockchain.state.balances[keypair.get_address()] = 100.0
+    return blockchain, keypair
+
+
+def signed(keypair, amount, fee=0.01, recipient='recipient'):
+    tx = Transaction(keypair.get_address(), recipient, amount, fee)
+    tx.sign_transaction(keypair.get_private_key_hex())
+    return tx.to_dict()
+
+
+def submit(blockchain, items):
+    return blockchain.add_transactions(parse_transactions(items))
+
+
+def test_batch_admits_signed_transactions_in_order(funded):
+    blockchain, keypair = funded
+    items = [signed(keypair, 40), signed(keypair, 40), signed(keypair, 40)]
+    assert submit(blockchain, items) == [None, None, 'Insufficient balance']
+    assert len(blockchain.mempool) == 2
+
+
+@pytest.mark.parametrize('amount, fee', [
+    (-1000, 0.01), (0, 0.01), (1, -0.5), (float('inf'), 0.01), (float('nan'), 0.01), (1, float('nan')),
+])
+def test_batch_rejects_bad_amounts(funded, amount, fee):
+    blockchain, keypair = funded
+    assert submit(blockchain, [signed(keypair, amount, fee)]) == ['Amount must be positive and fee not negative']
+    assert len(blockchain.mempool) == 0
+
+
+def test_mempool_refuses_bad_amounts_from_any_path(funded):
+    blockchain, keypair = funded
+    tx = Transaction.from_dict(signed(keypair, -1000))
+    assert not blockchain.add_transaction(tx)
+
+
+@pytest.mark.parametrize('change', [
+    {'signature': [1, 2]}, {'public_key': 5}, {'amount': '1'}, {'amount': True}, {'sender': None},
+    {'timestamp': 'now'}, {'tx_id': 7}, {'amount': 10 ** 400},
+])
+def test_batch_reports_malformed_items(funded, change):
+    blockchain, keypair = funded
+    good = signed(keypair, 1)
+    errors = submit(blockchain, [dict(good, **change), good, 'not an object', [1]])
+    assert errors == ['Invalid transaction data', None, 'Invalid transaction data', 'Invalid transaction data']
+
+
+def test_malformed_items_never_reach_validator_workers(funded):
+    blockchain, keypair = funded
+    blockchain.validator = ChainValidator(workers=2, min_signatures=1)
+    try:
+        good = signed(keypair, 1)
+        errors = submit(blockchain, [dict(good, signature=[1]), good, dict(signed(keypair, 2), public_key=5)])
+    finally:
+        blockchain.validator.close()
+    assert errors == ['Invalid transaction data', None, 'Invalid transaction data']
+
+
+def test_send_transactions_endpoint(funded, monkeypatch):
+    from flask import Flask
+    from hayx.api import rest_api
+    blockchain, keypair = funded
+    monkeypatch.setattr(rest_api, 'blockchain', blockchain)
+    app = Flask(__name__)
+    app.register_blueprint(rest_api.api, url_prefix='/api')
+    client = app.test_client()
+
+    for body in ([1, 2], 'text', {'transactions': {}}, {'transactions': []}):
+        assert client.post('/api/transactions/send', json=body).status_code == 400
+    assert client.post('/api/transactions/send', data='{', content_type='application/json').status_code == 400
+
+    good = signed(keypair, 1)
+    response = client.post('/api/transactions/send', json={'transactions': [good, dict(good, fee='x')]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['accepted'] == 1
+    assert data['results'] == [
+        {'tx_id': good['tx_id'], 'status': 'success'},
+        {'tx_id': None, 'status': 'error', 'message': 'Invalid transaction data'},
+    ]
+
+
+def test_send_transactions_socket_event(funded, monkeypatch):
+    from hayx.web import app
+    blockchain, keypair = funded
+    monkeypatch.setattr(app, 'blockchain', blockchain)
+    broadcast = []
+    monkeypatch.setattr(app.node, 'broadcast_transactions', broadcast.extend)
+    client = app.socketio.test_client(app.app)
+    client.get_received()
+
+    client.emit('send_transactions', [1])
+    assert client.get_received()[0]['name'] == 'error'
+
+    good = signed(keypair, 1)
+    client.emit('send_transactions', {'transactions': [good, good]})
+    (event,) = client.get_received()
+    assert event['name'] == 'transactions_result'
+    assert event['args'][0] == {'accepted': 1, 'results': [
+        {'tx_id': good['tx_id'], 'status': 'success'},
+        {'tx_id': good['tx_id'], 'status': 'error', 'message': 'Transaction already pending'},
+    ]}
+    assert [tx.tx_id for tx in broadcast] == [good['tx_id']]
+
+
+def test_confirmed_transactions_cannot_be_replayed(funded):
+    blockchain, keypair = funded
+    tx = Transaction.from_dict(signed(keypair, 4))
+    assert blockchain.add_transaction(tx)
+    assert blockchain.mine_pending_transactions('miner')
+    assert blockchain.get_balance('recipient') == 4
+
+    replay = Transaction.from_dict(tx.to_dict())
+    assert not blockchain.add_transaction(replay)
+    assert blockchain._admission_error(replay) == 'Transaction already confirmed'
+    assert blockchain.mine_empty_block('miner')
+    assert blockchain.get_balance('recipient') == 4
+
+    # Nor can a block carry it again
+    tip = blockchain.get_latest_block()
+    block = Block(tip.index + 1, [replay, Transaction('coinbase', 'miner', 50, 0)], tip.hash)
+    blockchain._solve_block(block)
+    assert block.is_valid(tip)
+    assert not blockchain.add_block(block)
+    assert not blockchain.connect_branch([block])
+    assert not blockchain.is_chain_valid(blockchain.chain + [block])
+    assert blockchain.get_balance('recipient') == 4
+
+
+def test_batch_refuses_confirmed_transactions(funded, monkeypatch):
+    blockchain, keypair = funded
+    confirmed = signed(keypair, 4)
+    assert blockchain.add_transaction(Transaction.from_dict(confirmed))
+    assert blockchain.mine_pending_transactions('miner')
+    assert submit(blockchain, [confirmed]) == ['Transaction already confirmed']
+
+    # A block confirming a batch item while its signature is being checked
+    racing = Transaction.from_dict(signed(keypair, 5))
+    verify_signatures = blockchain.validator.verify_signatures
+    def verify_then_mine(transactions):
+        tip = blockchain.get_latest_block()
+        block = Block(tip.index + 1, [racing, Transaction('coinbase', 'miner', 50, 0)], tip.hash)
+        blockchain._solve_block(block)
+        assert blockchain.add_block(block)
+        return verify_signatures(transactions)
+    monkeypatch.setattr(blockchain.validator, 'verify_signatures', verify_then_mine)
+    assert submit(blockchain, [racing.to_dict()]) == ['Transaction already confirmed']
+    assert len(blockchain.mempool) == 0